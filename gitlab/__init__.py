@@ -5,23 +5,29 @@ by Itxaka Serrano Garcia <itxakaserrano@gmail.com>
 Check the license on the LICENSE file
 """
 
-import requests
-import json
 from . import exceptions
-try:
-    from urllib import quote_plus
-except ImportError:
-    from urllib.parse import quote_plus
-    basestring = str
+from .cache import invalidates
+from .endpoints import endpoint, flag, projectaccess, segment, visibility
+from .lazy import Loader
+from .tags import TagIndex
+from .users import UserDirectory
+from .transport import Base64JSONBody, Transport
+
+HOOK_FIELDS = ("url", ("push_events", "push", flag), ("issues_events", "issues", flag),
+               ("merge_requests_events", "merge_requests", flag), ("tag_push_events", "tag_push", flag))
+
 
 class Gitlab(object):
     """Gitlab class"""
 
-    def __init__(self, host, token="", oauth_token="", verify_ssl=True, auth=None, timeout=None):
+    def __init__(self, host, token="", oauth_token="", verify_ssl=True, auth=None, timeout=None, cache=None,
+                 transport=None):
         """on init we setup the token used for all the api calls and all the urls
 
         :param host: host of gitlab
         :param token: token
+        :param cache: optional gitlab.cache.ResponseCache to keep slow changing responses
+        :param transport: object sending the http requests, defaults to gitlab.transport.Transport()
         """
         if token != "":
             self.token = token
@@ -49,6 +55,26 @@ class Gitlab(object):
         self.namespaces_url = self.api_url + "/namespaces"
         self.verify_ssl = verify_ssl
         self.timeout = timeout
+        self.cache = cache
+        self.transport = transport or Transport()
+        self.tagindexes = {}
+        self.userdirectory = None
+        self.loaders = {"project": Loader(self.getproject, "project"), "user": Loader(self.getuser, "user")}
+
+    def _request(self, verb, url, **kwargs):
+        """Send a request with the credentials and options of this instance
+
+        Every endpoint goes through here, the generated ones (see gitlab.endpoints) and the hand written ones.
+
+        :param verb: http verb, lower case
+        :param url: full url
+        :param kwargs: other arguments of the transport, ie: params, data or headers to replace the default ones
+        :return: the response
+        """
+        if "headers" not in kwargs:
+            kwargs["headers"] = self.headers
+        return self.transport.request(verb, url, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout,
+                                      **kwargs)
 
     def login(self, email=None, password=None, user=None):
         """Logs the user in and setups the header with the private token
@@ -64,11 +90,11 @@ class Gitlab(object):
         else:
             raise ValueError('Neither username nor email provided to login')
 
-        request = requests.post("{0}/api/v3/session".format(self.host), data=data,
-                                verify=self.verify_ssl,
-                                auth=self.auth,
-                                timeout=self.timeout,
-                                headers={"connection": "close"})
+        request = self.transport.post("{0}/api/v3/session".format(self.host), data=data,
+                                      verify=self.verify_ssl,
+                                      auth=self.auth,
+                                      timeout=self.timeout,
+                                      headers={"connection": "close"})
         if request.status_code == 201:
             self.token = request.json()['private_token']
             self.headers = {"PRIVATE-TOKEN": self.token,
@@ -92,6 +118,7 @@ class Gitlab(object):
         else:
             self.headers["SUDO"] = user
 
+    @endpoint("get", "/users", query=("search",), paginated=True)
     def getusers(self, search=None, page=1, per_page=20):
         """Return a user list
 
@@ -100,29 +127,26 @@ class Gitlab(object):
         :param per_page: Number of items to return per page (default is 20)
         :return: returs a dictionary of the users, false if there is an error
         """
-        data = {'page': page, 'per_page': per_page}
-        if search:
-            data['search'] = search
-        request = requests.get(self.users_url, params=data,
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/users/{user_id}", cache="users")
     def getuser(self, user_id):
         """Get info for a user identified by id
 
         :param user_id: id of the user
         :return: False if not found, a dictionary if found
         """
-        request = requests.get("{0}/{1}".format(self.users_url, user_id),
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    def lazyuser(self, user_id):
+        """Get a user that is only fetched when one of its fields is read
+
+        Pending lazy users are fetched together, concurrently, when the first of them is read.
+
+        :param user_id: id of the user
+        :return: gitlab.lazy.LazyResource, read it like the dict of getuser
+        """
+        return self.loaders["user"].resource(user_id)
+
+    @invalidates("namespaces", scoped=False)
     def createuser(self, name, username, password, email, **kwargs):
         """Create a user
 
@@ -138,36 +162,55 @@ class Gitlab(object):
         if kwargs:
             data.update(kwargs)
 
-        request = requests.post(self.users_url, headers=self.headers, data=data,
-                                verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
+        request = self._request("post", self.users_url, data=data)
         if request.status_code == 201:
-            return request.json()
+            user = request.json()
+            if self.userdirectory is not None:
+                self.userdirectory.add(user)
+            return user
         elif request.status_code == 404:
             return False
 
+    @invalidates("namespaces", scoped=False)
+    @invalidates("users")
     def deleteuser(self, user_id):
         """Deletes an user by ID
 
         :param user_id: id of the user to delete
         :return: True if it deleted, False if it couldn't. False could happen for several reasons, but there isn't a good way of differenting them
         """
-        request = requests.delete("{0}/{1}".format(self.users_url, user_id),
-                                  headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
+        request = self._request("delete", "{0}/{1}".format(self.users_url, user_id))
         if request.status_code == 200:
+            if self.userdirectory is not None:
+                self.userdirectory.remove(user_id)
             return True
         else:
             return False
 
+    def getuserdirectory(self, path=None):
+        """Get the directory of the users of the instance, shared by every call on this instance
+
+        The first call loads the snapshot at path if there is one and reads the users created since.
+
+        :param path: optional json snapshot to start from, only used on the first call
+        :return: gitlab.users.UserDirectory
+        """
+        if self.userdirectory is None:
+            directory = UserDirectory(self, path=path)
+            directory.refresh()
+            self.userdirectory = directory
+        return self.userdirectory
+
+    @endpoint("get", "/user", cache="currentuser", scoped=False)
     def currentuser(self):
         """Returns the current user parameters. The current user is linked
         to the secret token
 
         :return: a list with the current user properties
         """
-        request = requests.get("{0}/api/v3/user".format(self.host),
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        return request.json()
 
+    @invalidates("currentuser", scoped=False)
+    @invalidates("users")
     def edituser(self, user_id, **kwargs):
         """Edits an user data.
 
@@ -175,19 +218,17 @@ class Gitlab(object):
         :param kwargs: Any param the the Gitlab API supports
         :return: Dict of the user
         """
-        data = {}
-
-        if kwargs:
-            data.update(kwargs)
-
-        request = requests.put("{0}/{1}".format(self.users_url, user_id),
-                               headers=self.headers, data=data, timeout=self.timeout,
-                               verify=self.verify_ssl, auth=self.auth)
+        request = self._request("put", "{0}/{1}".format(self.users_url, user_id), data=kwargs)
         if request.status_code == 200:
-            return request.json()
+            user = request.json()
+            if self.userdirectory is not None:
+                self.userdirectory.add(user)
+            return user
         else:
             return False
 
+    @invalidates("users")
+    @endpoint("put", "/users/{user_id}/block")
     def blockuser(self, user_id, **kwargs):
         """Block a user.
 
@@ -195,47 +236,31 @@ class Gitlab(object):
         :param kwargs: Any param the the Gitlab API supports
         :return: Dict of the user
         """
-        data = {}
-
-        if kwargs:
-            data.update(kwargs)
-
-        request = requests.put("{0}/{1}/block".format(self.users_url, user_id),
-                               headers=self.headers, data=data,
-                               timeout=self.timeout,
-                               verify=self.verify_ssl)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/user/keys")
     def getsshkeys(self):
         """Gets all the ssh keys for the current user
 
         :return: a dictionary with the lists
         """
-        request = requests.get(self.keys_url, headers=self.headers,
-                               verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-
-            return False
 
+    @endpoint("get", "/user/keys/{key_id}")
     def getsshkey(self, key_id):
         """Get a single ssh key identified by key_id
 
         :param key_id: the id of the key
         :return: the key itself
         """
-        request = requests.get("{0}/{1}".format(self.keys_url, key_id),
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
 
-            return False
+    @endpoint("get", "/users/{user_id}/keys")
+    def getsshkeysuser(self, user_id):
+        """Gets all the ssh keys of the user identified by id
+
+        :param user_id: id of the user
+        :return: list of the keys, false if there is an error
+        """
 
+    @endpoint("post", "/user/keys", body=("title", "key"), result="bool")
     def addsshkey(self, title, key):
         """Add a new ssh key for the current user
 
@@ -243,14 +268,8 @@ class Gitlab(object):
         :param key: the key itself
         :return: true if added, false if it didn't add it (it could be because the name or key already exists)
         """
-        data = {"title": title, "key": key}
-        request = requests.post(self.keys_url, headers=self.headers, data=data,
-                                verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 201:
-            return True
-        else:
-            return False
 
+    @endpoint("post", "/users/{user_id}/keys", body=("title", "key"), result="bool")
     def addsshkeyuser(self, user_id, title, key):
         """Add a new ssh key for the user identified by id
 
@@ -259,14 +278,6 @@ class Gitlab(object):
         :param key: the key itself
         :return: true if added, false if it didn't add it (it could be because the name or key already exists)
         """
-        data = {"title": title, "key": key}
-
-        request = requests.post("{0}/{1}/keys".format(self.users_url, user_id),
-                                headers=self.headers, data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 201:
-            return True
-        else:
-            return False
 
     def deletesshkey(self, key_id):
         """Deletes an sshkey for the current user identified by id
@@ -274,84 +285,60 @@ class Gitlab(object):
         :param key_id: the id of the key
         :return: False if it didn't delete it, True if it was deleted
         """
-        request = requests.delete("{0}/{1}".format(self.keys_url, key_id),
-                                  headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.content == b"null":
-            return False
-        else:
-            return True
+        request = self._request("delete", "{0}/{1}".format(self.keys_url, key_id))
+        # a missing key is answered with 200 and a null body
+        return request.status_code == 200 and request.content != b"null"
 
+    @endpoint("get", "/projects", paginated=True)
     def getprojects(self, page=1, per_page=20):
         """Returns a dictionary of all the projects
 
         :return: list with the repo name, description, last activity,web url, ssh url, owner and if its public
         """
-        data = {'page': page, 'per_page': per_page}
 
-        request = requests.get(self.projects_url, params=data,
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
-
-    def getprojectsall(self, page=1, per_page=20):
+    @endpoint("get", "/projects/all", paginated=True)
+    def getprojectsall(self, page=1, per_page=20, **kwargs):
         """Returns a dictionary of all the projects for admins only
 
+        :param order_by: Optional, id, name, path, created_at, updated_at or last_activity_at
+        :param sort: Optional, asc or desc
         :return: list with the repo name, description, last activity,web url, ssh url, owner and if its public
         """
-        data = {'page': page, 'per_page': per_page}
-
-        request = requests.get("{0}/all".format(self.projects_url), params=data,
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/owned", paginated=True)
     def getprojectsowned(self, page=1, per_page=20):
         """Returns a dictionary of all the projects for the current user
 
         :return: list with the repo name, description, last activity, web url, ssh url, owner and if its public
         """
-        data = {'page': page, 'per_page': per_page}
-
-        request = requests.get("{0}/owned".format(self.projects_url), params=data,
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}", cache="projects")
     def getproject(self, project_id):
         """Get info for a project identified by id or namespace/project_name
 
         :param project_id: id or namespace/project_name of the project
         :return: False if not found, a dictionary if found
         """
-        if isinstance(project_id, basestring):
-            project_id = quote_plus(project_id)
-        request = requests.get("{0}/{1}".format(self.projects_url, project_id),
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    def lazyproject(self, project_id):
+        """Get a project that is only fetched when one of its fields is read
+
+        Pending lazy projects are fetched together, concurrently, when the first of them is read.
+
+        :param project_id: id of the project
+        :return: gitlab.lazy.LazyResource, read it like the dict of getproject
+        """
+        return self.loaders["project"].resource(project_id)
+
+    @endpoint("get", "/projects/{project_id}/events", paginated=True)
     def getprojectevents(self, project_id, page=1, per_page=20):
         """Get the project identified by id, events(commits)
 
         :param project_id: id of the project
         :return: False if no project with that id, a dictionary with the events if found
         """
-        data = {'page': page, 'per_page': per_page}
-        request = requests.get("{0}/{1}/events".format(self.projects_url, project_id), params=data, headers=self.headers,
-                               verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("post", "/projects", body=("name",))
     def createproject(self, name, **kwargs):
         """Creates a new project owned by the authenticated user.
 
@@ -369,22 +356,9 @@ class Gitlab(object):
         :param import_url:
         :return:
         """
-        data = {"name": name}
-
-        if kwargs:
-            data.update(kwargs)
-
-        request = requests.post(self.projects_url, headers=self.headers,
-                                data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 201:
-            return request.json()
-        elif request.status_code == 403:
-            if "Your own projects limit is 0" in request.text:
-                print(request.text)
-                return False
-        else:
-            return False
 
+    @invalidates("projects")
+    @endpoint("put", "/projects/{project_id}", result="bool")
     def editproject(self, project_id, **kwargs):
         """Edit an existing project.
 
@@ -400,23 +374,9 @@ class Gitlab(object):
         :param visibility_level:
         :return:
         """
-        data = {"id": project_id}
-
-        if kwargs:
-            data.update(kwargs)
-
-        request = requests.put("{0}/{1}".format(self.projects_url, project_id),
-                                            headers=self.headers, data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-
-        if request.status_code == 200:
-            return True
-        elif request.status_code == 400:
-            if "Your param's are invalid" in request.text:
-                print(request.text)
-                return False
-        else:
-            return False
 
+    @invalidates("projects")
+    @endpoint("post", "/projects/{project_id}/share", body=("group_id", "group_access"), result="bool")
     def shareproject(self, project_id, group_id, group_access):
         """Allow to share project with group.
 
@@ -425,25 +385,17 @@ class Gitlab(object):
         :param group_access: Level of permissions for sharing
         :return: True is success
         """
-        data = {"id": project_id, "group_id": group_id,
-            "group_access": group_access}
-
-        request = requests.post("{0}/{1}/share".format(self.projects_url, project_id),
-                                            headers=self.headers, data=data, verify=self.verify_ssl)
-        return request.status_code == 201
-
 
+    @invalidates("projects", "projecthooks", "deploykeys", "labels")
+    @endpoint("delete", "/projects/{project_id}", result="bool")
     def deleteproject(self, project_id):
         """Delete a project
 
         :param project_id: project id
         :return: always true
         """
-        request = requests.delete("{0}/{1}".format(self.projects_url, project_id),
-                                  headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return True
 
+    @endpoint("post", "/projects/user/{user_id}", body=("name",), result="bool")
     def createprojectuser(self, user_id, name, **kwargs):
         """Creates a new project owned by the specified user. Available only for admins.
 
@@ -461,19 +413,8 @@ class Gitlab(object):
         :param sudo:
         :return:
         """
-        data = {"name": name}
-
-        if kwargs:
-            data.update(kwargs)
-
-        request = requests.post("{0}/user/{1}".format(self.projects_url, user_id),
-                                headers=self.headers, data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 201:
-            return True
-        else:
-
-            return False
 
+    @endpoint("get", "/projects/{project_id}/members", query=("query",), paginated=True)
     def getprojectmembers(self, project_id, query=None, page=1, per_page=20):
         """Lists the members of a given project id
 
@@ -483,17 +424,9 @@ class Gitlab(object):
         :param per_page: Number of items to return per page (default is 20)
         :return: the projects memebers, false if there is an error
         """
-        data = {'page': page, 'per_page': per_page}
-        if query:
-            data['query'] = query
-        request = requests.get("{0}/{1}/members".format(self.projects_url, project_id),
-                               params=data, headers=self.headers,
-                               verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("post", "/projects/{project_id}/members",
+              body=("user_id", ("access_level", "access_level", projectaccess)), result="bool")
     def addprojectmember(self, project_id, user_id, access_level):
         """Adds a project member to a project
 
@@ -502,24 +435,9 @@ class Gitlab(object):
         :param access_level: access level, see gitlab help to know more
         :return: True if success
         """
-        if isinstance(access_level, basestring):
-            if access_level.lower() == "master":
-                access_level = 40
-            elif access_level.lower() == "developer":
-                access_level = 30
-            elif access_level.lower() == "reporter":
-                access_level = 20
-            else:
-                access_level = 10
-        data = {"id": project_id, "user_id": user_id, "access_level": access_level}
-
-        request = requests.post("{0}/{1}/members".format(self.projects_url, project_id),
-                                headers=self.headers, data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 201:
-            return True
-        else:
-            return False
 
+    @endpoint("put", "/projects/{project_id}/members/{user_id}",
+              body=(("access_level", "access_level", projectaccess),), result="bool")
     def editprojectmember(self, project_id, user_id, access_level):
         """Edit a project member
 
@@ -528,24 +446,8 @@ class Gitlab(object):
         :param access_level: access level
         :return: True if success
         """
-        if access_level.lower() == "master":
-            access_level = 40
-        elif access_level.lower() == "developer":
-            access_level = 30
-        elif access_level.lower() == "reporter":
-            access_level = 20
-        else:
-            access_level = 10
-        data = {"id": project_id, "user_id": user_id,
-                "access_level": access_level}
-
-        request = requests.put("{0}/{1}/members/{2}".format(self.projects_url, project_id, user_id),
-                               headers=self.headers, data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return True
-        else:
-            return False
 
+    @endpoint("delete", "/projects/{project_id}/members/{user_id}", result="bool")
     def deleteprojectmember(self, project_id, user_id):
         """Delete a project member
 
@@ -553,25 +455,16 @@ class Gitlab(object):
         :param user_id: user id
         :return: always true
         """
-        request = requests.delete("{0}/{1}/members/{2}".format(self.projects_url, project_id, user_id),
-                                  headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return True  # It always returns true
 
+    @endpoint("get", "/projects/{project_id}/hooks", paginated=True, cache="projecthooks")
     def getprojecthooks(self, project_id, page=1, per_page=20):
         """Get all the hooks from a project
 
         :param project_id: project id
         :return: the hooks
         """
-        data = {'page': page, 'per_page': per_page}
-        request = requests.get("{0}/{1}/hooks".format(self.projects_url, project_id), params=data,
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/hooks/{hook_id}", cache="projecthooks")
     def getprojecthook(self, project_id, hook_id):
         """Get a particular hook from a project
 
@@ -579,13 +472,9 @@ class Gitlab(object):
         :param hook_id: hook id
         :return: the hook
         """
-        request = requests.get("{0}/{1}/hooks/{2}".format(self.projects_url, project_id, hook_id),
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @invalidates("projecthooks")
+    @endpoint("post", "/projects/{project_id}/hooks", body=HOOK_FIELDS)
     def addprojecthook(self, project_id, url, push=False, issues=False, merge_requests=False, tag_push=False):
         """
         add a hook to a project
@@ -593,18 +482,9 @@ class Gitlab(object):
         :param url: url of the hook
         :return: True if success
         """
-        data = {"id": project_id, "url": url}
-        data['push_events'] = int(bool(push))
-        data['issues_events'] = int(bool(issues))
-        data['merge_requests_events'] = int(bool(merge_requests))
-        data['tag_push_events'] = int(bool(tag_push))
-        request = requests.post("{0}/{1}/hooks".format(self.projects_url, project_id),
-                                headers=self.headers, data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 201:
-            return request.json()
-        else:
-            return False
 
+    @invalidates("projecthooks")
+    @endpoint("put", "/projects/{project_id}/hooks/{hook_id}", body=HOOK_FIELDS, result="bool")
     def editprojecthook(self, project_id, hook_id, url, push=False,
             issues=False, merge_requests=False, tag_push=False):
         """
@@ -614,18 +494,9 @@ class Gitlab(object):
         :param url: the new url
         :return: True if success
         """
-        data = {"id": project_id, "hook_id": hook_id, "url": url}
-        data['push_events'] = int(bool(push))
-        data['issues_events'] = int(bool(issues))
-        data['merge_requests_events'] = int(bool(merge_requests))
-        data['tag_push_events'] = int(bool(tag_push))
-        request = requests.put("{0}/{1}/hooks/{2}".format(self.projects_url, project_id, hook_id),
-                               headers=self.headers, data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return True
-        else:
-            return False
 
+    @invalidates("projecthooks")
+    @endpoint("delete", "/projects/{project_id}/hooks/{hook_id}", result="bool")
     def deleteprojecthook(self, project_id, hook_id):
         """Delete a project hook
 
@@ -633,80 +504,49 @@ class Gitlab(object):
         :param hook_id: hook id
         :return: True if success
         """
-        request = requests.delete("{0}/{1}/hooks/{2}".format(self.projects_url, project_id, hook_id),
-                                  headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return True
-        else:
-            return False
 
+    @endpoint("get", "/hooks", paginated=True, cache="systemhooks", scoped=False)
     def getsystemhooks(self, page=1, per_page=20):
         """Get all system hooks
 
         :return: list of hooks
         """
-        data = {'page': page, 'per_page': per_page}
-        request = requests.get(self.hook_url, params=data, headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @invalidates("systemhooks", scoped=False)
+    @endpoint("post", "/hooks", body=("url",), result="bool")
     def addsystemhook(self, url):
         """Add a system hook
 
         :param url: url of the hook
         :return: True if success
         """
-        data = {"url": url}
-        request = requests.post(self.hook_url, headers=self.headers,
-                                data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 201:
-            return True
-        else:
-            return False
 
+    @endpoint("get", "/hooks/{hook_id}")
     def testsystemhook(self, hook_id):
         """Test a system hook
 
         :param hook_id: hook id
         :return: list of hooks
         """
-        data = {"id": hook_id}
-        request = requests.get(self.hook_url, data=data,
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @invalidates("systemhooks", scoped=False)
+    @endpoint("delete", "/hooks/{hook_id}", result="bool")
     def deletesystemhook(self, hook_id):
         """Delete a project hook
 
         :param hook_id: hook id
         :return: True if success
         """
-        data = {"id": hook_id}
-        request = requests.delete("{0}/{1}".format(self.hook_url, hook_id), data=data,
-                                  headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return True
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/repository/branches")
     def getbranches(self, project_id):
         """List all the branches from a project
 
         :param project_id: project id
         :return: the branches
         """
-        request = requests.get("{0}/{1}/repository/branches".format(self.projects_url, project_id),
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/repository/branches/{branch}")
     def getbranch(self, project_id, branch):
         """List one branch from a project
 
@@ -714,13 +554,8 @@ class Gitlab(object):
         :param branch: branch id
         :return: the branch
         """
-        request = requests.get("{0}/{1}/repository/branches/{2}".format(self.projects_url, project_id, branch),
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("post", "/projects/{project_id}/repository/branches", body=(("branch_name", "branch"), "ref"))
     def createbranch(self, project_id, branch, ref):
         """Create branch from commit SHA or existing branch
 
@@ -729,15 +564,8 @@ class Gitlab(object):
         :param ref: Create branch from commit SHA or existing branch
         :return: True if success, False if not
         """
-        data = {"id": project_id, "branch_name": branch, "ref": ref}
-
-        request = requests.post("{0}/{1}/repository/branches".format(self.projects_url, project_id),
-                                headers=self.headers, data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 201:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("delete", "/projects/{project_id}/repository/branches/{branch}", result="bool")
     def deletebranch(self, project_id, branch):
         """Delete branch by name
 
@@ -746,14 +574,7 @@ class Gitlab(object):
         :return: True if success, False if not
         """
 
-        request = requests.delete("{0}/{1}/repository/branches/{2}".format(self.projects_url, project_id, branch),
-                                  headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-
-        if request.status_code == 200:
-            return True
-        else:
-            return False
-
+    @endpoint("put", "/projects/{project_id}/repository/branches/{branch}/protect", result="bool")
     def protectbranch(self, project_id, branch):
         """Protect a branch from changes
 
@@ -761,13 +582,8 @@ class Gitlab(object):
         :param branch: branch id
         :return: True if success
         """
-        request = requests.put("{0}/{1}/repository/branches/{2}/protect".format(self.projects_url, project_id, branch),
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return True
-        else:
-            return False
 
+    @endpoint("put", "/projects/{project_id}/repository/branches/{branch}/unprotect", result="bool")
     def unprotectbranch(self, project_id, branch):
         """Stop protecting a branch
 
@@ -775,13 +591,9 @@ class Gitlab(object):
         :param branch: branch id
         :return: true if success
         """
-        request = requests.put("{0}/{1}/repository/branches/{2}/unprotect".format(self.projects_url, project_id, branch),
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return True
-        else:
-            return False
 
+    @invalidates("projects")
+    @endpoint("post", "/projects/{project_id}/fork/{from_project_id}", result="bool")
     def createforkrelation(self, project_id, from_project_id):
         """Create a fork relation. This DO NOT create a fork but only adds a link as fork the relation between 2 repositories
 
@@ -789,27 +601,17 @@ class Gitlab(object):
         :param from_project_id: from id
         :return: true if success
         """
-        data = {"id": project_id, "forked_from_id": from_project_id}
-        request = requests.post("{0}/{1}/fork/{2}".format(self.projects_url, project_id, from_project_id),
-                                headers=self.headers, data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 201:
-            return True
-        else:
-            return False
 
+    @invalidates("projects")
+    @endpoint("delete", "/projects/{project_id}/fork", result="bool")
     def removeforkrelation(self, project_id):
         """Remove an existing fork relation. this DO NOT remove the fork,only the relation between them
 
         :param project_id: project id
         :return: true if success
         """
-        request = requests.delete("{0}/{1}/fork".format(self.projects_url, project_id),
-                                  headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return True
-        else:
-            return False
 
+    @endpoint("post", "/projects/fork/{project_id}", success=(200, 201), result="bool")
     def createfork(self, project_id):
         """Forks a project into the user namespace of the authenticated user.
 
@@ -817,45 +619,22 @@ class Gitlab(object):
         :return: True if succeed
         """
 
-        request = requests.post("{0}/fork/{1}".format(self.projects_url, project_id),
-                                timeout=self.timeout, verify=self.verify_ssl)
-
-        if request.status_code == 200:
-            return True
-        else:
-            return False
-
+    @endpoint("get", "/issues", paginated=True)
     def getissues(self, page=1, per_page=20):
         """Return a global list of issues for your user.
 
         :return: list of issues
         """
-        data = {'page': page, 'per_page': per_page}
-
-        request = requests.get("{0}/api/v3/issues".format(self.host),
-                               params=data, headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/issues", paginated=True)
     def getprojectissues(self, project_id, page=1, per_page=20, **kwargs):
         """Return a list of issues for project id.
 
         :param: project_id: The id for the project.
         :return: list of issues
         """
-        kwargs['page'] = page
-        kwargs['per_page'] = per_page
-        data = kwargs
-
-        request = requests.get("{0}/{1}/issues".format(self.projects_url, project_id),
-                               params=data, headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/issues/{issue_id}")
     def getprojectissue(self, project_id, issue_id):
         """Get an specific issue id from a project
 
@@ -863,13 +642,8 @@ class Gitlab(object):
         :param issue_id: issue id
         :return: the issue
         """
-        request = requests.get("{0}/{1}/issues/{2}".format(self.projects_url, project_id, issue_id),
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("post", "/projects/{project_id}/issues", body=("title",))
     def createissue(self, project_id, title, **kwargs):
         """Create a new issue
 
@@ -877,16 +651,8 @@ class Gitlab(object):
         :param title: title of the issue
         :return: dict with the issue created
         """
-        data = {"id": id, "title": title}
-        if kwargs:
-            data.update(kwargs)
-        request = requests.post("{0}/{1}/issues".format(self.projects_url, project_id),
-                                headers=self.headers, data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 201:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("put", "/projects/{project_id}/issues/{issue_id}")
     def editissue(self, project_id, issue_id, **kwargs):
         """Edit an existing issue data
 
@@ -894,30 +660,16 @@ class Gitlab(object):
         :param issue_id: issue id
         :return: true if success
         """
-        data = {"id": project_id, "issue_id": issue_id}
-        if kwargs:
-            data.update(kwargs)
-        request = requests.put("{0}/{1}/issues/{2}".format(self.projects_url, project_id, issue_id),
-                               headers=self.headers, data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/milestones", paginated=True)
     def getmilestones(self, project_id, page=1, per_page=20):
         """Get the milestones for a project
 
         :param project_id: project id
         :return: the milestones
         """
-        data = {'page': page, 'per_page': per_page}
-        request = requests.get("{0}/{1}/milestones".format(self.projects_url, project_id), params=data,
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/milestones/{milestone_id}")
     def getmilestone(self, project_id, milestone_id):
         """Get an specific milestone
 
@@ -925,13 +677,8 @@ class Gitlab(object):
         :param milestone_id: milestone id
         :return: dict with the new milestone
         """
-        request = requests.get("{0}/{1}/milestones/{2}".format(self.projects_url, project_id, milestone_id),
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("post", "/projects/{project_id}/milestones", body=("title",))
     def createmilestone(self, project_id, title, **kwargs):
         """Create a new milestone
 
@@ -942,18 +689,8 @@ class Gitlab(object):
         :param sudo: do the request as another user
         :return: dict of the new issue
         """
-        data = {"id": project_id, "title": title}
-
-        if kwargs:
-            data.update(kwargs)
-
-        request = requests.post("{0}/{1}/milestones".format(self.projects_url, project_id),
-                                headers=self.headers, data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 201:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("put", "/projects/{project_id}/milestones/{milestone_id}")
     def editmilestone(self, project_id, milestone_id, **kwargs):
         """Edit an existing milestone
 
@@ -966,44 +703,25 @@ class Gitlab(object):
         :param sudo: do the request as another user
         :return: dict with the modified milestone
         """
-        data = {"id": project_id, "milestone_id": milestone_id}
-        if kwargs:
-            data.update(kwargs)
-        request = requests.put("{0}/{1}/milestones/{2}".format(self.projects_url, project_id, milestone_id),
-                               headers=self.headers, data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/milestones/{milestone_id}/issues", paginated=True)
     def getmilestoneissues(self, project_id, milestone_id, page=1, per_page=20):
         """Get the issues associated with a milestone
 
         :param project_id: project id
-        :param milestone_id: milestone id
-        :return: list of issues
-        """
-        data = {'page': page, 'per_page': per_page}
-        request = requests.get("{0}/{1}/milestones/{2}/issues".format(self.projects_url, project_id, milestone_id),
-                               params=data, headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
+        :param milestone_id: milestone id
+        :return: list of issues
+        """
 
+    @endpoint("get", "/projects/{project_id}/keys", cache="deploykeys")
     def getdeploykeys(self, project_id):
         """Get a list of a project's deploy keys.
 
         :param project_id: project id
         :return: the keys in a dictionary if success, false if not
         """
-        request = requests.get("{0}/{1}/keys".format(self.projects_url, project_id),
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/keys/{key_id}", cache="deploykeys")
     def getdeploykey(self, project_id, key_id):
         """Get a single key.
 
@@ -1011,13 +729,9 @@ class Gitlab(object):
         :param key_id: key id
         :return: the key in a dict if success, false if not
         """
-        request = requests.get("{0}/{1}/keys/{2}".format(self.projects_url, project_id, key_id),
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @invalidates("deploykeys")
+    @endpoint("post", "/projects/{project_id}/keys", body=("title", "key"))
     def adddeploykey(self, project_id, title, key):
         """Creates a new deploy key for a project.
 
@@ -1026,15 +740,9 @@ class Gitlab(object):
         :param key: the key itself
         :return: true if sucess, false if not
         """
-        data = {"id": project_id, "title": title, "key": key}
-
-        request = requests.post("{0}/{1}/keys".format(self.projects_url, project_id),
-                                headers=self.headers, data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 201:
-            return request.json()
-        else:
-            return False
 
+    @invalidates("deploykeys")
+    @endpoint("delete", "/projects/{project_id}/keys/{key_id}", result="bool")
     def deletedeploykey(self, project_id, key_id):
         """Delete a deploy key from a project
 
@@ -1042,13 +750,8 @@ class Gitlab(object):
         :param key_id: key id to delete
         :return: true if success, false if not
         """
-        request = requests.delete("{0}/{1}/keys/{2}".format(self.projects_url, project_id, key_id),
-                                  headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return True
-        else:
-            return False
 
+    @invalidates("groups", "namespaces", scoped=False)
     def creategroup(self, name, path, **kwargs):
         """Creates a new group
 
@@ -1063,31 +766,24 @@ class Gitlab(object):
         if kwargs:
             data.update(kwargs)
 
-        request = requests.post(self.groups_url, data=data,
-                                headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
+        request = self._request("post", self.groups_url, data=data)
         if request.status_code == 201:
             return request.json()
         else:
             msg = request.json()['message']
             raise exceptions.HttpError(msg)
 
+    @endpoint("get", "/groups/{group_id}", paginated=True, cache="groups", scoped=False)
     def getgroups(self, group_id=None, page=1, per_page=20):
         """Retrieve group information
 
         :param group_id: Specify a group. Otherwise, all groups are returned
         :return: list of groups
         """
-        data = {'page': page, 'per_page': per_page}
-
-        request = requests.get("{0}/{1}".format(self.groups_url,
-                                              group_id if group_id else ""),
-                               params=data, headers=self.headers, timeout=self.timeout,
-                               verify=self.verify_ssl, auth=self.auth)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @invalidates("groups", scoped=False)
+    @invalidates("projects", scope="project_id")
+    @endpoint("post", "/groups/{group_id}/projects/{project_id}")
     def moveproject(self, group_id, project_id):
         """Move a given project into a given group
 
@@ -1095,32 +791,19 @@ class Gitlab(object):
         :param project_id: ID of the project to be moved
         :return: dict of the updated project
         """
-        request = requests.post("{0}/{1}/projects/{2}".format(self.groups_url,
-                                                           group_id,
-                                                           project_id),
-                                headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 201:
-            return request.json()
-        else:
-            return False
 
-    def getmergerequests(self, project_id, page=1, per_page=20, state=None):
+    @endpoint("get", "/projects/{project_id}/merge_requests", query=("state",), paginated=True)
+    def getmergerequests(self, project_id, page=1, per_page=20, state=None, **kwargs):
         """Get all the merge requests for a project.
 
         :param project_id: ID of the project to retrieve merge requests for
         :param state: Passes merge request state to filter them by it
+        :param order_by: Optional, created_at or updated_at
+        :param sort: Optional, asc or desc
         :return: list with all the merge requests
         """
-        data = {'page': page, 'per_page': per_page, 'state': state}
-
-        request = requests.get('{0}/{1}/merge_requests'.format(self.projects_url, project_id),
-                               params=data, headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/merge_request/{mergerequest_id}")
     def getmergerequest(self, project_id, mergerequest_id):
         """Get information about a specific merge request.
 
@@ -1128,14 +811,8 @@ class Gitlab(object):
         :param mergerequest_id: ID of the merge request
         :return: dict of the merge request
         """
-        request = requests.get('{0}/{1}/merge_request/{2}'.format(self.projects_url, project_id, mergerequest_id),
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/merge_request/{mergerequest_id}/comments", paginated=True)
     def getmergerequestcomments(self, project_id, mergerequest_id, page=1, per_page=20):
         """Get comments of a merge request.
 
@@ -1143,15 +820,8 @@ class Gitlab(object):
         :param mergerequest_id: ID of the merge request
         :return: list of the comments
         """
-        data = {'page': page, 'per_page': per_page}
-        request = requests.get('{0}/{1}/merge_request/{2}/comments'.format(self.projects_url, project_id, mergerequest_id),
-                               params=data, headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/merge_request/{mergerequest_id}/changes")
     def getmergerequestchanges(self, project_id, mergerequest_id):
         """Get changes of a merge request.
 
@@ -1159,14 +829,10 @@ class Gitlab(object):
         :param mergerequest_id: ID of the merge request
         :return: information about the merge request including files and changes
         """
-        request = requests.get('{0}/{1}/merge_request/{2}/changes'.format(self.projects_url, project_id, mergerequest_id),
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("post", "/projects/{project_id}/merge_requests",
+              body=(("source_branch", "sourcebranch"), ("target_branch", "targetbranch"), "title", "assignee_id",
+                    "target_project_id"))
     def createmergerequest(self, project_id, sourcebranch, targetbranch,
                            title, target_project_id=None, assignee_id=None):
         """Create a new merge request.
@@ -1178,19 +844,8 @@ class Gitlab(object):
         :param assignee_id: Assignee user ID
         :return: dict of the new merge request
         """
-        data = {'source_branch': sourcebranch,
-                'target_branch': targetbranch,
-                'title': title,
-                'assignee_id': assignee_id,
-                'target_project_id': target_project_id}
-
-        request = requests.post('{0}/{1}/merge_requests'.format(self.projects_url, project_id),
-                                data=data, headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 201:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("put", "/projects/{project_id}/merge_request/{mergerequest_id}")
     def updatemergerequest(self, project_id, mergerequest_id, **kwargs):
         """Update an existing merge request.
 
@@ -1203,18 +858,8 @@ class Gitlab(object):
         :param closed: MR status.  True = closed
         :return: dict of the modified merge request
         """
-        data = {}
-
-        if kwargs:
-            data.update(kwargs)
-
-        request = requests.put('{0}/{1}/merge_request/{2}'.format(self.projects_url, project_id, mergerequest_id),
-                               data=data, headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("put", "/projects/{project_id}/merge_request/{mergerequest_id}/merge", body=("merge_commit_message",))
     def acceptmergerequest(self, project_id, mergerequest_id, merge_commit_message=None):
         """Update an existing merge request.
 
@@ -1224,15 +869,8 @@ class Gitlab(object):
         :return: dict of the modified merge request
         """
 
-        data = {'merge_commit_message': merge_commit_message}
-
-        request = requests.put('{0}/{1}/merge_request/{2}/merge'.format(self.projects_url, project_id, mergerequest_id),
-                               data=data, headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
-
+    @endpoint("post", "/projects/{project_id}/merge_request/{mergerequest_id}/comments", body=("note",),
+              result="bool")
     def addcommenttomergerequest(self, project_id, mergerequest_id, note):
         """Add a comment to a merge request.
 
@@ -1241,26 +879,16 @@ class Gitlab(object):
         :param note: Text of comment
         :return: True if success
         """
-        request = requests.post(
-            '{0}/{1}/merge_request/{2}/comments'.format(self.projects_url, project_id, mergerequest_id),
-            data={'note': note}, headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-
-        return request.status_code == 201
 
+    @endpoint("get", "/projects/{project_id}/snippets", paginated=True)
     def getsnippets(self, project_id, page=1, per_page=20):
         """Get all the snippets of the project identified by project_id
 
         :param project_id: project id to get the snippets from
         :return: list of dictionaries
         """
-        data = {'page': page, 'per_page': per_page}
-        request = requests.get("{0}/{1}/snippets".format(self.projects_url, project_id), params=data,
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/snippets/{snippet_id}")
     def getsnippet(self, project_id, snippet_id):
         """Get one snippet from a project
 
@@ -1268,13 +896,9 @@ class Gitlab(object):
         :param snippet_id: snippet id
         :return: dictionary
         """
-        request = requests.get("{0}/{1}/snippets/{2}".format(self.projects_url, project_id, snippet_id),
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("post", "/projects/{project_id}/snippets",
+              body=("title", "file_name", "code", ("visibility_level", "visibility_level", visibility)))
     def createsnippet(self, project_id, title, file_name, code, visibility_level=0):
         """Creates an snippet
 
@@ -1285,30 +909,33 @@ class Gitlab(object):
         :param visibility_level: snippets can be either private (0), internal(10) or public(20)
         :return: True if correct, false if failed
         """
-        data = {"id": project_id, "title": title, "file_name": file_name, "code": code}
-        if visibility_level in [0,10,20]:
-            data["visibility_level"] = visibility_level
-        request = requests.post("{0}/{1}/snippets".format(self.projects_url, project_id),
-                                data=data, verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-        if request.status_code == 201:
-            return request.json()
-        else:
-            return False
 
-    def getsnippetcontent(self, project_id, snippet_id):
+    def getsnippetcontent(self, project_id, snippet_id, fileobj=None, chunk_size=64 * 1024):
         """Get raw content of a given snippet
 
         :param project_id: project_id for the snippet
         :param snippet_id: snippet id
-        :return: the content of the snippet
-        """
-        request = requests.get("{0}/{1}/snippets/{2}/raw".format(self.projects_url, project_id, snippet_id),
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
+        :param fileobj: optional binary file object the content is streamed to instead of being returned
+        :param chunk_size: bytes held in memory at a time when streaming to fileobj
+        :return: the content of the snippet, True if it was written to fileobj
+        """
+        url = "{0}/{1}/snippets/{2}/raw".format(self.projects_url, segment(project_id), snippet_id)
+        request = self._request("get", url, stream=fileobj is not None)
+        try:
+            if request.status_code == 200:
+                if fileobj is None:
+                    return request.text
+                for chunk in request.iter_content(chunk_size):
+                    fileobj.write(chunk)
+                return True
+            else:
+                return False
+        finally:
+            # a streamed response holds its connection until it is closed
+            if fileobj is not None:
+                request.close()
 
+    @endpoint("delete", "/projects/{project_id}/snippets/{snippet_id}", result="bool")
     def deletesnippet(self, project_id, snippet_id):
         """Deletes a given snippet
 
@@ -1316,24 +943,16 @@ class Gitlab(object):
         :param snippet_id: snippet id
         :return: True if success
         """
-        request = requests.delete("{0}/{1}/snippets/{2}".format(self.projects_url, project_id, snippet_id),
-                                  headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        return request.status_code == 200
 
+    @endpoint("get", "/projects/{project_id}/repository/branches", paginated=True)
     def getrepositories(self, project_id, page=1, per_page=20):
         """Gets all repositories for a project id
 
         :param project_id: project id
         :return: list of repos
         """
-        data = {'page': page, 'per_page': per_page}
-        request = requests.get("{0}/{1}/repository/branches".format(self.projects_url, project_id), params=data,
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/repository/branches/{branch}")
     def getrepositorybranch(self, project_id, branch):
         """Get a single project repository branch.
 
@@ -1341,17 +960,8 @@ class Gitlab(object):
         :param branch: branch
         :return: dict of the branch
         """
-        request = requests.get("{0}/{1}/repository/branches/{2}".format(self.projects_url, project_id, branch),
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        elif request.status_code == 404:
-            if request.json()['message'] == "404 Branch does not exist Not Found":
-                # In the future we should raise an exception here
-                return False
-        else:
-            return False
 
+    @endpoint("put", "/projects/{project_id}/repository/branches/{branch}/protect")
     def protectrepositorybranch(self, project_id, branch):
         """Protects a single project repository branch. This is an idempotent function,
         protecting an already protected repository branch still returns a 200 OK status code.
@@ -1360,13 +970,8 @@ class Gitlab(object):
         :param branch: branch to protech
         :return: dict with the branch
         """
-        request = requests.put("{0}/{1}/repository/branches/{2}/protect".format(self.projects_url, project_id, branch),
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("put", "/projects/{project_id}/repository/branches/{branch}/unprotect")
     def unprotectrepositorybranch(self, project_id, branch):
         """Unprotects a single project repository branch. This is an idempotent function,
         unprotecting an already unprotected repository branch still returns a 200 OK status code.
@@ -1375,26 +980,14 @@ class Gitlab(object):
         :param branch: branch to unprotect
         :return: dict with the branch
         """
-        request = requests.put("{0}/{1}/repository/branches/{2}/unprotect".format(self.projects_url, project_id, branch),
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return
 
+    @endpoint("get", "/projects/{project_id}/repository/tags", paginated=True)
     def getrepositorytags(self, project_id, page=1, per_page=20):
         """Get a list of repository tags from a project, sorted by name in reverse alphabetical order.
 
         :param project_id: project id
         :return: list with all the tags
         """
-        data = {'page': page, 'per_page': per_page}
-        request = requests.get("{0}/{1}/repository/tags".format(self.projects_url, project_id), params=data,
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
     def createrepositorytag(self, project_id, tag_name, ref, message=None):
         """Creates new tag in the repository that points to the supplied ref
@@ -1407,14 +1000,42 @@ class Gitlab(object):
         """
 
         data = {"id": project_id, "tag_name": tag_name, "ref": ref, "message": message}
-        request = requests.post("{0}/{1}/repository/tags".format(self.projects_url, project_id), data=data,
-                                verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
+        request = self._request("post", "{0}/{1}/repository/tags".format(self.projects_url, segment(project_id)),
+                                data=data)
 
         if request.status_code == 201:
-            return request.json()
+            tag = request.json()
+            if self.tagindexes:
+                index = self.tagindexes.get(self._projectkey(project_id))
+                if index is not None:
+                    index.add(tag)
+            return tag
         else:
             return False
 
+    def gettagindex(self, project_id, ttl=60):
+        """Get the tag index of a project, shared by every call on this instance
+
+        :param project_id: project id
+        :param ttl: seconds during which the index is not checked against the server, only used on creation
+        :return: gitlab.tags.TagIndex
+        """
+        key = self._projectkey(project_id)
+        index = self.tagindexes.get(key)
+        if index is None:
+            index = self.tagindexes.setdefault(key, TagIndex(self, project_id, ttl=ttl))
+        return index
+
+    def _projectkey(self, project_id):
+        """Id of a project given by id or by path, as a string, the path itself if it can't be resolved"""
+        key = str(project_id)
+        if key.isdigit():
+            return key
+        if self.cache is not None and self.cache.scope(key) != key:
+            return self.cache.scope(key)
+        project = self.getproject(project_id)
+        return str(project["id"]) if project else key
+
     def addcommenttocommit(self, project_id, author, sha, path, line, note):
         """Adds an inline comment to a specific commit
         :param project_id project id
@@ -1433,8 +1054,8 @@ class Gitlab(object):
             "line_type": "new"
         }
 
-        request = requests.post("{0}/{1}/repository/commits/{2}/comments".format(self.projects_url, project_id, sha),
-                                headers=self.headers, data=data, verify=self.verify_ssl)
+        url = "{0}/{1}/repository/commits/{2}/comments".format(self.projects_url, segment(project_id), sha)
+        request = self._request("post", url, data=data)
         if request.status_code == 201:
             return True
         else:
@@ -1442,6 +1063,7 @@ class Gitlab(object):
             return False
 
 
+    @endpoint("get", "/projects/{project_id}/repository/commits", query=("ref_name",), paginated=True)
     def getrepositorycommits(self, project_id, ref_name=None, page=1, per_page=20):
         """Get a list of repository commits in a project.
 
@@ -1449,16 +1071,8 @@ class Gitlab(object):
         :param ref_name: The name of a repository branch or tag or if not given the default branch
         :return: list of commits
         """
-        data = {'page': page, 'per_page': per_page}
-        if ref_name is not None:
-            data.update({"ref_name": ref_name})
-        request = requests.get("{0}/{1}/repository/commits".format(self.projects_url, project_id),
-                               verify=self.verify_ssl, auth=self.auth, params=data, headers=self.headers, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/repository/commits/{sha1}")
     def getrepositorycommit(self, project_id, sha1):
         """Get a specific commit identified by the commit hash or name of a branch or tag.
 
@@ -1466,13 +1080,8 @@ class Gitlab(object):
         :param sha1: The commit hash or name of a repository branch or tag
         :return: dic tof commit
         """
-        request = requests.get("{0}/{1}/repository/commits/{2}".format(self.projects_url, project_id, sha1),
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/repository/commits/{sha1}/diff", cache="commits")
     def getrepositorycommitdiff(self, project_id, sha1):
         """Get the diff of a commit in a project
 
@@ -1480,13 +1089,8 @@ class Gitlab(object):
         :param sha1: The name of a repository branch or tag or if not given the default branch
         :return: dict with the diff
         """
-        request = requests.get("{0}/{1}/repository/commits/{2}/diff".format(self.projects_url, project_id, sha1),
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/repository/tree")
     def getrepositorytree(self, project_id, **kwargs):
         """Get a list of repository files and directories in a project.
 
@@ -1495,17 +1099,8 @@ class Gitlab(object):
         :param ref_name: The name of a repository branch or tag or if not given the default branch
         :return: dcit with the tree
         """
-        data = {}
-        if kwargs:
-            data.update(kwargs)
-
-        request = requests.get("{0}/{1}/repository/tree".format(self.projects_url, project_id), params=data,
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/repository/blobs/{sha1}", query=("filepath",), result="content")
     def getrawfile(self, project_id, sha1, filepath):
         """Get the raw file contents for a file by commit SHA and path.
 
@@ -1514,15 +1109,8 @@ class Gitlab(object):
         :param filepath: The path the file
         :return: raw file contents
         """
-        data = {"filepath": filepath}
-        request = requests.get("{0}/{1}/repository/blobs/{2}".format(self.projects_url, project_id, sha1),
-                               params=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout,
-                               headers=self.headers)
-        if request.status_code == 200:
-            return request.content
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/repository/raw_blobs/{sha1}", result="content")
     def getrawblob(self, project_id, sha1):
         """Get the raw file contents for a blob by blob SHA.
 
@@ -1530,27 +1118,17 @@ class Gitlab(object):
         :param sha1: the commit sha
         :return: raw blob
         """
-        request = requests.get("{0}/{1}/repository/raw_blobs/{2}".format(self.projects_url, project_id, sha1),
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.content
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/repository/contributors", paginated=True)
     def getcontributors(self, project_id, page=1, per_page=20):
         """Get repository contributors list
 
         :param: project_id: The ID of a project
         :return: list of contributors
         """
-        data = {'page': page, 'per_page': per_page}
-        request = requests.get("{0}/{1}/repository/contributors".format(self.projects_url, project_id), params=data,
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/repository/compare",
+              query=(("from", "from_id"), ("to", "to_id")))
     def compare_branches_tags_commits(self, project_id, from_id, to_id):
         """Compare branches, tags or commits
 
@@ -1559,30 +1137,14 @@ class Gitlab(object):
         :param to_id: the commit sha or branch name
         :return: commit list and diff between two branches tags or commits provided by name
         """
-        data = {"from": from_id, "to": to_id}
-        request = requests.get("{0}/{1}/repository/compare".format(self.projects_url, project_id),
-                               params=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout,
-                               headers=self.headers)
-
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/search/{search}", paginated=True)
     def searchproject(self, search, page=1, per_page=20):
         """Search for projects by name which are accessible to the authenticated user
 
         :param search: query to search for
         :return: list of results
         """
-        data = {'page': page, 'per_page': per_page}
-        request = requests.get("{0}/{1}".format(self.search_url, search), params=data,
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
     def getfilearchive(self, project_id, filepath=""):
         """Get an archive of the repository
@@ -1591,8 +1153,7 @@ class Gitlab(object):
         :param filepath: path to save the file to
         :return: True if the file was saved to the filepath
         """
-        request = requests.get("{0}/{1}/repository/archive".format(self.projects_url, project_id),
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
+        request = self._request("get", "{0}/{1}/repository/archive".format(self.projects_url, segment(project_id)))
         if request.status_code == 200:
             if filepath == "":
                 filepath = request.headers['content-disposition'].split(";")[1].split("=")[1].strip('"')
@@ -1605,16 +1166,16 @@ class Gitlab(object):
             msg = request.json()['message']
             raise exceptions.HttpError(msg)
 
+    @invalidates("groups", "namespaces", scoped=False)
+    @endpoint("delete", "/groups/{group_id}", result="bool")
     def deletegroup(self, group_id):
         """Deletes an group by ID
 
         :param group_id: id of the group to delete
         :return: True if it deleted, False if it couldn't. False could happen for several reasons, but there isn't a good way of differentiating them
         """
-        request = requests.delete("{0}/{1}".format(self.groups_url, group_id),
-                                  headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        return request.status_code == 200
 
+    @endpoint("get", "/groups/{group_id}/members", paginated=True)
     def getgroupmembers(self, group_id, page=1, per_page=20):
         """Lists the members of a given group id
 
@@ -1623,13 +1184,6 @@ class Gitlab(object):
         :param per_page: number of items to return per page (default is 20)
         :return: the group's members
         """
-        data = {'page': page, 'per_page': per_page}
-        request = requests.get("{0}/{1}/members".format(self.groups_url, group_id), params=data,
-                               headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
     def addgroupmember(self, group_id, user_id, access_level):
         """Adds a project member to a project
@@ -1654,8 +1208,7 @@ class Gitlab(object):
 
         data = {"id": group_id, "user_id": user_id, "access_level": access_level}
 
-        request = requests.post("{0}/{1}/members".format(self.groups_url, group_id),
-                                headers=self.headers, data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
+        request = self._request("post", "{0}/{1}/members".format(self.groups_url, segment(group_id)), data=data)
         return request.status_code == 201
 
     def editgroupmember(self, group_id, user_id, access_level):
@@ -1682,10 +1235,11 @@ class Gitlab(object):
 
         data = {"id": group_id, "user_id": user_id, "access_level": access_level}
 
-        request = requests.put("{0}/{1}/members/{2}".format(self.groups_url, group_id, user_id),
-                                headers=self.headers, data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
+        request = self._request("put", "{0}/{1}/members/{2}".format(self.groups_url, segment(group_id), user_id),
+                                data=data)
         return request.status_code == 200
 
+    @endpoint("delete", "/groups/{group_id}/members/{user_id}", result="bool")
     def deletegroupmember(self, group_id, user_id):
         """Delete a group member
 
@@ -1693,11 +1247,8 @@ class Gitlab(object):
         :param user_id: user id
         :return: always true
         """
-        request = requests.delete("{0}/{1}/members/{2}".format(self.groups_url, group_id, user_id),
-                                  headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return True  # It always returns true
 
+    @endpoint("post", "/groups/{group_id}/ldap_group_links", body=("cn", "group_access", "provider"), result="bool")
     def addldapgrouplink(self, group_id, cn, group_access, provider):
         """Add LDAP group link
 
@@ -1707,11 +1258,6 @@ class Gitlab(object):
         :param provider: LDAP provider for the LDAP group (when using several providers)
         :return: True if success
         """
-        data = {"id": group_id, "cn": cn, "group_access": group_access,
-            "provider": provider}
-        request = requests.post("{0}/{1}/ldap_group_links".format(self.groups_url, group_id),
-                                headers=self.headers, data=data, verify=self.verify_ssl)
-        return request.status_code == 201
 
     def deleteldapgrouplink(self, group_id, cn, provider=None):
         """Deletes a LDAP group link (for a specific LDAP provider if given)
@@ -1722,161 +1268,124 @@ class Gitlab(object):
         :return True if success
         """
         url = "{base}/{gid}/ldap_group_links/{provider}{cn}".format(
-                                base=self.groups_url, gid=group_id, cn=cn,
+                                base=self.groups_url, gid=segment(group_id), cn=cn,
                                 provider=("{0}/".format(provider)
                                     if provider else ""))
-        request = requests.delete(url, headers=self.headers,
-                                verify=self.verify_ssl)
+        request = self._request("delete", url)
         return request.status_code == 200
 
+    @endpoint("get", "/projects/{project_id}/issues/{issue_id}/notes", paginated=True)
     def getissuewallnotes(self, project_id, issue_id, page=1, per_page=20):
         """Get the notes from the wall of a issue
 
         """
-        data = {'page': page, 'per_page': per_page}
-        request = requests.get("{0}/{1}/issues/{2}/notes".format(self.projects_url, project_id, issue_id), params=data,
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/issues/{issue_id}/notes/{note_id}")
     def getissuewallnote(self, project_id, issue_id, note_id):
         """Get one note from the wall of the issue
 
         """
-        request = requests.get("{0}/{1}/issues/{2}/notes/{3}".format(self.projects_url, project_id, issue_id, note_id),
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("post", "/projects/{project_id}/issues/{issue_id}/notes", body=(("body", "content"),))
     def createissuewallnote(self, project_id, issue_id, content):
         """Create a new note
 
         """
-        data = {"body": content}
-        request = requests.post("{0}/{1}/issues/{2}/notes".format(self.projects_url, project_id, issue_id),
-                                verify=self.verify_ssl, auth=self.auth, headers=self.headers, data=data, timeout=self.timeout)
-
-        if request.status_code == 201:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/snippets/{snippet_id}/notes", paginated=True)
     def getsnippetwallnotes(self, project_id, snippet_id, page=1, per_page=20):
         """Get the notes from the wall of a snippet
 
         """
-        data = {'page': page, 'per_page': per_page}
-        request = requests.get("{0}/{1}/snippets/{2}/notes".format(self.projects_url, project_id, snippet_id),
-                               params=data, verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/snippets/{snippet_id}/notes/{note_id}")
     def getsnippetwallnote(self, project_id, snippet_id, note_id):
         """Get one note from the wall of the snippet
 
         """
-        request = requests.get("{0}/{1}/snippets/{2}/notes/{3}".format(self.projects_url, project_id, snippet_id, note_id),
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("post", "/projects/{project_id}/snippets/{snippet_id}/notes", body=(("body", "content"),))
     def createsnippetewallnote(self, project_id, snippet_id, content):
         """Create a new note
 
         """
-        data = {"body": content}
-        request = requests.post("{0}/{1}/snippets/{2}/notes".format(self.projects_url, project_id, snippet_id),
-                                verify=self.verify_ssl, auth=self.auth, headers=self.headers, data=data, timeout=self.timeout)
-
-        if request.status_code == 201:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/merge_requests/{merge_request_id}/notes", paginated=True)
     def getmergerequestwallnotes(self, project_id, merge_request_id, page=1, per_page=20):
         """Get the notes from the wall of a merge request
 
         """
-        data = {'page': page, 'per_page': per_page}
-        request = requests.get("{0}/{1}/merge_requests/{2}/notes".format(self.projects_url, project_id, merge_request_id),
-                               params=data, verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/projects/{project_id}/merge_requests/{merge_request_id}/notes/{note_id}")
     def getmergerequestwallnote(self, project_id, merge_request_id, note_id):
         """Get one note from the wall of the merge request
 
         """
-        request = requests.get("{0}/{1}/merge_requests/{2}/notes/{3}".format(self.projects_url, project_id,
-                                                                         merge_request_id, note_id),
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("post", "/projects/{project_id}/merge_requests/{merge_request_id}/notes",
+              body=(("body", "content"),))
     def createmergerequestewallnote(self, project_id, merge_request_id, content):
         """Create a new note
 
         """
-        data = {"body": content}
-        request = requests.post("{0}/{1}/merge_requests/{2}/notes".format(self.projects_url, project_id, merge_request_id),
-                                verify=self.verify_ssl, auth=self.auth, headers=self.headers, data=data, timeout=self.timeout)
-
-        if request.status_code == 201:
-            return request.json()
-        else:
-            return False
 
-    def createfile(self, project_id, file_path, branch_name, encoding, content, commit_message):
+    def createfile(self, project_id, file_path, branch_name, encoding, content, commit_message, content_path=None):
         """Creates a new file in the repository
 
         :param project_id: project id
         :param file_path: Full path to new file. Ex. lib/class.rb
         :param branch_name: The name of branch
-        :param content: File content
+        :param content: File content, either a string or a file object opened in binary mode
         :param commit_message: Commit message
+        :param content_path: Optional local file to upload instead of content
         :return: true if success, false if not
         """
         data = {"file_path": file_path, "branch_name": branch_name, "encoding": encoding,
-                "content": content, "commit_message": commit_message}
-        request = requests.post("{0}/{1}/repository/files".format(self.projects_url, project_id),
-                                verify=self.verify_ssl, auth=self.auth, headers=self.headers, data=data, timeout=self.timeout)
+                "commit_message": commit_message}
+        request = self._sendfile("post", "{0}/{1}/repository/files".format(self.projects_url, segment(project_id)),
+                                 data, content, content_path)
         return request.status_code == 201
 
-    def updatefile(self, project_id, file_path, branch_name, content, commit_message):
+    def updatefile(self, project_id, file_path, branch_name, content, commit_message, content_path=None, encoding=None):
         """Updates an existing file in the repository
 
         :param project_id: project id
         :param file_path: Full path to new file. Ex. lib/class.rb
         :param branch_name: The name of branch
-        :param content: File content
+        :param content: File content, either a string or a file object opened in binary mode
         :param commit_message: Commit message
+        :param content_path: Optional local file to upload instead of content
+        :param encoding: Optional encoding of content, text or base64
         :return: true if success, false if not
         """
         data = {"file_path": file_path, "branch_name": branch_name,
-                "content": content, "commit_message": commit_message}
-        request = requests.put("{0}/{1}/repository/files".format(self.projects_url, project_id),
-                               headers=self.headers, data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
+                "commit_message": commit_message}
+        if encoding is not None:
+            data["encoding"] = encoding
+        request = self._sendfile("put", "{0}/{1}/repository/files".format(self.projects_url, segment(project_id)),
+                                 data, content, content_path)
 
         return request.status_code == 200
 
+    def _sendfile(self, verb, url, data, content, content_path):
+        """Send a repository file request. Content given as a file object or a local path is
+        streamed base64 encoded in a json body instead of being loaded in memory
+        """
+        if content_path is None and not hasattr(content, "read"):
+            data["content"] = content
+            return self._request(verb, url, data=data)
+
+        data["encoding"] = "base64"
+        headers = dict(self.headers)
+        headers["Content-Type"] = "application/json"
+        fileobj = open(content_path, "rb") if content_path is not None else content
+        try:
+            return self._request(verb, url, headers=headers, data=Base64JSONBody(data, fileobj).body())
+        finally:
+            if content_path is not None:
+                fileobj.close()
+
+    @endpoint("get", "/projects/{project_id}/repository/files", body=("file_path", "ref"))
     def getfile(self, project_id, file_path, ref):
         """Allows you to receive information about file in repository like name, size, content.
         Note that file content is Base64 encoded.
@@ -1886,14 +1395,9 @@ class Gitlab(object):
         :param ref: The name of branch, tag or commit
         :return:
         """
-        data = {"file_path": file_path, "ref": ref}
-        request = requests.get("{0}/{1}/repository/files".format(self.projects_url, project_id),
-                               headers=self.headers, data=data, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("delete", "/projects/{project_id}/repository/files", body=("file_path", "branch_name", "commit_message"),
+              result="bool")
     def deletefile(self, project_id, file_path, branch_name, commit_message):
         """Deletes existing file in the repository
 
@@ -1903,13 +1407,65 @@ class Gitlab(object):
         :param commit_message: Commit message
         :return: true if success, false if not
         """
-        data = {"file_path": file_path, "branch_name": branch_name,
-                "commit_message": commit_message}
-        request = requests.delete("{0}/{1}/repository/files".format(self.projects_url, project_id),
-                                  headers=self.headers, data=data,
-                                  verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-        return request.status_code == 200
 
+    def createcommit(self, project_id, branch_name, commit_message, actions, fallback=True, **kwargs):
+        """Creates a single commit with several file changes
+
+        Each action is a dict with the keys action (create, update, delete or move), file_path and,
+        depending on the action, previous_path, content and encoding (text or base64).
+        Servers without the commits API get the actions applied one by one, one commit per file.
+
+        :param project_id: project id
+        :param branch_name: The name of branch
+        :param commit_message: Commit message
+        :param actions: list of actions
+        :param fallback: apply the actions one by one if the server lacks the commits API
+        :param author_email: Author email of the commit
+        :param author_name: Author name of the commit
+        :return: dict of the commit, True if it was applied one by one, false if not
+        """
+        data = {"branch_name": branch_name, "commit_message": commit_message, "actions": actions}
+        if kwargs:
+            data.update(kwargs)
+        request = self._request("post", "{0}/{1}/repository/commits".format(self.projects_url, segment(project_id)),
+                                json=data)
+        if request.status_code == 201:
+            return request.json()
+        elif request.status_code in (404, 405) and fallback:
+            return self._applyactions(project_id, branch_name, commit_message, actions)
+        else:
+            return False
+
+    def _applyactions(self, project_id, branch_name, commit_message, actions):
+        """Apply commit actions with the single file endpoints, stops at the first failure"""
+        for action in actions:
+            kind = action["action"]
+            encoding = action.get("encoding", "text")
+            if kind == "create":
+                done = self.createfile(project_id, action["file_path"], branch_name, encoding,
+                                       action["content"], commit_message)
+            elif kind == "update":
+                done = self.updatefile(project_id, action["file_path"], branch_name,
+                                       action["content"], commit_message, encoding=encoding)
+            elif kind == "delete":
+                done = self.deletefile(project_id, action["file_path"], branch_name, commit_message)
+            elif kind == "move":
+                content = action.get("content")
+                if content is None:
+                    previous = self.getfile(project_id, action["previous_path"], branch_name)
+                    if not previous:
+                        return False
+                    content, encoding = previous["content"], previous["encoding"]
+                done = (self.createfile(project_id, action["file_path"], branch_name, encoding,
+                                        content, commit_message) and
+                        self.deletefile(project_id, action["previous_path"], branch_name, commit_message))
+            else:
+                raise ValueError("Unknown commit action: {0}".format(kind))
+            if not done:
+                return False
+        return True
+
+    @endpoint("put", "/projects/{project_id}/services/gitlab-ci", body=("token", "project_url"), result="bool")
     def setgitlabciservice(self, project_id, token, project_url):
         """Set GitLab CI service for project
 
@@ -1918,36 +1474,24 @@ class Gitlab(object):
         :param project_url: CI project url
         :return: true if success, false if not
         """
-        data = {"token": token, "project_url": project_url}
-        request = requests.put("{0}/{1}/services/gitlab-ci".format(self.projects_url, project_id),
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, data=data, timeout=self.timeout)
-
-        return request.status_code == 200
 
+    @endpoint("delete", "/projects/{project_id}/services/gitlab-ci", result="bool")
     def deletegitlabciservice(self, project_id, token, project_url):
         """Delete GitLab CI service settings
 
         :return: true if success, false if not
         """
-        request = requests.delete("{0}/{1}/services/gitlab-ci".format(self.projects_url, project_id),
-                                  headers=self.headers, verify=self.verify_ssl, auth=self.auth, timeout=self.timeout)
-
-        return request.status_code == 200
 
+    @endpoint("get", "/projects/{project_id}/labels", cache="labels")
     def getlabels(self, project_id):
         """Get all labels for given project.
 
         :param project_id: The ID of a project
         :return: list of the labels
         """
-        request = requests.get("{0}/{1}/labels".format(self.projects_url, project_id),
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @invalidates("labels")
+    @endpoint("post", "/projects/{project_id}/labels", body=("name", "color"))
     def createlabel(self, project_id, name, color):
         """Creates a new label for given repository with given name and color.
 
@@ -1957,14 +1501,8 @@ class Gitlab(object):
         :return:
         """
 
-        data = {"name": name, "color": color}
-        request = requests.post("{0}/{1}/labels".format(self.projects_url, project_id), data=data,
-                                verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-        if request.status_code == 201:
-            return request.json()
-        else:
-            return False
-
+    @invalidates("labels")
+    @endpoint("delete", "/projects/{project_id}/labels", body=("name",), result="bool")
     def deletelabel(self, project_id, name):
         """Deletes a label given by its name.
 
@@ -1972,13 +1510,9 @@ class Gitlab(object):
         :param name: The name of the label
         :return: True if succeed
         """
-        data = {"name": name}
-
-        request = requests.delete("{0}/{1}/labels".format(self.projects_url, project_id), data=data,
-                                  verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-
-        return request.status_code == 200
 
+    @invalidates("labels")
+    @endpoint("put", "/projects/{project_id}/labels", body=("name", "new_name", "color"))
     def editlabel(self, project_id, name, new_name=None, color=None):
         """Updates an existing label with new name or now color. At least one parameter is required, to update the label.
 
@@ -1986,16 +1520,8 @@ class Gitlab(object):
         :param name: The name of the label
         :return: True if succeed
         """
-        data = {"name": name, "new_name": new_name, "color": color}
-
-        request = requests.put("{0}/{1}/labels".format(self.projects_url, project_id), data=data,
-                               verify=self.verify_ssl, auth=self.auth, headers=self.headers, timeout=self.timeout)
-
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
+    @endpoint("get", "/namespaces", query=("search",), paginated=True, cache="namespaces", scoped=False)
     def getnamespaces(self, search=None, page=1, per_page=20):
         """Return a namespace list
 
@@ -2004,15 +1530,6 @@ class Gitlab(object):
         :param per_page: Number of items to return per page (default is 20)
         :return: returs a list of namespaces, false if there is an error
         """
-        data = {'page': page, 'per_page': per_page}
-        if search:
-            data['search'] = search
-        request = requests.get(self.namespaces_url, params=data,
-                               headers=self.headers, verify=self.verify_ssl)
-        if request.status_code == 200:
-            return request.json()
-        else:
-            return False
 
     @staticmethod
     def getall(fn, *args, **kwargs):
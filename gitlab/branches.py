@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""
+Local index of the branches of many projects, and cleanup of the stale ones
+"""
+
+import fnmatch
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from . import exceptions
+from .fleet import ChangeReport, RateLimiter, parallel
+from .utils import timestamp
+
+Branch = namedtuple("Branch", ["project_id", "project", "name", "sha", "committed", "protected"])
+
+_SELECT = ("SELECT b.project_id, p.path, b.name, b.sha, b.committed, b.protected FROM branches b "
+           "JOIN projects p ON p.id = b.project_id ")
+
+
+def _branch(row):
+    return Branch(row[0], row[1], row[2], row[3], row[4], bool(row[5]))
+
+
+def _committed(branch):
+    commit = branch.get("commit") or {}
+    return timestamp(commit.get("committed_date") or commit.get("authored_date") or commit.get("created_at"))
+
+
+class BranchInventory(object):
+    """Branches of every project kept in a sqlite file
+
+    A project's branches are only fetched again when its last_activity_at
+    changed since the previous refresh, the projects are fetched concurrently.
+    """
+
+    def __init__(self, git, path, workers=8, timeout=30, per_page=100):
+        """
+
+        :param git: Gitlab instance
+        :param path: path of the sqlite database, created if missing
+        :param workers: number of projects fetched at the same time
+        :param timeout: seconds to wait for a lock held by another process
+        :param per_page: projects requested per page when listing them
+        """
+        self.git = git
+        self.path = path
+        self.workers = workers
+        self.timeout = timeout
+        self.per_page = per_page
+        self._local = threading.local()
+        db = self._db()
+        with db:
+            db.execute("CREATE TABLE IF NOT EXISTS projects (id INTEGER PRIMARY KEY, path TEXT, "
+                       "default_branch TEXT, last_activity TEXT, refreshed REAL)")
+            db.execute("CREATE TABLE IF NOT EXISTS branches (project_id INTEGER, name TEXT, sha TEXT, "
+                       "committed REAL, protected INTEGER, PRIMARY KEY (project_id, name))")
+            db.execute("CREATE INDEX IF NOT EXISTS branches_name ON branches (name)")
+            db.execute("CREATE INDEX IF NOT EXISTS branches_committed ON branches (committed)")
+
+    def _db(self):
+        # sqlite connections can be shared neither between threads nor across a fork
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.timeout)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def _projects(self):
+        """Every project, None if a page can't be read"""
+        projects = []
+        page = 1
+        while True:
+            results = self.git.getprojectsall(page=page, per_page=self.per_page)
+            if results is False:
+                return None
+            projects.extend(results)
+            if len(results) < self.per_page:
+                return projects
+            page += 1
+
+    def refresh(self, projects=None, force=False):
+        """Fetch the branches of the projects that changed
+
+        :param projects: list of project dicts (id, path_with_namespace, default_branch, last_activity_at) to
+            refresh, the other indexed projects are left as they were. Defaults to every project of getprojectsall,
+            indexed projects missing from it are then dropped
+        :param force: fetch every project even if its last_activity_at did not change
+        :return: (refreshed, failed) lists of project ids, the branches of failed projects are left as they were
+        :raise HttpError: if the projects could not be listed, nothing is changed then
+        """
+        listed = projects is None
+        if listed:
+            projects = self._projects()
+            if projects is None:
+                raise exceptions.HttpError("The projects could not be listed")
+        projects = dict((project["id"], project) for project in projects)
+        db = self._db()
+        known = dict(db.execute("SELECT id, last_activity FROM projects"))
+        todo = [project_id for project_id, project in projects.items()
+                if force or project_id not in known or known[project_id] != project.get("last_activity_at")]
+
+        refreshed, failed = [], []
+        for project_id, branches in parallel(self.git.getbranches, todo, workers=self.workers):
+            if branches is False:
+                failed.append(project_id)
+                continue
+            project = projects[project_id]
+            with db:
+                db.execute("DELETE FROM branches WHERE project_id = ?", (project_id,))
+                db.executemany("INSERT INTO branches VALUES (?, ?, ?, ?, ?)", [
+                    (project_id, branch["name"], (branch.get("commit") or {}).get("id"), _committed(branch),
+                     int(bool(branch.get("protected")))) for branch in branches])
+                db.execute("INSERT OR REPLACE INTO projects VALUES (?, ?, ?, ?, ?)", (
+                    project_id, project.get("path_with_namespace"), project.get("default_branch"),
+                    project.get("last_activity_at"), time.time()))
+            refreshed.append(project_id)
+
+        # only the complete list of projects tells which ones were deleted
+        gone = [(project_id,) for project_id in known if project_id not in projects] if listed else []
+        if gone:
+            with db:
+                db.executemany("DELETE FROM branches WHERE project_id = ?", gone)
+                db.executemany("DELETE FROM projects WHERE id = ?", gone)
+        return refreshed, failed
+
+    def branches(self, project_id):
+        """Indexed branches of a project
+
+        :param project_id: project id
+        :return: list of Branch
+        """
+        return [_branch(row) for row in self._db().execute(_SELECT + "WHERE b.project_id = ? ORDER BY b.name",
+                                                           (project_id,))]
+
+    def find(self, name):
+        """Projects having a branch
+
+        :param name: branch name
+        :return: list of Branch
+        """
+        return [_branch(row) for row in self._db().execute(_SELECT + "WHERE b.name = ? ORDER BY b.project_id",
+                                                           (name,))]
+
+    def protected(self, name):
+        """Projects where a branch is protected
+
+        :param name: branch name
+        :return: list of Branch
+        """
+        return [branch for branch in self.find(name) if branch.protected]
+
+    def stale(self, days=90, now=None, include_protected=False):
+        """Branches whose head did not move for a while, default branches excluded
+
+        :param days: age of the head commit in days
+        :param now: reference timestamp, defaults to now
+        :param include_protected: also return protected branches
+        :return: list of Branch, oldest first
+        """
+        cutoff = (now if now is not None else time.time()) - days * 86400
+        query = _SELECT + "WHERE b.committed < ? AND b.name IS NOT p.default_branch"
+        if not include_protected:
+            query += " AND b.protected = 0"
+        return [_branch(row) for row in self._db().execute(query + " ORDER BY b.committed", (cutoff,))]
+
+    def __len__(self):
+        return self._db().execute("SELECT COUNT(*) FROM branches").fetchone()[0]
+
+
+class CleanupJournal(object):
+    """Append only file of the branches deleted by BranchCleaner
+
+    A cleanup run again with the same journal skips the branches it already
+    deleted at the same head, so an interrupted run can be resumed.
+    """
+
+    def __init__(self, path):
+        """
+
+        :param path: json lines file, created on the first record
+        """
+        self.path = path
+        self.done = set()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as journal:
+                for line in journal:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # a line cut by an interrupted write
+                        continue
+                    if entry.get("status") == "done":
+                        self.done.add((entry["project_id"], entry["branch"], entry["sha"]))
+
+    def record(self, project_id, branch, sha, status, reason):
+        """Append an entry
+
+        :param project_id: project id
+        :param branch: branch name
+        :param sha: head the branch had when it was planned
+        :param status: done or failed
+        :param reason: why it was deleted
+        :return: Nothing
+        """
+        line = json.dumps({"project_id": project_id, "branch": branch, "sha": sha, "status": status,
+                           "reason": reason, "time": time.time()})
+        with self._lock:
+            with open(self.path, "a") as journal:
+                journal.write(line + "\n")
+            if status == "done":
+                self.done.add((project_id, branch, sha))
+
+    def __contains__(self, key):
+        return key in self.done
+
+
+class BranchCleaner(object):
+    """Deletes merged or stale branches of many projects
+
+    Default, protected and kept branches are never deleted. A branch is deleted
+    when its head is older than days or, with merged, when it has no commit
+    missing from the default branch. Right before deleting, the head of the
+    branch is read again and the branch is skipped if it moved since the plan.
+    """
+
+    def __init__(self, git, days=90, merged=True, keep=(), workers=8, rate=None, journal=None):
+        """
+
+        :param git: Gitlab instance
+        :param days: delete branches whose head commit is older than this, None to only delete merged ones
+        :param merged: delete branches fully merged into the default branch
+        :param keep: fnmatch patterns of branch names never deleted, ie: release/*
+        :param workers: number of projects handled at the same time
+        :param rate: maximum number of calls per second to compare and delete, None for no limit
+        :param journal: optional CleanupJournal to skip branches deleted by a previous run and record deletions
+        """
+        self.git = git
+        self.days = days
+        self.merged = merged
+        self.keep = list(keep)
+        self.workers = workers
+        self.ratelimit = RateLimiter(rate)
+        self.journal = journal
+
+    def _kept(self, name):
+        return any(fnmatch.fnmatchcase(name, pattern) for pattern in self.keep)
+
+    def plan(self, project_id, default_branch, branches, now=None):
+        """Branches of a project to delete
+
+        :param project_id: project id
+        :param default_branch: name of the default branch of the project
+        :param branches: branch dicts as returned by getbranches
+        :param now: reference timestamp, defaults to now
+        :return: list of (branch name, head sha, reason)
+        """
+        cutoff = None
+        if self.days is not None:
+            cutoff = (now if now is not None else time.time()) - self.days * 86400
+        plan = []
+        for branch in branches:
+            name = branch["name"]
+            if name == default_branch or branch.get("protected") or self._kept(name):
+                continue
+            sha = (branch.get("commit") or {}).get("id")
+            if self.journal is not None and (project_id, name, sha) in self.journal:
+                continue
+            committed = _committed(branch)
+            if cutoff is not None and committed is not None and committed < cutoff:
+                plan.append((name, sha, "stale"))
+            elif self.merged and default_branch:
+                self.ratelimit.wait()
+                compare = self.git.compare_branches_tags_commits(project_id, default_branch, name)
+                if compare and not compare.get("commits"):
+                    plan.append((name, sha, "merged"))
+        return plan
+
+    def _delete(self, project_id, name, sha):
+        current = self.git.getbranch(project_id, name)
+        if not current or current.get("protected") or (current.get("commit") or {}).get("id") != sha:
+            return "skipped"
+        self.ratelimit.wait()
+        return "done" if self.git.deletebranch(project_id, name) else "failed"
+
+    def clean(self, project_ids, dry_run=False, now=None):
+        """Delete the branches matching the policy
+
+        :param project_ids: ids of the projects
+        :param dry_run: only report the branches that would be deleted
+        :param now: reference timestamp for the age of the branches, defaults to now
+        :return: ChangeReport with one delete change per branch, detail is the reason
+        """
+        report = ChangeReport()
+
+        def cleanproject(project_id):
+            try:
+                project = self.git.getproject(project_id)
+                branches = self.git.getbranches(project_id) if project else False
+                if branches is False:
+                    report.add(project_id, "fetch", None, "failed")
+                    return
+                plan = self.plan(project_id, project.get("default_branch"), branches, now)
+            except Exception as error:
+                report.add(project_id, "fetch", None, "failed", error)
+                return
+            for name, sha, reason in plan:
+                if dry_run:
+                    report.add(project_id, "delete", name, "planned", reason)
+                    continue
+                try:
+                    status = self._delete(project_id, name, sha)
+                except Exception:
+                    status = "failed"
+                if self.journal is not None and status != "skipped":
+                    self.journal.record(project_id, name, sha, status, reason)
+                report.add(project_id, "delete", name, status, reason)
+
+        for _ in parallel(cleanproject, project_ids, workers=self.workers):
+            pass
+        return report
@@ -0,0 +1,448 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in read-through response cache for the Gitlab class
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+# Endpoints cached out of the box and their time to live in seconds
+DEFAULT_TTL = {
+    "getnamespaces": 300,
+    "getlabels": 300,
+    "getgroups": 300,
+    "currentuser": 300,
+    "getdeploykeys": 300,
+    "getprojecthooks": 300,
+}
+
+
+class MemoryBackend(object):
+    """Process local LRU storage bounded by entry count and encoded size"""
+
+    def __init__(self, max_entries=1024, max_bytes=16 * 1024 * 1024):
+        """
+
+        :param max_entries: maximum number of entries before evicting the least recently used
+        :param max_bytes: maximum total size of the encoded entries
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.RLock()
+
+    def get(self, key):
+        """Return the encoded value for key
+
+        :param key: cache key
+        :return: the encoded value, None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                self._forget(key, entry)
+                return None
+            # re-insert to mark it as the most recently used
+            self._entries[key] = entry
+            return entry[2]
+
+    def set(self, key, encoded, expires, tag):
+        """Store an encoded value
+
+        :param key: cache key
+        :param encoded: json encoded value
+        :param expires: timestamp after which the value is stale
+        :param tag: (group, scope) tuple used for invalidation
+        :return: Nothing
+        """
+        if len(encoded) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._forget(key, old)
+            self._entries[key] = (expires, tag, encoded)
+            self._tags.setdefault(tag, set()).add(key)
+            self.size += len(encoded)
+            while self._entries and (len(self._entries) > self.max_entries or self.size > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._forget(oldest, self._entries.pop(oldest))
+
+    def invalidate(self, group, scope=None):
+        """Drop entries of a group
+
+        :param group: group name
+        :param scope: scope of the entries, None for the whole group
+        :return: number of entries dropped
+        """
+        with self._lock:
+            if scope is None:
+                tags = [tag for tag in self._tags if tag[0] == group]
+            else:
+                tags = [(group, scope), (group, None)]
+            dropped = 0
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._forget(key, self._entries.pop(key))
+                    dropped += 1
+            return dropped
+
+    def clear(self):
+        """Drop every entry
+
+        :return: Nothing
+        """
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _forget(self, key, entry):
+        self.size -= len(entry[2])
+        keys = self._tags.get(entry[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tags[entry[1]]
+
+
+class SQLiteBackend(object):
+    """Storage shared by every process pointing at the same sqlite file
+
+    The database runs in WAL mode so readers in other processes are not blocked
+    by a writer, and entries survive restarts. When full, the entries written
+    the longest time ago are evicted first. The number and total size of the
+    entries are kept up to date by triggers in a one row counters table, so
+    writes check the bounds without scanning the entries.
+    """
+
+    def __init__(self, path, max_entries=65536, max_bytes=256 * 1024 * 1024, timeout=30):
+        """
+
+        :param path: path of the sqlite database, created if missing
+        :param max_entries: maximum number of entries
+        :param max_bytes: maximum total size of the encoded entries
+        :param timeout: seconds to wait for a lock held by another process
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._local = threading.local()
+        db = self._db()
+        with db:
+            db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, expires REAL, grp TEXT, "
+                       "scope TEXT, value TEXT, size INTEGER, written REAL)")
+            db.execute("CREATE INDEX IF NOT EXISTS entries_tag ON entries (grp, scope)")
+            db.execute("CREATE INDEX IF NOT EXISTS entries_written ON entries (written)")
+            db.execute("CREATE TABLE IF NOT EXISTS counters (id INTEGER PRIMARY KEY CHECK (id = 0), "
+                       "entries INTEGER, size INTEGER)")
+            db.execute("CREATE TRIGGER IF NOT EXISTS entries_added AFTER INSERT ON entries BEGIN "
+                       "UPDATE counters SET entries = entries + 1, size = size + NEW.size; END")
+            db.execute("CREATE TRIGGER IF NOT EXISTS entries_dropped AFTER DELETE ON entries BEGIN "
+                       "UPDATE counters SET entries = entries - 1, size = size - OLD.size; END")
+            # databases written before the counters existed start from their current entries
+            db.execute("INSERT OR IGNORE INTO counters SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM entries")
+
+    def _db(self):
+        # sqlite connections can be shared neither between threads nor across a fork
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            import sqlite3
+            db = sqlite3.connect(self.path, timeout=self.timeout)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def _counters(self, db):
+        return db.execute("SELECT entries, size FROM counters").fetchone()
+
+    @property
+    def size(self):
+        return self._counters(self._db())[1]
+
+    def get(self, key):
+        """Return the encoded value for key
+
+        :param key: cache key
+        :return: the encoded value, None if missing or expired
+        """
+        row = self._db().execute("SELECT value FROM entries WHERE key = ? AND expires >= ?",
+                                 (key, time.time())).fetchone()
+        if row is None:
+            return None
+        return row[0]
+
+    def set(self, key, encoded, expires, tag):
+        """Store an encoded value
+
+        :param key: cache key
+        :param encoded: json encoded value
+        :param expires: timestamp after which the value is stale
+        :param tag: (group, scope) tuple used for invalidation
+        :return: Nothing
+        """
+        if len(encoded) > self.max_bytes:
+            return
+        now = time.time()
+        db = self._db()
+        with db:
+            # a replace would not fire the delete trigger, the old entry is dropped first
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            db.execute("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (key, expires, tag[0], tag[1], encoded, len(encoded), now))
+            count, size = self._counters(db)
+            if count <= self.max_entries and size <= self.max_bytes:
+                return
+            db.execute("DELETE FROM entries WHERE expires < ?", (now,))
+            count, size = self._counters(db)
+            stale = []
+            for oldkey, oldsize in db.execute("SELECT key, size FROM entries ORDER BY written"):
+                if count <= self.max_entries and size <= self.max_bytes:
+                    break
+                stale.append((oldkey,))
+                count -= 1
+                size -= oldsize
+            db.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+    def invalidate(self, group, scope=None):
+        """Drop entries of a group
+
+        :param group: group name
+        :param scope: scope of the entries, None for the whole group
+        :return: number of entries dropped
+        """
+        db = self._db()
+        with db:
+            if scope is None:
+                cursor = db.execute("DELETE FROM entries WHERE grp = ?", (group,))
+            else:
+                cursor = db.execute("DELETE FROM entries WHERE grp = ? AND (scope = ? OR scope IS NULL)",
+                                    (group, scope))
+            return cursor.rowcount
+
+    def clear(self):
+        """Drop every entry
+
+        :return: Nothing
+        """
+        db = self._db()
+        with db:
+            db.execute("DELETE FROM entries")
+
+    def __len__(self):
+        return self._counters(self._db())[0]
+
+
+class ResponseCache(object):
+    """Read-through cache of decoded API responses with a time to live per endpoint
+
+    Entries are kept json encoded in a backend, so callers always get a fresh
+    copy and the byte bound is measured on the encoded size. The default
+    backend is process local, pass a SQLiteBackend to share entries between
+    processes. Projects can be scoped by id or by path, the paths learned from
+    the cached projects map to their id so a write with either form drops the
+    entries read with the other one.
+    """
+
+    def __init__(self, ttl=None, default_ttl=None, max_entries=1024, max_bytes=16 * 1024 * 1024, backend=None):
+        """
+
+        :param ttl: dict of method name -> seconds, merged over DEFAULT_TTL. 0 or None disables an endpoint
+        :param default_ttl: ttl for the endpoints declared with a cache group but without an explicit policy
+            (None = not cached)
+        :param max_entries: maximum number of entries of the default backend
+        :param max_bytes: maximum total size of the encoded entries of the default backend
+        :param backend: storage for the entries, defaults to a MemoryBackend
+        """
+        self.ttl = dict(DEFAULT_TTL)
+        if ttl:
+            self.ttl.update(ttl)
+        self.default_ttl = default_ttl
+        if backend is None:
+            backend = MemoryBackend(max_entries=max_entries, max_bytes=max_bytes)
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        # path_with_namespace -> id of the projects seen in cached values
+        self._aliases = {}
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        return self.backend.size
+
+    def ttlfor(self, name):
+        """Time to live for the endpoint, None if it should not be cached
+
+        :param name: name of the Gitlab method
+        :return: seconds or None
+        """
+        return self.ttl.get(name, self.default_ttl) or None
+
+    def get(self, key):
+        """Return the cached value for key
+
+        :param key: cache key
+        :return: the decoded value, None if missing or expired
+        """
+        encoded = self.backend.get(key)
+        if encoded is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(encoded)
+
+    def set(self, key, value, ttl, tag):
+        """Store a value
+
+        :param key: cache key
+        :param value: json serializable value
+        :param ttl: seconds to keep it
+        :param tag: (group, scope) tuple used for invalidation
+        :return: Nothing
+        """
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, dict) and item.get("id") is not None and item.get("path_with_namespace"):
+                self.alias(item["path_with_namespace"], item["id"])
+        self.backend.set(key, json.dumps(value), time.time() + ttl, (tag[0], self.scope(tag[1])))
+
+    def alias(self, path, project_id):
+        """Record that a project path and a project id are the same scope
+
+        :param path: path_with_namespace of the project, ie: group/project
+        :param project_id: id of the project
+        :return: Nothing
+        """
+        with self._lock:
+            self._aliases[str(path)] = str(project_id)
+
+    def scope(self, value):
+        """Scope of the entries of a project id or path
+
+        :param value: id or path of a project, group...
+        :return: the id of a known project path, value as a string otherwise
+        """
+        if value is None:
+            return None
+        value = str(value)
+        return self._aliases.get(value, value)
+
+    def invalidate(self, group, scope=None):
+        """Drop cached entries of a group
+
+        :param group: group name, ie: "labels"
+        :param scope: project/group id or project path the entries belong to, None to drop the whole group
+        :return: number of entries dropped
+        """
+        if scope is None:
+            return self.backend.invalidate(group, None)
+        scope = self.scope(scope)
+        dropped = self.backend.invalidate(group, scope)
+        with self._lock:
+            # entries read by path before the id of the path was known
+            paths = [path for path, project_id in self._aliases.items() if project_id == scope]
+        for path in paths:
+            dropped += self.backend.invalidate(group, path)
+        return dropped
+
+    def clear(self):
+        """Drop every entry
+
+        :return: Nothing
+        """
+        self.backend.clear()
+
+    def __len__(self):
+        return len(self.backend)
+
+
+def _argument(fn, argname=None):
+    # (name, position without self) of the argument scoping the entries, the first one by default
+    while hasattr(fn, "__wrapped__"):
+        fn = fn.__wrapped__
+    argnames = fn.__code__.co_varnames[1:fn.__code__.co_argcount]
+    if argname is None:
+        argname = argnames[0]
+    elif argname not in argnames:
+        raise ValueError("{0} has no argument {1}".format(fn.__name__, argname))
+    return argname, argnames.index(argname)
+
+
+def _scope(argument, args, kwargs):
+    argname, position = argument
+    if len(args) > position:
+        return str(args[position])
+    if argname in kwargs:
+        return str(kwargs[argname])
+    return None
+
+
+def cached(group, scoped=True):
+    """Cache the result of a Gitlab read method when the instance has a cache
+
+    :param group: invalidation group of the endpoint
+    :param scoped: whether the first argument (project id, group id...) scopes the entries
+    """
+    def decorator(fn):
+        name = fn.__name__
+        argument = _argument(fn) if scoped else None
+
+        @wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            cache = self.cache
+            ttl = cache.ttlfor(name) if cache is not None else None
+            if not ttl:
+                return fn(self, *args, **kwargs)
+            key = hashlib.sha1(json.dumps([self.host, name, args, sorted(kwargs.items()),
+                                           sorted(self.headers.items())], default=str).encode("utf-8")).hexdigest()
+            result = cache.get(key)
+            if result is not None:
+                return result
+            result = fn(self, *args, **kwargs)
+            if result is not False and result is not None:
+                cache.set(key, result, ttl, (group, _scope(argument, args, kwargs) if scoped else None))
+            return result
+        wrapper.__wrapped__ = fn
+        return wrapper
+    return decorator
+
+
+def invalidates(*groups, **options):
+    """Drop the cached entries of groups after a Gitlab write method succeeds
+
+    :param groups: invalidation groups touched by the endpoint
+    :param scoped: whether an argument scopes the invalidation (default True)
+    :param scope: name of the argument scoping the invalidation, the first one by default
+    """
+    scoped = options.get("scoped", True)
+    scope = options.get("scope")
+
+    def decorator(fn):
+        argument = _argument(fn, scope) if scoped else None
+
+        @wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            result = fn(self, *args, **kwargs)
+            if self.cache is not None and result:
+                tag = _scope(argument, args, kwargs) if scoped else None
+                for group in groups:
+                    self.cache.invalidate(group, tag)
+            return result
+        wrapper.__wrapped__ = fn
+        return wrapper
+    return decorator
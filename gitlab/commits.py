@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+Walk the commit history of projects without downloading shared history twice,
+and fetch the diffs of commit ranges concurrently
+"""
+
+import base64
+import binascii
+import heapq
+import json
+import os
+import threading
+
+from .fleet import parallel
+from .utils import timestamp
+
+
+class SeenSet(object):
+    """Thread safe set of commit SHAs kept as 20 byte digests"""
+
+    def __init__(self, digests=()):
+        self._digests = set(digests)
+        self._lock = threading.Lock()
+
+    def add(self, sha):
+        """Add a SHA
+
+        :param sha: hex SHA of a commit
+        :return: True if it was not in the set yet
+        """
+        digest = binascii.unhexlify(sha)
+        with self._lock:
+            if digest in self._digests:
+                return False
+            self._digests.add(digest)
+            return True
+
+    def copy(self):
+        with self._lock:
+            return SeenSet(self._digests)
+
+    def dumps(self):
+        """Serialize the set
+
+        :return: ascii string
+        """
+        with self._lock:
+            return base64.b64encode(b"".join(sorted(self._digests))).decode("ascii")
+
+    @classmethod
+    def loads(cls, data):
+        raw = base64.b64decode(data)
+        return cls(raw[i:i + 20] for i in range(0, len(raw), 20))
+
+    def __contains__(self, sha):
+        return binascii.unhexlify(sha) in self._digests
+
+    def __len__(self):
+        return len(self._digests)
+
+
+class CrawlCheckpoint(object):
+    """File keeping the state of the crawls of a project between runs
+
+    It holds the head of every ref crawled and the SHAs of the last complete
+    crawl. Refs whose head did not move are not walked again.
+    """
+
+    def __init__(self, path):
+        """
+
+        :param path: json file, created on the first save
+        """
+        self.path = path
+        self.heads = {}
+        self.seen = SeenSet()
+        if os.path.exists(path):
+            with open(path) as checkpoint:
+                data = json.load(checkpoint)
+            self.heads = data["heads"]
+            self.seen = SeenSet.loads(data["seen"])
+
+    def save(self, heads, seen):
+        """Write the checkpoint atomically
+
+        :param heads: dict of ref name -> head SHA
+        :param seen: SeenSet of every commit reachable from the heads of a complete crawl
+        :return: Nothing
+        """
+        self.heads = dict(heads)
+        self.seen = seen
+        temp = self.path + ".tmp"
+        with open(temp, "w") as checkpoint:
+            json.dump({"heads": self.heads, "seen": seen.dumps()}, checkpoint)
+        os.rename(temp, self.path)
+
+
+class CommitCrawler(object):
+    """Yields every commit of the refs of a project exactly once
+
+    Refs are walked concurrently, newest commits first. Each commit belongs to
+    the first ref that walked it, and a ref stops being paginated when it
+    reaches a commit of the previous crawl or of a ref listed before it. The
+    first ref owning some shared history therefore walks it to the end, while
+    the others only download it once.
+    """
+
+    def __init__(self, git, project_id, checkpoint=None, workers=4, per_page=100):
+        """
+
+        :param git: Gitlab instance
+        :param project_id: project id
+        :param checkpoint: optional CrawlCheckpoint to resume from and update
+        :param workers: number of refs walked at the same time
+        :param per_page: commits requested per page
+        """
+        self.git = git
+        self.project_id = project_id
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.per_page = per_page
+        self.failed = []
+
+    def _walk(self, rank, ref, seen, previous, owners):
+        # returns (commits, rank of the ref the walk relied on or None), None if a page could not be read
+        new = []
+        page = 1
+        while True:
+            commits = self.git.getrepositorycommits(self.project_id, ref_name=ref, page=page,
+                                                    per_page=self.per_page)
+            if commits is False:
+                return None
+            for commit in commits:
+                digest = binascii.unhexlify(commit["id"])
+                if seen.add(commit["id"]):
+                    owners[digest] = rank
+                    new.append(commit)
+                elif commit["id"] in previous:
+                    return new, None
+                else:
+                    # while the owner is being recorded the commit counts as ours
+                    owner = owners.get(digest, rank)
+                    if owner < rank:
+                        return new, owner
+            if len(commits) < self.per_page:
+                return new, None
+            page += 1
+
+    def crawl(self, refs=None):
+        """Walk the refs
+
+        The refs that could not be read are listed in the failed attribute
+        afterwards. Their head is not recorded, nor the head of the refs that
+        relied on them for their shared history, so the next crawl walks them
+        again.
+
+        :param refs: names of the refs to walk, defaults to every branch of the project
+        :return: yields commit dicts, each one once
+        """
+        if refs is None:
+            branches = self.git.getbranches(self.project_id) or []
+            refs = [(branch["name"], branch["commit"]["id"]) for branch in branches]
+        else:
+            refs = [(ref, None) for ref in refs]
+
+        if self.checkpoint is not None:
+            heads = dict(self.checkpoint.heads)
+            previous = self.checkpoint.seen
+        else:
+            heads = {}
+            previous = SeenSet()
+        seen = previous.copy()
+        complete = previous.copy()
+        owners = {}
+        todo = [(rank, name, head) for rank, (name, head) in
+                enumerate([ref for ref in refs if ref[1] is None or heads.get(ref[0]) != ref[1]])]
+        self.failed = []
+        results = {}
+        done = {}
+
+        def walk(ref):
+            return self._walk(ref[0], ref[1], seen, previous, owners)
+
+        for (rank, name, head), result in parallel(walk, todo, workers=self.workers):
+            if result is None:
+                self.failed.append(name)
+                results[rank] = None
+                continue
+            commits, relied = result
+            results[rank] = result
+            for commit in commits:
+                yield commit
+            # a walk is complete once the walks it relied on are complete, those come earlier in todo
+            for other, other_name, other_head in todo:
+                if other in done or other not in results:
+                    continue
+                walked = results[other]
+                if walked is not None and walked[1] is not None and walked[1] not in done:
+                    continue
+                done[other] = walked is not None and (walked[1] is None or done[walked[1]])
+                if not done[other]:
+                    continue
+                for commit in walked[0]:
+                    complete.add(commit["id"])
+                if other_head is not None:
+                    heads[other_name] = other_head
+                    if self.checkpoint is not None:
+                        # the commits of an interrupted crawl are not trusted yet, keep the previous set
+                        self.checkpoint.save(heads, previous)
+        if self.checkpoint is not None:
+            self.checkpoint.save(heads, complete)
+
+
+def toporder(commits):
+    """Sort commits so that parents come before their children
+
+    Commits without parent_ids keep the order of their dates, oldest first.
+
+    :param commits: list of commit dicts
+    :return: sorted list
+    """
+    position = dict((commit["id"], index) for index, commit in enumerate(commits))
+    if not all("parent_ids" in commit for commit in commits):
+        return sorted(commits, key=lambda commit: (timestamp(commit.get("created_at") or commit.get(
+            "committed_date")) or 0, position[commit["id"]]))
+    children = dict((commit["id"], []) for commit in commits)
+    pending = {}
+    for commit in commits:
+        parents = [parent for parent in commit["parent_ids"] if parent in position]
+        pending[commit["id"]] = len(parents)
+        for parent in parents:
+            children[parent].append(commit["id"])
+    ready = [position[sha] for sha, count in pending.items() if count == 0]
+    heapq.heapify(ready)
+    ordered = []
+    while ready:
+        commit = commits[heapq.heappop(ready)]
+        ordered.append(commit)
+        for child in children[commit["id"]]:
+            pending[child] -= 1
+            if pending[child] == 0:
+                heapq.heappush(ready, position[child])
+    return ordered
+
+
+def commitdiffs(git, project_id, from_id, to_id, workers=8, cache=None):
+    """Fetch the diff of every commit between two refs concurrently
+
+    :param git: Gitlab instance
+    :param project_id: project id
+    :param from_id: the commit sha or branch name to start from (excluded)
+    :param to_id: the commit sha or branch name to end at
+    :param workers: number of diffs fetched at the same time
+    :param cache: optional dict-like of commit sha -> diff, read before fetching and filled after
+    :return: yields (commit, diff) tuples with parents before children
+    """
+    compare = git.compare_branches_tags_commits(project_id, from_id, to_id)
+    if not compare:
+        return
+    commits = toporder(compare.get("commits") or [])
+    results = {}
+    missing = []
+    for commit in commits:
+        if cache is not None and commit["id"] in cache:
+            results[commit["id"]] = cache[commit["id"]]
+        else:
+            missing.append(commit["id"])
+
+    fetched = parallel(lambda sha: git.getrepositorycommitdiff(project_id, sha), missing, workers=workers)
+    for commit in commits:
+        # yield in order as soon as the next diff is there, keeping the others for later
+        while commit["id"] not in results:
+            sha, diff = next(fetched)
+            results[sha] = diff
+            if cache is not None and diff is not False:
+                cache[sha] = diff
+        yield commit, results.pop(commit["id"])
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Merge the contributors of many projects by email
+"""
+
+import csv
+import json
+import threading
+
+from .fleet import parallel
+
+COLUMNS = ("email", "name", "commits", "additions", "deletions", "projects")
+
+
+def _identity(contributor):
+    return (contributor.get("email") or contributor.get("name") or "").strip().lower()
+
+
+def _projectid(key):
+    # state keys are json encoded ids, so numeric and path ids both come back as they were given
+    try:
+        return json.loads(key)
+    except ValueError:
+        return key
+
+
+class ContributorStats(object):
+    """Contributors of a fleet of projects merged by email
+
+    Each project keeps its own (commits, additions, deletions) tuple per email
+    and the totals are updated by difference, so refreshing a project only
+    costs the contributor list of that project.
+    """
+
+    def __init__(self, git, state=None, workers=8, per_page=100):
+        """
+
+        :param git: Gitlab instance
+        :param state: dict returned by a previous state() call to start from
+        :param workers: number of projects fetched at the same time
+        :param per_page: contributors requested per page
+        """
+        self.git = git
+        self.workers = workers
+        self.per_page = per_page
+        self.projects = {}
+        self.names = {}
+        self.totals = {}
+        self._lock = threading.Lock()
+        for project_id, rows in (state or {}).items():
+            contributors = {}
+            for email, name, commits, additions, deletions in rows:
+                contributors[email] = (commits, additions, deletions)
+                self.names.setdefault(email, name)
+            self._replace(_projectid(project_id), contributors)
+
+    def _fetch(self, project_id):
+        contributors = {}
+        page = 1
+        while True:
+            results = self.git.getcontributors(project_id, page=page, per_page=self.per_page)
+            if results is False:
+                return None
+            for contributor in results:
+                email = _identity(contributor)
+                if not email:
+                    continue
+                with self._lock:
+                    self.names.setdefault(email, contributor.get("name") or email)
+                commits, additions, deletions = contributors.get(email, (0, 0, 0))
+                # the same person can be listed once per spelling of their email
+                contributors[email] = (commits + (contributor.get("commits") or 0),
+                                       additions + (contributor.get("additions") or 0),
+                                       deletions + (contributor.get("deletions") or 0))
+            if len(results) < self.per_page:
+                return contributors
+            page += 1
+
+    def _replace(self, project_id, contributors):
+        with self._lock:
+            old = self.projects.pop(project_id, {})
+            for email, counts in old.items():
+                total = self.totals[email]
+                for index in range(3):
+                    total[index] -= counts[index]
+                total[3] -= 1
+                if not total[3]:
+                    del self.totals[email]
+            for email, counts in contributors.items():
+                total = self.totals.setdefault(email, [0, 0, 0, 0])
+                for index in range(3):
+                    total[index] += counts[index]
+                total[3] += 1
+            if contributors:
+                self.projects[project_id] = contributors
+
+    def update(self, project_ids):
+        """Fetch the contributors of some projects and replace what was known about them
+
+        :param project_ids: ids of the projects to fetch
+        :return: list of the project ids that could not be fetched, their previous figures are kept
+        """
+        failed = []
+        for project_id, contributors in parallel(self._fetch, project_ids, workers=self.workers):
+            if contributors is None:
+                failed.append(project_id)
+            else:
+                self._replace(project_id, contributors)
+        return failed
+
+    def remove(self, project_id):
+        """Forget a project
+
+        :param project_id: project id
+        :return: Nothing
+        """
+        self._replace(project_id, {})
+
+    def rows(self, sort="commits"):
+        """Merged contributors
+
+        :param sort: column to sort by, descending for the numeric ones
+        :return: list of (email, name, commits, additions, deletions, projects) tuples
+        """
+        with self._lock:
+            rows = [(email, self.names.get(email, email)) + tuple(total) for email, total in self.totals.items()]
+        index = COLUMNS.index(sort)
+        rows.sort(key=lambda row: (row[index], row[0]), reverse=index >= 2)
+        return rows
+
+    def state(self):
+        """Figures of every project, json serializable
+
+        :return: dict to pass as state to a new ContributorStats
+        """
+        with self._lock:
+            return dict((json.dumps(project_id), [[email, self.names.get(email, email)] + list(counts)
+                                           for email, counts in contributors.items()])
+                        for project_id, contributors in self.projects.items())
+
+    def write(self, fileobj, fmt="csv", sort="commits"):
+        """Write the merged contributors as a table
+
+        :param fileobj: text file to write to
+        :param fmt: csv or text for aligned columns
+        :param sort: column to sort by
+        :return: number of contributors written
+        """
+        rows = self.rows(sort)
+        if fmt == "csv":
+            writer = csv.writer(fileobj)
+            writer.writerow(COLUMNS)
+            writer.writerows(rows)
+        elif fmt == "text":
+            table = [COLUMNS] + [tuple(str(value) for value in row) for row in rows]
+            widths = [max(len(row[index]) for row in table) for index in range(len(COLUMNS))]
+            for row in table:
+                fileobj.write("  ".join(value.ljust(width) if index < 2 else value.rjust(width)
+                                        for index, (value, width) in enumerate(zip(row, widths))).rstrip() + "\n")
+        else:
+            raise ValueError("Unknown format {0}".format(fmt))
+        return len(rows)
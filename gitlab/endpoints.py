@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Declarative description of the API endpoints wrapped by the Gitlab class
+"""
+
+from functools import wraps
+from string import Formatter
+
+from .cache import cached
+try:
+    from urllib import quote
+except ImportError:
+    from urllib.parse import quote
+    basestring = str
+
+# name of the Gitlab method -> Endpoint, filled as the class is defined
+ENDPOINTS = {}
+
+SUCCESS = {"get": (200,), "post": (201,), "put": (200,), "delete": (200,)}
+
+RESULTS = ("json", "bool", "content")
+
+
+def segment(value):
+    """Quote a value put in a url path, group/project ids, branch names... are a single segment of the path"""
+    if value is None:
+        return ""
+    if isinstance(value, basestring):
+        return quote(value.encode("utf-8") if not isinstance(value, str) else value, safe="")
+    return value
+
+
+class Endpoint(object):
+    """How the arguments of a Gitlab method become a request and how its response is read
+
+    Arguments named in the path are formatted in it, query and body list the
+    fields sent as url parameters and as form data. A field is either the
+    name of an argument or a (field, argument) or (field, argument, convert)
+    tuple, fields whose value ends up None are not sent. Extra keyword
+    arguments go to the body of post and put requests and to the query of
+    the others.
+    """
+
+    def __init__(self, name, verb, path, query=(), body=(), paginated=False, success=None, result="json",
+                 cache=None, scoped=True):
+        """
+
+        :param name: name of the Gitlab method
+        :param verb: http verb, lower case
+        :param path: path under /api/v3 with {argument} placeholders
+        :param query: fields sent as url parameters
+        :param body: fields sent as form data
+        :param paginated: whether page and per_page are sent and the result is one page of a list
+        :param success: status codes of a successful call, defaults to 201 for post and 200 otherwise
+        :param result: "json" for the decoded body, "bool" for True, "content" for the raw bytes
+        :param cache: invalidation group of the responses (see gitlab.cache.cached), None if they are never cached
+        :param scoped: whether the first argument (project id, group id...) scopes the cached responses
+        """
+        if verb not in SUCCESS:
+            raise ValueError("Unknown http verb: {0}".format(verb))
+        if result not in RESULTS:
+            raise ValueError("Unknown endpoint result: {0}".format(result))
+        self.name = name
+        self.verb = verb
+        self.path = path
+        self.pathargs = tuple(field for _, field, _, _ in Formatter().parse(path) if field)
+        self.query = tuple(self._field(field) for field in query)
+        if paginated:
+            self.query += (("page", "page", None), ("per_page", "per_page", None))
+        self.body = tuple(self._field(field) for field in body)
+        self.paginated = paginated
+        self.success = tuple(success or SUCCESS[verb])
+        self.result = result
+        self.cache = cache
+        self.scoped = scoped
+        self.argnames = ()
+        self.defaults = {}
+        self.varkw = False
+
+    @staticmethod
+    def _field(field):
+        if isinstance(field, basestring):
+            return (field, field, None)
+        if len(field) == 2:
+            return (field[0], field[1], None)
+        return tuple(field)
+
+    def signature(self, fn):
+        """Take the arguments accepted from the declaration of the method
+
+        :param fn: the method as written in the class
+        :return: Nothing
+        """
+        code = fn.__code__
+        self.argnames = code.co_varnames[1:code.co_argcount]
+        defaults = fn.__defaults__ or ()
+        self.defaults = dict(zip(self.argnames[len(self.argnames) - len(defaults):], defaults))
+        self.varkw = bool(code.co_flags & 0x08)
+        for name in self.pathargs + tuple(arg for _, arg, _ in self.query + self.body):
+            if name not in self.argnames:
+                raise ValueError("{0} has no argument {1}".format(self.name, name))
+
+    def bind(self, args, kwargs):
+        """Match the arguments of a call with the argument names
+
+        :param args: positional arguments, without self
+        :param kwargs: keyword arguments
+        :return: (dict of argument name -> value, dict of the extra keyword arguments)
+        """
+        if len(args) > len(self.argnames):
+            raise TypeError("{0}() takes at most {1} arguments ({2} given)".format(
+                self.name, len(self.argnames), len(args)))
+        values = dict(zip(self.argnames, args))
+        extra = {}
+        for key, value in kwargs.items():
+            if key in self.argnames:
+                if key in values:
+                    raise TypeError("{0}() got multiple values for argument {1}".format(self.name, key))
+                values[key] = value
+            elif self.varkw:
+                extra[key] = value
+            else:
+                raise TypeError("{0}() got an unexpected keyword argument {1}".format(self.name, key))
+        for name in self.argnames:
+            if name not in values:
+                if name not in self.defaults:
+                    raise TypeError("{0}() missing argument {1}".format(self.name, name))
+                values[name] = self.defaults[name]
+        return values, extra
+
+    @staticmethod
+    def _fields(fields, values):
+        data = {}
+        for field, arg, convert in fields:
+            value = values[arg]
+            if convert is not None:
+                value = convert(value)
+            if value is not None:
+                data[field] = value
+        return data
+
+    def request(self, args, kwargs):
+        """Build the request of a call
+
+        :param args: positional arguments, without self
+        :param kwargs: keyword arguments
+        :return: (path, dict of the params and data arguments of the request)
+        """
+        values, extra = self.bind(args, kwargs)
+        path = self.path.format(**dict((name, segment(values[name])) for name in self.pathargs))
+        query = self._fields(self.query, values)
+        body = self._fields(self.body, values)
+        if extra:
+            (body if self.verb in ("post", "put") else query).update(extra)
+        options = {}
+        if query:
+            options["params"] = query
+        if body:
+            options["data"] = body
+        return path, options
+
+    def call(self, git, args, kwargs):
+        """Send a call of the endpoint
+
+        :param git: Gitlab instance
+        :param args: positional arguments, without self
+        :param kwargs: keyword arguments
+        :return: the result, False if the server did not answer with a success code
+        """
+        path, options = self.request(args, kwargs)
+        request = git._request(self.verb, git.api_url + path, **options)
+        if request.status_code not in self.success:
+            return False
+        if self.result == "json":
+            return request.json()
+        if self.result == "content":
+            return request.content
+        return True
+
+    @property
+    def cacheable(self):
+        """Whether the responses go through the response cache of the instance"""
+        return self.cache is not None
+
+    def __repr__(self):
+        return "<Endpoint {0} {1} {2}>".format(self.name, self.verb.upper(), self.path)
+
+
+def endpoint(verb, path, **options):
+    """Generate a Gitlab method from its endpoint
+
+    The decorated method only provides the signature and the docstring,
+    calls are sent as declared. Endpoints declared with a cache group are
+    read through the response cache of the instance. The Endpoint is
+    registered in ENDPOINTS and available as the endpoint attribute of the
+    method.
+
+    :param verb: http verb, lower case
+    :param path: path under /api/v3 with {argument} placeholders
+    :param options: other arguments of Endpoint
+    """
+    def decorator(fn):
+        spec = Endpoint(fn.__name__, verb, path, **options)
+        spec.signature(fn)
+        ENDPOINTS[spec.name] = spec
+
+        @wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            return spec.call(self, args, kwargs)
+        wrapper.__wrapped__ = fn
+        wrapper.endpoint = spec
+        if spec.cacheable:
+            return cached(spec.cache, spec.scoped)(wrapper)
+        return wrapper
+    return decorator
+
+
+def flag(value):
+    """Convert a boolean argument to the 0/1 the API expects"""
+    return int(bool(value))
+
+
+def projectaccess(value):
+    """Convert a project access level name (master, developer, reporter, guest) to its number"""
+    if isinstance(value, basestring):
+        return {"master": 40, "developer": 30, "reporter": 20}.get(value.lower(), 10)
+    return value
+
+
+def visibility(value):
+    """Keep a snippet visibility level only if it is a known one (0, 10 or 20)"""
+    return value if value in (0, 10, 20) else None
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Tail the events of many projects without re-reading the ones already seen
+"""
+
+import hashlib
+import json
+import time
+
+from .fleet import parallel
+from .utils import timestamp
+
+# _fetch result of a project with more new events than max_pages can hold
+_TRUNCATED = object()
+
+
+def _fingerprint(event):
+    if event.get("id") is not None:
+        return str(event["id"])
+    return hashlib.sha1(json.dumps(event, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class _ProjectState(object):
+    __slots__ = ("hwm", "seen", "interval", "due")
+
+    def __init__(self, hwm, seen, interval):
+        self.hwm = hwm
+        self.seen = seen
+        self.interval = interval
+        self.due = 0
+
+
+class EventTailer(object):
+    """Polls getprojectevents for many projects and returns only the new events
+
+    Each project keeps a high-water mark: the date of its newest known event and
+    the events seen at that date. Pagination stops at the first page reaching
+    it. Projects are polled concurrently and each one is polled more often
+    while it is active and less often while it is quiet.
+    """
+
+    def __init__(self, git, project_ids, state=None, workers=8, per_page=20, max_pages=None,
+                 min_interval=30, max_interval=900):
+        """
+
+        :param git: Gitlab instance
+        :param project_ids: ids of the projects to watch
+        :param state: dict returned by a previous state() call to resume from, events newer than
+            the saved marks are returned. Projects without a saved mark only get their mark set
+            by the first poll, their past events are not returned
+        :param workers: number of projects polled at the same time
+        :param per_page: events requested per page
+        :param max_pages: maximum number of pages read per project and poll, None to read until the mark.
+            A project whose mark is not reached within them keeps its mark and is listed in truncated
+        :param min_interval: shortest delay between two polls of a project, in seconds
+        :param max_interval: longest delay between two polls of a project, in seconds
+        """
+        self.git = git
+        self.workers = workers
+        self.per_page = per_page
+        self.max_pages = max_pages
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.failed = []
+        self.truncated = []
+        state = state or {}
+        self.projects = {}
+        for project_id in project_ids:
+            saved = state.get(str(project_id))
+            if saved:
+                self.projects[project_id] = _ProjectState(saved[0], set(saved[1]), min_interval)
+            else:
+                self.projects[project_id] = _ProjectState(None, set(), min_interval)
+
+    def state(self):
+        """High-water marks of every project, json serializable
+
+        :return: dict to pass as state to a new EventTailer
+        """
+        return dict((str(project_id), [project.hwm, sorted(project.seen)])
+                    for project_id, project in self.projects.items() if project.hwm is not None)
+
+    def _fetch(self, project_id):
+        project = self.projects[project_id]
+        new = []
+        page = 1
+        while True:
+            if self.max_pages is not None and page > self.max_pages:
+                # returning what was read would move the mark past the events of the next pages
+                return _TRUNCATED
+            events = self.git.getprojectevents(project_id, page=page, per_page=self.per_page)
+            if events is False:
+                # a partial read would move the mark past the events of the missing pages
+                return None
+            if not events:
+                break
+            reached = False
+            for event in events:
+                created = timestamp(event["created_at"])
+                if project.hwm is not None and (created < project.hwm or
+                                                (created == project.hwm and _fingerprint(event) in project.seen)):
+                    reached = True
+                    break
+                new.append((created, event))
+            # the first poll of a project only sets its mark
+            if reached or project.hwm is None or len(events) < self.per_page:
+                break
+            page += 1
+        return new
+
+    def _update(self, project_id, new, now):
+        project = self.projects[project_id]
+        if new is None:
+            # leave the mark alone and try again later
+            project.interval = min(self.max_interval, project.interval * 1.5)
+            project.due = now + project.interval
+            return []
+        if new is _TRUNCATED:
+            # the backlog is not read until max_pages covers it, keep polling at the shortest interval
+            project.interval = self.min_interval
+            project.due = now + project.interval
+            return []
+        baseline = project.hwm is None
+        if new:
+            newest = max(created for created, _ in new)
+            if newest != project.hwm:
+                project.hwm = newest
+                project.seen = set()
+            project.seen.update(_fingerprint(event) for created, event in new if created == newest)
+            project.interval = max(self.min_interval, project.interval / 2.0)
+        else:
+            project.interval = min(self.max_interval, project.interval * 1.5)
+        if baseline and project.hwm is None:
+            # nothing happened yet in the project, anything from now on is new
+            project.hwm = 0.0
+        project.due = now + project.interval
+        return [] if baseline else new
+
+    def poll(self, force=False):
+        """Poll the projects that are due
+
+        The projects whose events could not be read are listed in the failed
+        attribute afterwards, they are polled again later. The projects with
+        more new events than max_pages holds are listed in truncated, their
+        events are not returned and their mark does not move.
+
+        :param force: poll every project, due or not
+        :return: list of the new events, oldest first
+        """
+        now = time.time()
+        due = [project_id for project_id, project in self.projects.items() if force or project.due <= now]
+        merged = []
+        self.failed = []
+        self.truncated = []
+        for project_id, new in parallel(self._fetch, due, workers=self.workers):
+            if new is None:
+                self.failed.append(project_id)
+            elif new is _TRUNCATED:
+                self.truncated.append(project_id)
+            # the api lists the newest first, reversing keeps events sharing a date in order
+            for created, event in reversed(self._update(project_id, new, now)):
+                merged.append((created, str(project_id), event))
+        merged.sort(key=lambda entry: entry[:2])
+        return [event for _, _, event in merged]
+
+    def tail(self):
+        """Poll forever
+
+        :return: yields the new events, ordered by date within each round of polls
+        """
+        while True:
+            for event in self.poll():
+                yield event
+            next_due = min(project.due for project in self.projects.values()) if self.projects else \
+                time.time() + self.min_interval
+            time.sleep(max(0, next_due - time.time()))
@@ -3,3 +3,10 @@ class HttpError(Exception):
     An http error occurred
     """
     pass
+
+
+class UnrecordedRequest(Exception):
+    """
+    A replayed session made a request missing from the cassette
+    """
+    pass
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers to run API calls over many projects, users... at once
+"""
+
+import threading
+import time
+from collections import namedtuple
+try:
+    from Queue import Queue, Full
+except ImportError:
+    from queue import Queue, Full
+
+_DONE = object()
+
+
+def parallel(fn, items, workers=8):
+    """Call fn for every item from a pool of threads
+
+    Items are pulled lazily, so items can be a long generator. The first
+    exception raised by fn or by items is raised again in the caller and
+    stops the pool.
+
+    :param fn: function taking one item
+    :param items: iterable of items
+    :param workers: number of threads
+    :return: yields (item, result) tuples in completion order
+    """
+    items = iter(items)
+    lock = threading.Lock()
+    results = Queue(workers * 2)
+    stop = threading.Event()
+
+    def put(value):
+        while not stop.is_set():
+            try:
+                results.put(value, timeout=0.1)
+                return
+            except Full:
+                pass
+
+    def work():
+        try:
+            while not stop.is_set():
+                with lock:
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        return
+                    except Exception as error:
+                        put((None, None, error))
+                        return
+                try:
+                    put((item, fn(item), None))
+                except Exception as error:
+                    put((item, None, error))
+        finally:
+            put(_DONE)
+
+    for _ in range(workers):
+        thread = threading.Thread(target=work)
+        thread.daemon = True
+        thread.start()
+
+    running = workers
+    try:
+        while running:
+            value = results.get()
+            if value is _DONE:
+                running -= 1
+                continue
+            item, result, error = value
+            if error is not None:
+                raise error
+            yield item, result
+    finally:
+        stop.set()
+
+
+class RateLimiter(object):
+    """Token bucket shared by threads to cap the number of calls per second"""
+
+    def __init__(self, rate, burst=None):
+        """
+
+        :param rate: calls allowed per second, None for no limit
+        :param burst: calls allowed at once after an idle period, defaults to rate
+        """
+        self.rate = rate
+        self.burst = burst or max(1, rate or 1)
+        self._tokens = float(self.burst)
+        self._last = time.time()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until a call is allowed
+
+        :return: Nothing
+        """
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.time()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+Change = namedtuple("Change", ["project_id", "action", "target", "status", "detail"])
+
+
+class ChangeReport(object):
+    """Changes planned or made by a fleet operation, safe to fill from several threads"""
+
+    def __init__(self):
+        self.changes = []
+        self._lock = threading.Lock()
+
+    def add(self, project_id, action, target, status, detail=None):
+        """Record a change
+
+        :param project_id: project the change applies to
+        :param action: ie: create, update, delete
+        :param target: what is changed, ie: a hook url or a label name
+        :param status: planned, done or failed
+        :param detail: optional extra information
+        :return: the Change
+        """
+        change = Change(project_id, action, target, status, detail)
+        with self._lock:
+            self.changes.append(change)
+        return change
+
+    @property
+    def failed(self):
+        return [change for change in self.changes if change.status == "failed"]
+
+    def summary(self):
+        """Count the changes by action and status
+
+        :return: dict of (action, status) -> count
+        """
+        counts = {}
+        for change in self.changes:
+            key = (change.action, change.status)
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def __iter__(self):
+        return iter(self.changes)
+
+    def __len__(self):
+        return len(self.changes)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Keep the same project hooks on many projects
+"""
+
+from .fleet import ChangeReport, RateLimiter, parallel
+
+_FLAGS = (("push", "push_events"), ("issues", "issues_events"),
+          ("merge_requests", "merge_requests_events"), ("tag_push", "tag_push_events"))
+
+
+class HookSpec(object):
+    """Desired project hook, same arguments as addprojecthook"""
+
+    def __init__(self, url, push=False, issues=False, merge_requests=False, tag_push=False):
+        self.url = url
+        self.push = bool(push)
+        self.issues = bool(issues)
+        self.merge_requests = bool(merge_requests)
+        self.tag_push = bool(tag_push)
+
+    def flags(self):
+        return dict((name, getattr(self, name)) for name, _ in _FLAGS)
+
+    def matches(self, hook):
+        """Whether an existing hook already has the url and flags of the spec
+
+        :param hook: hook dict as returned by getprojecthooks
+        :return: True if nothing needs to change
+        """
+        return hook.get("url") == self.url and all(
+            bool(hook.get(field)) == getattr(self, name) for name, field in _FLAGS)
+
+
+class HookReconciler(object):
+    """Brings the hooks of many projects to a desired set with the fewest calls
+
+    Hooks are matched by url. Missing hooks are added, hooks with other flags
+    are edited, duplicated urls are deleted and, with prune, hooks whose url is
+    not desired are deleted as well. Hooks already in the desired state cost a
+    single getprojecthooks call.
+    """
+
+    def __init__(self, git, specs, prune=False, workers=8, rate=None):
+        """
+
+        :param git: Gitlab instance
+        :param specs: HookSpec or list of HookSpec
+        :param prune: delete the hooks whose url is not in the specs
+        :param workers: number of projects handled at the same time
+        :param rate: maximum number of write calls per second, None for no limit
+        """
+        if isinstance(specs, HookSpec):
+            specs = [specs]
+        self.git = git
+        self.specs = dict((spec.url, spec) for spec in specs)
+        self.prune = prune
+        self.workers = workers
+        self.ratelimit = RateLimiter(rate)
+
+    def plan(self, hooks):
+        """Changes needed on a project
+
+        :param hooks: current hooks of the project
+        :return: list of (action, spec or None, hook or None)
+        """
+        changes = []
+        found = set()
+        for hook in hooks:
+            spec = self.specs.get(hook.get("url"))
+            if spec is None:
+                if self.prune:
+                    changes.append(("delete", None, hook))
+            elif spec.url in found:
+                changes.append(("delete", spec, hook))
+            else:
+                found.add(spec.url)
+                if not spec.matches(hook):
+                    changes.append(("update", spec, hook))
+        for url, spec in sorted(self.specs.items()):
+            if url not in found:
+                changes.append(("create", spec, None))
+        return changes
+
+    def _hooks(self, project_id):
+        """All the hooks of a project, None if they can't be read"""
+        hooks = []
+        page = 1
+        while True:
+            results = self.git.getprojecthooks(project_id, page=page, per_page=100)
+            if results is False:
+                return None
+            hooks.extend(results)
+            if len(results) < 100:
+                return hooks
+            page += 1
+
+    def _apply(self, project_id, action, spec, hook):
+        self.ratelimit.wait()
+        if action == "create":
+            return self.git.addprojecthook(project_id, spec.url, **spec.flags())
+        elif action == "update":
+            return self.git.editprojecthook(project_id, hook["id"], spec.url, **spec.flags())
+        return self.git.deleteprojecthook(project_id, hook["id"])
+
+    def reconcile(self, project_ids, dry_run=False):
+        """Reconcile the hooks of the projects
+
+        :param project_ids: ids of the projects
+        :param dry_run: only report the changes that would be made
+        :return: ChangeReport
+        """
+        report = ChangeReport()
+
+        def reconcileproject(project_id):
+            try:
+                hooks = self._hooks(project_id)
+            except Exception as error:
+                hooks, detail = None, error
+            else:
+                detail = None
+            if hooks is None:
+                report.add(project_id, "fetch", None, "failed", detail)
+                return
+            for action, spec, hook in self.plan(hooks):
+                target = hook["url"] if hook is not None else spec.url
+                if dry_run:
+                    report.add(project_id, action, target, "planned")
+                    continue
+                try:
+                    done = self._apply(project_id, action, spec, hook)
+                except Exception as error:
+                    report.add(project_id, action, target, "failed", error)
+                else:
+                    report.add(project_id, action, target, "done" if done else "failed")
+
+        for _ in parallel(reconcileproject, project_ids, workers=self.workers):
+            pass
+        return report
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Find where ssh keys are used across users and projects
+"""
+
+import base64
+import binascii
+import hashlib
+import struct
+import threading
+from collections import namedtuple
+
+from . import exceptions
+from .fleet import parallel
+
+_CURVES = {b"nistp256": 256, b"nistp384": 384, b"nistp521": 521}
+
+KeyInfo = namedtuple("KeyInfo", ["fingerprint", "md5", "type", "bits"])
+
+
+def _strings(blob):
+    position = 0
+    while position + 4 <= len(blob):
+        length, = struct.unpack(">I", blob[position:position + 4])
+        yield blob[position + 4:position + 4 + length]
+        position += 4 + length
+
+
+def _bits(value):
+    return int(binascii.hexlify(value), 16).bit_length() if value else 0
+
+
+def fingerprint(key):
+    """Parse an openssh public key, ie: ssh-rsa AAAA... comment
+
+    :param key: public key line
+    :return: KeyInfo with the SHA256 fingerprint as printed by ssh-keygen, the md5 one, the type and the size
+        in bits, None if it is not a public key
+    """
+    parts = key.strip().split()
+    if len(parts) < 2:
+        return None
+    try:
+        blob = base64.b64decode(parts[1].encode("ascii"))
+    except (TypeError, ValueError, binascii.Error):
+        return None
+    fields = list(_strings(blob))
+    if not fields:
+        return None
+    keytype = fields[0].decode("ascii", "replace")
+    bits = 0
+    if keytype == "ssh-rsa" and len(fields) >= 3:
+        bits = _bits(fields[2])
+    elif keytype == "ssh-dss" and len(fields) >= 2:
+        bits = _bits(fields[1])
+    elif keytype.startswith("ecdsa-") and len(fields) >= 2:
+        bits = _CURVES.get(fields[1], 0)
+    elif keytype == "ssh-ed25519":
+        bits = 256
+    sha256 = base64.b64encode(hashlib.sha256(blob).digest()).decode("ascii").rstrip("=")
+    md5 = hashlib.md5(blob).hexdigest()
+    return KeyInfo("SHA256:" + sha256, ":".join(md5[i:i + 2] for i in range(0, 32, 2)), keytype, bits)
+
+
+class KeyAudit(object):
+    """Index of the ssh keys of users and the deploy keys of projects by fingerprint
+
+    Keys are fetched concurrently and each distinct key is only parsed once.
+    Refreshing some users or projects replaces what was known about them in
+    the fingerprint -> (users, projects) index.
+    """
+
+    def __init__(self, git, workers=8, min_rsa_bits=2048, per_page=100):
+        """
+
+        :param git: Gitlab instance, admin to read the keys of other users
+        :param workers: number of users or projects fetched at the same time
+        :param min_rsa_bits: rsa keys shorter than this are weak, dsa keys always are
+        :param per_page: users and projects requested per page when listing all of them
+        """
+        self.git = git
+        self.workers = workers
+        self.per_page = per_page
+        self.min_rsa_bits = min_rsa_bits
+        self.keys = {}
+        self.users = {}
+        self.projects = {}
+        self._owners = {}
+        self._md5 = {}
+        self._parsed = {}
+        self._lock = threading.Lock()
+
+    def _parse(self, key):
+        # only the type and the base64 blob identify a key, the comment does not
+        material = " ".join(key.split()[:2])
+        info = self._parsed.get(material)
+        if info is None:
+            info = fingerprint(material)
+            if info is None:
+                info = KeyInfo("invalid:" + hashlib.sha256(material.encode("utf-8")).hexdigest(), None, None, 0)
+            self._parsed[material] = info
+        return info
+
+    def _index(self, kind, owner_id, keys):
+        found = {}
+        for key in keys:
+            info = self._parse(key.get("key") or "")
+            found[info.fingerprint] = key.get("title")
+            self.keys[info.fingerprint] = info
+            if info.md5 is not None:
+                self._md5[info.md5] = info.fingerprint
+        owners = (self.users, self.projects)[kind]
+        with self._lock:
+            for old in owners.get(owner_id, ()):
+                where = self._owners[old]
+                where[kind].discard(owner_id)
+                if not where[0] and not where[1]:
+                    del self._owners[old]
+            for key in found:
+                self._owners.setdefault(key, (set(), set()))[kind].add(owner_id)
+            owners[owner_id] = found
+
+    def _ids(self, fn):
+        """Ids of every item of a listing, None if a page can't be read"""
+        ids = []
+        page = 1
+        while True:
+            results = fn(page=page, per_page=self.per_page)
+            if results is False:
+                return None
+            ids.extend(item["id"] for item in results)
+            if len(results) < self.per_page:
+                return ids
+            page += 1
+
+    def refresh(self, user_ids=None, project_ids=None):
+        """Fetch the keys of users and projects
+
+        :param user_ids: ids of the users to read, defaults to every user when project_ids is None too
+        :param project_ids: ids of the projects to read, defaults to every project when user_ids is None too
+        :return: (users, projects) lists of the ids that could not be read, what was known about them is kept
+        :raise: HttpError if every user or project was asked for and they could not all be listed
+        """
+        if user_ids is None and project_ids is None:
+            user_ids = self._ids(self.git.getusers)
+            if user_ids is None:
+                raise exceptions.HttpError("The users could not be listed")
+            project_ids = self._ids(self.git.getprojectsall)
+            if project_ids is None:
+                raise exceptions.HttpError("The projects could not be listed")
+        failed = ([], [])
+        sources = [(0, user_id) for user_id in user_ids or ()] + [(1, project_id) for project_id in project_ids or ()]
+
+        def fetch(source):
+            if source[0] == 0:
+                return self.git.getsshkeysuser(source[1])
+            return self.git.getdeploykeys(source[1])
+
+        for (kind, owner_id), keys in parallel(fetch, sources, workers=self.workers):
+            if keys is False:
+                failed[kind].append(owner_id)
+            else:
+                self._index(kind, owner_id, keys)
+        return failed
+
+    def where(self, key):
+        """Users and projects using a key
+
+        :param key: public key line or fingerprint (SHA256:... or md5 aa:bb:...)
+        :return: (user ids, project ids) sorted lists
+        """
+        if key.startswith("SHA256:"):
+            wanted = key
+        elif len(key) == 47 and key.count(":") == 15:
+            wanted = self._md5.get(key.lower())
+        else:
+            wanted = self._parse(key).fingerprint
+        with self._lock:
+            users, projects = self._owners.get(wanted, ((), ()))
+            return sorted(users), sorted(projects)
+
+    def usage(self):
+        """Every key with where it is used
+
+        :return: dict of fingerprint -> (user ids, project ids)
+        """
+        with self._lock:
+            return dict((key, (sorted(users), sorted(projects))) for key, (users, projects) in self._owners.items())
+
+    def isweak(self, info):
+        """Whether a key should be replaced
+
+        :param info: KeyInfo
+        :return: True for unparseable and dsa keys and rsa keys under min_rsa_bits
+        """
+        return info.type is None or info.type == "ssh-dss" or (info.type == "ssh-rsa" and
+                                                                info.bits < self.min_rsa_bits)
+
+    def report(self):
+        """Duplicated and weak keys in one pass
+
+        :return: (duplicates, weak) lists of (KeyInfo, user ids, project ids), duplicates being the keys
+            used by more than one user or project
+        """
+        duplicates, weak = [], []
+        for key, (users, projects) in sorted(self.usage().items()):
+            info = self.keys[key]
+            if len(users) + len(projects) > 1:
+                duplicates.append((info, users, projects))
+            if self.isweak(info):
+                weak.append((info, users, projects))
+        return duplicates, weak
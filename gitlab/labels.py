@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Keep the same labels on many projects
+"""
+
+from .fleet import ChangeReport, RateLimiter, parallel
+
+
+class LabelSpec(object):
+    """Desired label, same arguments as createlabel"""
+
+    def __init__(self, name, color, renames=()):
+        """
+
+        :param name: name of the label
+        :param color: color in 6-digit hex notation with leading '#' sign (e.g. #FFAABB)
+        :param renames: former names of the label, an existing label with one of them is renamed
+        """
+        self.name = name
+        self.color = color
+        self.renames = tuple(renames)
+
+    def matches(self, label):
+        """Whether an existing label already has the name and color of the spec
+
+        :param label: label dict as returned by getlabels
+        :return: True if nothing needs to change
+        """
+        return label.get("name") == self.name and (label.get("color") or "").lower() == self.color.lower()
+
+
+class LabelSync(object):
+    """Brings the labels of many projects to a canonical set with the fewest calls
+
+    Labels are matched by name. Labels with a former name are renamed, which
+    keeps them on their issues and merge requests, labels with another color
+    are edited and missing ones created. With prune, labels that are not in the
+    set are deleted. The labels of each project are read once.
+    """
+
+    def __init__(self, git, specs, prune=False, workers=8, rate=None):
+        """
+
+        :param git: Gitlab instance
+        :param specs: list of LabelSpec
+        :param prune: delete the labels that are not in the specs
+        :param workers: number of projects handled at the same time
+        :param rate: maximum number of write calls per second, None for no limit
+        """
+        self.git = git
+        self.specs = list(specs)
+        self.prune = prune
+        self.workers = workers
+        self.ratelimit = RateLimiter(rate)
+
+    def plan(self, labels):
+        """Changes needed on a project
+
+        :param labels: current labels of the project
+        :return: list of (action, spec or None, label or None), action is create, update, rename or delete
+        """
+        current = dict((label["name"], label) for label in labels)
+        used = set()
+        changes = []
+        for spec in self.specs:
+            label = current.get(spec.name)
+            if label is not None:
+                used.add(spec.name)
+                if not spec.matches(label):
+                    changes.append(("update", spec, label))
+                continue
+            former = [name for name in spec.renames if name in current and name not in used]
+            if former:
+                used.add(former[0])
+                changes.append(("rename", spec, current[former[0]]))
+            else:
+                changes.append(("create", spec, None))
+        if self.prune:
+            for name in sorted(current):
+                if name not in used:
+                    changes.append(("delete", None, current[name]))
+        return changes
+
+    def _apply(self, project_id, action, spec, label):
+        self.ratelimit.wait()
+        if action == "create":
+            return self.git.createlabel(project_id, spec.name, spec.color)
+        elif action == "update":
+            return self.git.editlabel(project_id, spec.name, color=spec.color)
+        elif action == "rename":
+            color = spec.color if not spec.matches(dict(label, name=spec.name)) else None
+            return self.git.editlabel(project_id, label["name"], new_name=spec.name, color=color)
+        return self.git.deletelabel(project_id, label["name"])
+
+    def sync(self, project_ids, dry_run=False):
+        """Synchronize the labels of the projects
+
+        :param project_ids: ids of the projects
+        :param dry_run: only report the changes that would be made
+        :return: ChangeReport, the target of a change is the label name after it
+        """
+        report = ChangeReport()
+
+        def syncproject(project_id):
+            try:
+                labels = self.git.getlabels(project_id)
+            except Exception as error:
+                report.add(project_id, "fetch", None, "failed", error)
+                return
+            if labels is False:
+                report.add(project_id, "fetch", None, "failed")
+                return
+            for action, spec, label in self.plan(labels):
+                target = spec.name if spec is not None else label["name"]
+                detail = label["name"] if action == "rename" else None
+                if dry_run:
+                    report.add(project_id, action, target, "planned", detail)
+                    continue
+                try:
+                    done = self._apply(project_id, action, spec, label)
+                except Exception as error:
+                    report.add(project_id, action, target, "failed", error)
+                else:
+                    report.add(project_id, action, target, "done" if done else "failed", detail)
+
+        for _ in parallel(syncproject, project_ids, workers=self.workers):
+            pass
+        return report
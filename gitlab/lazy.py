@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Resources known by id that are only fetched when first read, many at once
+"""
+
+import threading
+import weakref
+
+from . import exceptions
+from .fleet import parallel
+
+
+class LazyResource(object):
+    """A project, user... read from the server on first access
+
+    Items are read like the dict the get method would return, ie:
+    project["name"] or project.name. Reading id never calls the server.
+    """
+
+    __slots__ = ("id", "_loader", "_data", "__weakref__")
+
+    def __init__(self, loader, resource_id):
+        self.id = resource_id
+        self._loader = loader
+        self._data = None
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    def todict(self):
+        """The full resource, fetched with the other pending resources if needed
+
+        :return: dict
+        """
+        if self._data is None:
+            self._loader.load(self)
+        if self._data is False:
+            raise exceptions.HttpError("{0} {1} could not be loaded".format(self._loader.kind, self.id))
+        return self._data
+
+    def get(self, key, default=None):
+        return self.todict().get(key, default)
+
+    def __getitem__(self, key):
+        return self.todict()[key]
+
+    def __contains__(self, key):
+        return key in self.todict()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self.todict()[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __repr__(self):
+        return "<LazyResource {0} {1}{2}>".format(self._loader.kind, self.id, "" if self.loaded else " pending")
+
+
+class Loader(object):
+    """Creates lazy resources of one kind and loads the pending ones together
+
+    When a resource is first read, the other resources created by the same
+    loader and not read yet are fetched with it, concurrently, so code
+    touching many resources one by one makes one burst of requests instead of
+    one request per resource. Resources that are no longer referenced are not
+    fetched.
+    """
+
+    def __init__(self, fetch, kind, workers=8, batch_size=100):
+        """
+
+        :param fetch: function taking an id and returning the resource dict, False if it can't be read
+        :param kind: name of the resources, ie: project
+        :param workers: number of requests made at the same time
+        :param batch_size: maximum number of resources loaded together
+        """
+        self.fetch = fetch
+        self.kind = kind
+        self.workers = workers
+        self.batch_size = batch_size
+        self._resources = weakref.WeakValueDictionary()
+        self._pending = []
+        self._lock = threading.RLock()
+
+    def resource(self, resource_id):
+        """The lazy resource for an id, the same object while it is referenced
+
+        :param resource_id: id of the resource
+        :return: LazyResource
+        """
+        with self._lock:
+            resource = self._resources.get(resource_id)
+            if resource is None:
+                resource = LazyResource(self, resource_id)
+                self._resources[resource_id] = resource
+                self._pending.append(weakref.ref(resource))
+            return resource
+
+    def loadall(self, resources):
+        """Load resources concurrently
+
+        :param resources: LazyResource objects of this loader
+        :return: Nothing
+        """
+        with self._lock:
+            batch = [resource for resource in resources if resource._data is None]
+            results = dict(parallel(self.fetch, set(resource.id for resource in batch), workers=self.workers))
+            for resource in batch:
+                resource._data = results[resource.id] or False
+            self._pending = [ref for ref in self._pending if ref() is not None and ref()._data is None]
+
+    def load(self, resource):
+        """Load a resource and up to batch_size - 1 other pending ones
+
+        :param resource: LazyResource of this loader
+        :return: Nothing
+        """
+        with self._lock:
+            if resource._data is not None:
+                return
+            batch = [resource]
+            for ref in self._pending:
+                if len(batch) >= self.batch_size:
+                    break
+                other = ref()
+                if other is not None and other is not resource and other._data is None:
+                    batch.append(other)
+            self.loadall(batch)
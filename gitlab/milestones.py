@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Issue counts of the milestones of a project
+"""
+
+from collections import Counter
+
+from .fleet import parallel
+
+
+class MilestoneStats(object):
+    """Issue counts of one milestone"""
+
+    __slots__ = ("milestone", "complete", "issues", "states", "labels", "assignees")
+
+    def __init__(self, milestone, complete=True):
+        """
+
+        :param milestone: milestone dict
+        :param complete: False when the issues of the milestone could not all be listed
+        """
+        self.milestone = milestone
+        self.complete = complete
+        self.issues = set()
+        self.states = Counter()
+        self.labels = Counter()
+        self.assignees = Counter()
+
+    def add(self, issue):
+        """Count an issue, an issue already counted is ignored
+
+        :param issue: issue dict
+        :return: True if it was counted
+        """
+        if issue["id"] in self.issues:
+            return False
+        self.issues.add(issue["id"])
+        self.states[issue.get("state")] += 1
+        for label in issue.get("labels") or ():
+            self.labels[label] += 1
+        assignee = issue.get("assignee")
+        self.assignees[assignee.get("username") if assignee else None] += 1
+        return True
+
+    @property
+    def total(self):
+        return len(self.issues)
+
+    def todict(self):
+        """json serializable summary
+
+        :return: dict with the milestone id and title, the total and the counts by state, label and assignee
+        """
+        return {"id": self.milestone["id"], "title": self.milestone.get("title"), "complete": self.complete,
+                "total": self.total,
+                "states": dict(self.states), "labels": dict(self.labels),
+                "assignees": dict((str(name) if name is not None else "", count)
+                                  for name, count in self.assignees.items())}
+
+    def __repr__(self):
+        return "<MilestoneStats {0} {1}>".format(self.milestone.get("title"), dict(self.states))
+
+
+def _pages(fn, per_page, *args):
+    """Every item of a paginated call, None if a page can't be read"""
+    items = []
+    page = 1
+    while True:
+        results = fn(*args, page=page, per_page=per_page)
+        if results is False:
+            return None
+        items.extend(results)
+        if len(results) < per_page:
+            return items
+        page += 1
+
+
+def rollup(git, project_id, milestone_ids=None, state=None, hydrate=False, workers=8, per_page=100):
+    """Count the issues of the milestones of a project
+
+    The issues of every milestone are listed concurrently. Issues are counted
+    once per milestone even if they show up on two pages while being edited.
+
+    :param git: Gitlab instance
+    :param project_id: project id
+    :param milestone_ids: ids of the milestones to count, defaults to all of them
+    :param state: only count milestones in this state, ie: active or closed
+    :param hydrate: fetch the issues with getprojectissue when the listing lacks labels or assignee,
+        each issue is fetched once
+    :param workers: number of requests made at the same time
+    :param per_page: items requested per page
+    :return: list of MilestoneStats in the order of getmilestones, False if the milestones can't be listed
+    """
+    milestones = _pages(git.getmilestones, per_page, project_id)
+    if milestones is None:
+        return False
+    milestones = [milestone for milestone in milestones
+                  if (milestone_ids is None or milestone["id"] in milestone_ids) and
+                  (state is None or milestone.get("state") == state)]
+
+    def issues(milestone):
+        return _pages(git.getmilestoneissues, per_page, project_id, milestone["id"])
+
+    listed = dict((milestone["id"], found) for milestone, found in parallel(issues, milestones, workers=workers))
+
+    if hydrate:
+        partial = {}
+        for found in listed.values():
+            for issue in found or ():
+                if "labels" not in issue or "assignee" not in issue:
+                    partial[issue["id"]] = issue
+        full = dict((issue_id, issue) for issue_id, issue in parallel(
+            lambda issue_id: git.getprojectissue(project_id, issue_id), partial, workers=workers) if issue)
+        listed = dict((milestone_id, [full.get(issue["id"], issue) for issue in found] if found is not None else None)
+                      for milestone_id, found in listed.items())
+
+    stats = []
+    for milestone in milestones:
+        found = listed[milestone["id"]]
+        milestonestats = MilestoneStats(milestone, complete=found is not None)
+        for issue in found or ():
+            milestonestats.add(issue)
+        stats.append(milestonestats)
+    return stats
@@ -0,0 +1,491 @@
+# -*- coding: utf-8 -*-
+"""
+Local search indexes over projects, issues and merge requests
+"""
+
+import bisect
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+from . import exceptions
+from .fleet import parallel
+from .utils import timestamp
+
+_WORD = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def _trigrams(text):
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+
+class ProjectIndex(object):
+    """Prefix, substring and namespace search over every project, in memory
+
+    Words of the project names and paths are kept in a sorted list for prefix
+    queries, and the trigrams of the full path and name map to the projects
+    containing them for substring queries, that map is only built by the first
+    substring query. The index is built from one scan of getprojectsall and
+    refreshed with the projects active since.
+    """
+
+    FIELDS = ("id", "name", "path", "path_with_namespace", "description", "web_url", "default_branch",
+              "last_activity_at")
+
+    def __init__(self, git=None, path=None, per_page=100):
+        """
+
+        :param git: Gitlab instance, only needed to refresh
+        :param path: optional json file to load the index from, see save
+        :param per_page: projects requested per page
+        """
+        self.git = git
+        self.per_page = per_page
+        self.projects = {}
+        self.hwm = None
+        self._words = []
+        self._wordsof = {}
+        self._texts = {}
+        # built on the first substring query, prefix queries don't need it
+        self._trigrams = None
+        self._lock = threading.RLock()
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def _add(self, project, bulk=False):
+        project = dict((field, project.get(field)) for field in self.FIELDS)
+        project_id = project["id"]
+        if project_id in self.projects:
+            self._remove(project_id)
+        self.projects[project_id] = project
+        name = (project["name"] or "").lower()
+        full = (project["path_with_namespace"] or "").lower()
+        words = set(_WORD.findall(name) + _WORD.findall(full))
+        words.update(word for word in (name, full, (project["path"] or "").lower()) if word)
+        self._wordsof[project_id] = words
+        for word in words:
+            if bulk:
+                self._words.append((word, project_id))
+            else:
+                bisect.insort(self._words, (word, project_id))
+        text = full + "\n" + name
+        self._texts[project_id] = text
+        if self._trigrams is not None:
+            self._post(project_id, text)
+
+    def _post(self, project_id, text):
+        trigrams = self._trigrams
+        for trigram in _trigrams(text):
+            ids = trigrams.get(trigram)
+            if ids is None:
+                trigrams[trigram] = set([project_id])
+            else:
+                ids.add(project_id)
+
+    def _remove(self, project_id):
+        self.projects.pop(project_id, None)
+        for word in self._wordsof.pop(project_id, ()):
+            position = bisect.bisect_left(self._words, (word, project_id))
+            if position < len(self._words) and self._words[position] == (word, project_id):
+                del self._words[position]
+        text = self._texts.pop(project_id, "")
+        if self._trigrams is None:
+            return
+        for trigram in _trigrams(text):
+            ids = self._trigrams.get(trigram)
+            if ids is not None:
+                ids.discard(project_id)
+                if not ids:
+                    del self._trigrams[trigram]
+
+    def _build(self, projects):
+        self.projects = {}
+        self._words = []
+        self._wordsof = {}
+        self._texts = {}
+        self._trigrams = None
+        for project in projects:
+            self._add(project, bulk=True)
+        self._words.sort()
+
+    def _track(self, project):
+        activity = timestamp(project.get("last_activity_at"))
+        if activity is not None and (self.hwm is None or activity > self.hwm):
+            self.hwm = activity
+
+    def _projects(self):
+        """Every project, None if a page can't be read"""
+        projects = []
+        page = 1
+        while True:
+            results = self.git.getprojectsall(page=page, per_page=self.per_page)
+            if results is False:
+                return None
+            projects.extend(results)
+            if len(results) < self.per_page:
+                return projects
+            page += 1
+
+    def refresh(self, full=False):
+        """Bring the index up to date
+
+        Without full only the projects active since the last refresh are read,
+        ordered by last_activity_at. A full refresh also drops deleted projects.
+        If a page can't be read the index and its mark are left as they were.
+
+        :param full: scan every project again
+        :return: number of projects indexed
+        :raise: HttpError if the projects could not be listed
+        """
+        with self._lock:
+            if full or self.hwm is None:
+                projects = self._projects()
+                if projects is None:
+                    raise exceptions.HttpError("The projects could not be listed")
+                self.hwm = None
+                self._build(projects)
+                for project in projects:
+                    self._track(project)
+                return len(projects)
+
+            changed = []
+            page = 1
+            reached = False
+            while not reached:
+                results = self.git.getprojectsall(page=page, per_page=self.per_page, order_by="last_activity_at",
+                                                  sort="desc")
+                if results is False:
+                    raise exceptions.HttpError("The projects could not be listed")
+                for project in results:
+                    activity = timestamp(project.get("last_activity_at"))
+                    if activity is not None and activity < self.hwm:
+                        reached = True
+                        break
+                    changed.append(project)
+                if len(results) < self.per_page:
+                    break
+                page += 1
+            for project in changed:
+                self._add(project)
+                self._track(project)
+            return len(changed)
+
+    def _inscope(self, project_id, namespace):
+        return namespace is None or self._texts[project_id].startswith(namespace)
+
+    def prefix(self, query, namespace=None, limit=20):
+        """Projects with a word of their name or path starting with query
+
+        :param query: start of a word, case insensitive
+        :param namespace: only return projects in this namespace or its subgroups
+        :param limit: maximum number of results
+        :return: list of project dicts, exact word matches first
+        """
+        query = query.strip().lower()
+        namespace = namespace.strip("/").lower() + "/" if namespace else None
+        found = []
+        with self._lock:
+            position = bisect.bisect_left(self._words, (query,))
+            while position < len(self._words) and len(found) < limit:
+                word, project_id = self._words[position]
+                if not word.startswith(query):
+                    break
+                if project_id not in found and self._inscope(project_id, namespace):
+                    found.append(project_id)
+                position += 1
+            return [self.projects[project_id] for project_id in found]
+
+    def substring(self, query, namespace=None, limit=20):
+        """Projects whose full path or name contains query
+
+        :param query: text to look for, case insensitive
+        :param namespace: only return projects in this namespace or its subgroups
+        :param limit: maximum number of results
+        :return: list of project dicts, shortest paths first
+        """
+        query = query.strip().lower()
+        namespace = namespace.strip("/").lower() + "/" if namespace else None
+        with self._lock:
+            if len(query) < 3:
+                candidates = self._texts
+            else:
+                if self._trigrams is None:
+                    self._trigrams = {}
+                    for project_id, text in self._texts.items():
+                        self._post(project_id, text)
+                candidates = None
+                for ids in sorted((self._trigrams.get(trigram, ()) for trigram in _trigrams(query)), key=len):
+                    candidates = set(ids) if candidates is None else candidates & ids
+                    if not candidates:
+                        return []
+            found = [project_id for project_id in candidates
+                     if query in self._texts[project_id] and self._inscope(project_id, namespace)]
+            found.sort(key=lambda project_id: (len(self._texts[project_id]), self._texts[project_id]))
+            return [self.projects[project_id] for project_id in found[:limit]]
+
+    def search(self, query, namespace=None, limit=20):
+        """Prefix matches followed by substring matches, as a project picker wants them
+
+        :param query: text typed by the user
+        :param namespace: only return projects in this namespace or its subgroups
+        :param limit: maximum number of results
+        :return: list of project dicts
+        """
+        results = self.prefix(query, namespace, limit)
+        # one or two characters match nearly everything, prefixes are enough
+        if len(results) < limit and len(query.strip()) >= 3:
+            ids = set(project["id"] for project in results)
+            results.extend(project for project in self.substring(query, namespace, limit)
+                           if project["id"] not in ids)
+        return results[:limit]
+
+    def save(self, path):
+        """Write the index to a json file atomically
+
+        :param path: file path
+        :return: Nothing
+        """
+        with self._lock:
+            data = {"hwm": self.hwm, "projects": list(self.projects.values())}
+        temp = path + ".tmp"
+        with open(temp, "w") as index:
+            json.dump(data, index)
+        os.rename(temp, path)
+
+    def load(self, path):
+        """Replace the index with the one saved in a file
+
+        :param path: file written by save
+        :return: Nothing
+        """
+        with open(path) as index:
+            data = json.load(index)
+        with self._lock:
+            self._build(data["projects"])
+            self.hwm = data["hwm"]
+
+    def __len__(self):
+        return len(self.projects)
+
+
+def _terms(text):
+    return [word for word in _WORD.findall(text.lower()) if len(word) > 1]
+
+
+def _pages(fn, per_page, *args, **kwargs):
+    """Items of a paginated call, None is yielded last if a page can't be read"""
+    page = 1
+    while True:
+        results = fn(*args, page=page, per_page=per_page, **kwargs)
+        if results is False:
+            yield None
+            return
+        for result in results:
+            yield result
+        if len(results) < per_page:
+            return
+        page += 1
+
+
+class TextIndex(object):
+    """Ranked keyword search over the issues and merge requests of many projects
+
+    An inverted index maps every term to the documents containing it and how
+    many times, queries are ranked with BM25. Notes are indexed with the issue
+    or merge request they belong to. Updates only read the items changed since
+    the previous update of each project, newest first.
+    """
+
+    KINDS = {
+        "issue": ("getprojectissues", "getissuewallnotes"),
+        "merge_request": ("getmergerequests", "getmergerequestwallnotes"),
+    }
+    FIELDS = ("id", "iid", "project_id", "title", "state", "updated_at", "web_url")
+
+    def __init__(self, git=None, path=None, notes=True, workers=8, per_page=100, k1=1.2, b=0.75):
+        """
+
+        :param git: Gitlab instance, only needed to update
+        :param path: optional json file to load the index from, see save
+        :param notes: also index the notes of every issue and merge request
+        :param workers: number of projects read at the same time
+        :param per_page: items requested per page
+        :param k1: BM25 term frequency saturation
+        :param b: BM25 length normalization
+        """
+        self.git = git
+        self.notes = notes
+        self.workers = workers
+        self.per_page = per_page
+        self.k1 = k1
+        self.b = b
+        self.marks = {}
+        self.documents = {}
+        self._postings = {}
+        self._length = 0
+        self._lock = threading.RLock()
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def add(self, kind, item, notes=()):
+        """Index an issue or merge request, replacing its previous version
+
+        :param kind: issue or merge_request
+        :param item: dict as returned by getprojectissues or getmergerequests
+        :param notes: note dicts of the item
+        :return: Nothing
+        """
+        text = [item.get("title") or "", item.get("description") or ""]
+        text.extend(note.get("body") or "" for note in notes)
+        counts = Counter(_terms("\n".join(text)))
+        meta = dict((field, item.get(field)) for field in self.FIELDS)
+        meta["kind"] = kind
+        with self._lock:
+            self._store((kind, item["id"]), meta, counts)
+
+    def _store(self, key, meta, counts):
+        self.remove(*key)
+        length = sum(counts.values())
+        self.documents[key] = (meta, counts, length)
+        self._length += length
+        for term, count in counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                self._postings[term] = {key: count}
+            else:
+                postings[key] = count
+
+    def remove(self, kind, item_id):
+        """Drop an issue or merge request from the index
+
+        :param kind: issue or merge_request
+        :param item_id: id of the item
+        :return: Nothing
+        """
+        with self._lock:
+            document = self.documents.pop((kind, item_id), None)
+            if document is None:
+                return
+            counts = document[1]
+            self._length -= document[2]
+            for term in counts:
+                postings = self._postings[term]
+                del postings[(kind, item_id)]
+                if not postings:
+                    del self._postings[term]
+
+    def _fetch(self, project_id):
+        changed = []
+        marks = {}
+        for kind, (listing, notes) in sorted(self.KINDS.items()):
+            key = "{0}:{1}".format(kind, project_id)
+            mark = newest = self.marks.get(key)
+            for item in _pages(getattr(self.git, listing), self.per_page, project_id, order_by="updated_at",
+                               sort="desc"):
+                if item is None:
+                    return None
+                updated = timestamp(item.get("updated_at"))
+                if mark is not None and updated is not None and updated < mark:
+                    break
+                if updated is not None and (newest is None or updated > newest):
+                    newest = updated
+                found = []
+                if self.notes:
+                    found = list(_pages(getattr(self.git, notes), self.per_page, project_id, item["id"]))
+                    if None in found:
+                        return None
+                changed.append((kind, item, found))
+            marks[key] = newest
+        return changed, marks
+
+    def update(self, project_ids):
+        """Index the issues and merge requests changed since the previous update
+
+        :param project_ids: ids of the projects
+        :return: (number of items indexed, ids of the projects that could not be read)
+        """
+        indexed = 0
+        failed = []
+        for project_id, result in parallel(self._fetch, project_ids, workers=self.workers):
+            if result is None:
+                # the project is read again from its previous marks next time
+                failed.append(project_id)
+                continue
+            changed, marks = result
+            for kind, item, notes in changed:
+                self.add(kind, item, notes)
+            with self._lock:
+                self.marks.update((key, value) for key, value in marks.items() if value is not None)
+            indexed += len(changed)
+        return indexed, failed
+
+    def search(self, query, kind=None, project_ids=None, state=None, limit=20):
+        """Issues and merge requests matching keywords, best first
+
+        :param query: keywords
+        :param kind: only return issue or merge_request documents
+        :param project_ids: only return documents of these projects
+        :param state: only return documents in this state, ie: opened
+        :param limit: maximum number of results
+        :return: list of (score, document dict) tuples
+        """
+        terms = set(_terms(query))
+        if project_ids is not None:
+            project_ids = set(project_ids)
+        scores = {}
+        with self._lock:
+            total = len(self.documents)
+            if not total:
+                return []
+            average = float(self._length) / total
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, count in postings.items():
+                    meta, _, length = self.documents[key]
+                    if (kind is not None and meta["kind"] != kind) or \
+                            (project_ids is not None and meta["project_id"] not in project_ids) or \
+                            (state is not None and meta["state"] != state):
+                        continue
+                    scores[key] = scores.get(key, 0.0) + idf * count * (self.k1 + 1) / (
+                        count + self.k1 * (1 - self.b + self.b * length / average))
+            best = heapq.nlargest(limit, scores.items(), key=lambda entry: entry[1])
+            return [(score, self.documents[key][0]) for key, score in best]
+
+    def save(self, path):
+        """Write the index to a json file atomically
+
+        :param path: file path
+        :return: Nothing
+        """
+        with self._lock:
+            data = {"marks": self.marks, "documents": [[meta, counts] for meta, counts, _ in self.documents.values()]}
+            temp = path + ".tmp"
+            with open(temp, "w") as index:
+                json.dump(data, index)
+        os.rename(temp, path)
+
+    def load(self, path):
+        """Replace the index with the one saved in a file
+
+        :param path: file written by save
+        :return: Nothing
+        """
+        with open(path) as index:
+            data = json.load(index)
+        with self._lock:
+            self.documents = {}
+            self._postings = {}
+            self._length = 0
+            self.marks = data["marks"]
+            for meta, counts in data["documents"]:
+                self._store((meta["kind"], meta["id"]), meta, Counter(counts))
+
+    def __len__(self):
+        return len(self.documents)
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Export the snippets of many projects to a tar or json lines archive
+"""
+
+import codecs
+import io
+import json
+import os
+import tarfile
+import tempfile
+import time
+
+from .fleet import ChangeReport, parallel
+
+
+class _Archive(object):
+    """Output file with a journal of the snippets completely written to it
+
+    The journal holds the size of the output after each snippet. Opening an
+    archive with a journal cuts whatever was written after the last complete
+    snippet and appends from there.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.journal = path + ".journal"
+        self.done = set()
+        offset = 0
+        if os.path.exists(path) and os.path.exists(self.journal):
+            with open(self.journal) as journal:
+                for line in journal:
+                    try:
+                        key, end = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.done.add(key)
+                    offset = end
+            self.fileobj = open(path, "r+b")
+        else:
+            self.fileobj = open(path, "wb")
+            open(self.journal, "w").close()
+        self.fileobj.seek(offset)
+        self.fileobj.truncate()
+        self._journal = open(self.journal, "a")
+
+    def commit(self, key):
+        self.fileobj.flush()
+        self._journal.write(json.dumps([key, self.fileobj.tell()]) + "\n")
+        self._journal.flush()
+        self.done.add(key)
+
+    def close(self):
+        self._journal.close()
+        self.fileobj.close()
+
+
+class _TarArchive(_Archive):
+    def __init__(self, path):
+        super(_TarArchive, self).__init__(path)
+        self.tar = tarfile.TarFile(fileobj=self.fileobj, mode="w")
+
+    def write(self, key, meta, content, size):
+        data = json.dumps(meta, sort_keys=True, indent=2).encode("utf-8")
+        info = tarfile.TarInfo(key + "/meta.json")
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self.tar.addfile(info, io.BytesIO(data))
+        # content has its own directory, a snippet named meta.json must not replace the metadata
+        info = tarfile.TarInfo(key + "/content/" + os.path.basename(meta.get("file_name") or "content"))
+        info.size = size
+        info.mtime = int(time.time())
+        self.tar.addfile(info, content)
+        # TarFile buffers nothing after addfile, the file position is the end of the member
+        self.commit(key)
+
+    def close(self):
+        self.tar.close()
+        super(_TarArchive, self).close()
+
+
+class _JSONLinesArchive(_Archive):
+    def write(self, key, meta, content, size):
+        # the content is escaped chunk by chunk to keep the memory bounded
+        head = json.dumps(dict(meta, key=key), sort_keys=True)[:-1]
+        self.fileobj.write((head + ', "content": "').encode("utf-8"))
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        while True:
+            chunk = content.read(64 * 1024)
+            text = decoder.decode(chunk, final=not chunk)
+            if text:
+                self.fileobj.write(json.dumps(text)[1:-1].encode("utf-8"))
+            if not chunk:
+                break
+        self.fileobj.write(b'"}\n')
+        self.commit(key)
+
+
+ARCHIVES = {"tar": _TarArchive, "jsonl": _JSONLinesArchive}
+
+
+class SnippetExporter(object):
+    """Streams the snippets of many projects into one archive
+
+    Snippets are listed and downloaded concurrently, each download is spooled
+    to a temporary file that only stays in memory while small, and written to
+    the archive by the calling thread. A tar archive holds key/meta.json and
+    key/content/file_name for each snippet, a json lines archive one object per
+    snippet with its content. The key of a snippet is project_id/snippet_id.
+    """
+
+    def __init__(self, git, workers=8, per_page=100, spool_size=1024 * 1024):
+        """
+
+        :param git: Gitlab instance
+        :param workers: number of requests made at the same time
+        :param per_page: snippets requested per page
+        :param spool_size: bytes of a snippet kept in memory before spooling it to disk
+        """
+        self.git = git
+        self.workers = workers
+        self.per_page = per_page
+        self.spool_size = spool_size
+
+    def _snippets(self, project_id):
+        snippets = []
+        page = 1
+        while True:
+            results = self.git.getsnippets(project_id, page=page, per_page=self.per_page)
+            if results is False:
+                return None
+            snippets.extend(results)
+            if len(results) < self.per_page:
+                return snippets
+            page += 1
+
+    def _download(self, item):
+        project_id, snippet = item
+        spool = tempfile.SpooledTemporaryFile(self.spool_size)
+        try:
+            if not self.git.getsnippetcontent(project_id, snippet["id"], fileobj=spool):
+                spool.close()
+                return None
+        except Exception:
+            spool.close()
+            raise
+        return spool
+
+    def export(self, project_ids, path, fmt="tar"):
+        """Export the snippets of the projects
+
+        Exporting again to the same path resumes: the snippets already in the
+        archive are skipped and the new ones are appended.
+
+        :param project_ids: ids of the projects
+        :param path: archive to write, path.journal is written next to it
+        :param fmt: tar or jsonl
+        :return: ChangeReport with an export change per snippet written or failed, and a list change per
+            project whose snippets could not be listed
+        """
+        report = ChangeReport()
+        archive = ARCHIVES[fmt](path)
+
+        def pending():
+            for project_id, snippets in parallel(self._snippets, project_ids, workers=self.workers):
+                if snippets is None:
+                    report.add(project_id, "list", None, "failed")
+                    continue
+                for snippet in snippets:
+                    if "{0}/{1}".format(project_id, snippet["id"]) not in archive.done:
+                        yield project_id, snippet
+
+        try:
+            for (project_id, snippet), spool in parallel(self._download, pending(), workers=self.workers):
+                if spool is None:
+                    report.add(project_id, "export", snippet["id"], "failed")
+                    continue
+                try:
+                    size = spool.tell()
+                    spool.seek(0)
+                    key = "{0}/{1}".format(project_id, snippet["id"])
+                    archive.write(key, dict(snippet, project_id=project_id), spool, size)
+                finally:
+                    spool.close()
+                report.add(project_id, "export", snippet["id"], "done")
+        finally:
+            archive.close()
+        return report
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+In memory index of the tags of a project ordered by semantic version
+"""
+
+import bisect
+import re
+import threading
+import time
+
+from . import exceptions
+from .fleet import parallel
+
+_SEMVER = re.compile(r"^[vV]?(\d+)(?:\.(\d+))?(?:\.(\d+))?(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$")
+
+
+def versionkey(name):
+    """Sort key of a version or tag name, ie: v1.2.3-rc.1
+
+    Missing minor and patch numbers count as 0 and pre-releases sort before
+    their release, as in semver.
+
+    :param name: version string
+    :return: tuple to compare versions, None if name is not a version
+    """
+    match = _SEMVER.match(name)
+    if match is None:
+        return None
+    major, minor, patch, prerelease = match.groups()
+    if prerelease is None:
+        pre = (1,)
+    else:
+        # numeric identifiers sort before alphanumeric ones
+        pre = (0,) + tuple((0, int(part), "") if part.isdigit() else (1, 0, part)
+                           for part in prerelease.split("."))
+    return int(major), int(minor or 0), int(patch or 0), pre
+
+
+def _parse(version):
+    key = versionkey(version)
+    if key is None:
+        raise ValueError("Not a version: {0}".format(version))
+    return key
+
+
+def isprerelease(key):
+    return key[3][0] == 0
+
+
+class TagIndex(object):
+    """Tags of a project sorted by version
+
+    The tags are only listed again when the last_activity_at of the project
+    changed, and then only the new or moved tags are parsed and inserted.
+    Get a shared index with Gitlab.gettagindex instead of creating one.
+    """
+
+    def __init__(self, git, project_id, ttl=60, per_page=100):
+        """
+
+        :param git: Gitlab instance
+        :param project_id: project id
+        :param ttl: seconds during which the index is trusted without asking the server
+        :param per_page: tags requested per page
+        """
+        self.git = git
+        self.project_id = project_id
+        self.ttl = ttl
+        self.per_page = per_page
+        self.tags = {}
+        self._keys = []
+        self._names = []
+        self._activity = None
+        self._checked = None
+        self._contains = {}
+        self._lock = threading.RLock()
+
+    def _insert(self, tag):
+        key = versionkey(tag["name"])
+        if key is None:
+            return
+        position = bisect.bisect_left(self._keys, (key, tag["name"]))
+        self._keys.insert(position, (key, tag["name"]))
+
+    def _remove(self, name):
+        key = versionkey(name)
+        if key is None:
+            return
+        position = bisect.bisect_left(self._keys, (key, name))
+        if position < len(self._keys) and self._keys[position] == (key, name):
+            del self._keys[position]
+
+    def add(self, tag):
+        """Add or replace a tag without asking the server, ie: after createrepositorytag
+
+        :param tag: tag dict as returned by getrepositorytags
+        :return: Nothing
+        """
+        with self._lock:
+            if tag["name"] in self.tags:
+                self._remove(tag["name"])
+            self.tags[tag["name"]] = tag
+            self._insert(tag)
+            self._contains.clear()
+
+    def refresh(self, force=False):
+        """Bring the index up to date
+
+        :param force: list the tags even if the ttl did not expire and the project did not change
+        :return: True if the tags were listed again
+        """
+        with self._lock:
+            now = time.time()
+            if not force and self._checked is not None and now - self._checked < self.ttl:
+                return False
+            project = self.git.getproject(self.project_id)
+            activity = project.get("last_activity_at") if project else None
+            if not force and self._checked is not None and activity is not None and activity == self._activity:
+                self._checked = now
+                return False
+
+            listed = {}
+            page = 1
+            while True:
+                results = self.git.getrepositorytags(self.project_id, page=page, per_page=self.per_page)
+                if results is False:
+                    # keep what we had and try again on the next call
+                    return False
+                for tag in results:
+                    listed[tag["name"]] = tag
+                if len(results) < self.per_page:
+                    break
+                page += 1
+
+            for name in [name for name in self.tags if name not in listed]:
+                self._remove(name)
+                del self.tags[name]
+            for name, tag in listed.items():
+                old = self.tags.get(name)
+                if old is None:
+                    self._insert(tag)
+                elif (old.get("commit") or {}).get("id") == (tag.get("commit") or {}).get("id"):
+                    continue
+                self.tags[name] = tag
+            self._contains.clear()
+            self._activity = activity
+            self._checked = now
+            return True
+
+    def versions(self, prerelease=False):
+        """Version tags, oldest first
+
+        :param prerelease: include pre-releases
+        :return: list of tag dicts
+        """
+        self.refresh()
+        with self._lock:
+            return [self.tags[name] for key, name in self._keys if prerelease or not isprerelease(key)]
+
+    def latest(self, prerelease=False):
+        """Newest version tag
+
+        :param prerelease: a pre-release can be returned
+        :return: tag dict, None if the project has no version tag
+        """
+        self.refresh()
+        with self._lock:
+            for key, name in reversed(self._keys):
+                if prerelease or not isprerelease(key):
+                    return self.tags[name]
+        return None
+
+    def range(self, low=None, high=None, prerelease=False):
+        """Version tags from low included to high excluded, ie: range("1.2", "2") for every 1.x from 1.2
+
+        :param low: lowest version, None for no limit
+        :param high: version to stop before, along with its pre-releases, None for no limit
+        :param prerelease: include pre-releases
+        :return: list of tag dicts, oldest first
+        """
+        self.refresh()
+        with self._lock:
+            start, end = 0, len(self._keys)
+            if low is not None:
+                start = bisect.bisect_left(self._keys, (_parse(low),))
+            if high is not None:
+                bound = _parse(high)
+                if not isprerelease(bound):
+                    # (0,) sorts before every pre-release identifier, so the pre-releases of high are excluded too
+                    bound = bound[:3] + ((0,),)
+                end = bisect.bisect_left(self._keys, (bound,))
+            return [self.tags[name] for key, name in self._keys[start:end] if prerelease or not isprerelease(key)]
+
+    def _hascommit(self, name, sha):
+        cached = self._contains.get((name, sha))
+        if cached is None:
+            compare = self.git.compare_branches_tags_commits(self.project_id, name, sha)
+            if compare is False:
+                # not cached, the next call compares again
+                raise exceptions.HttpError("The tag {0} could not be compared with {1}".format(name, sha))
+            # nothing in sha that is not in the tag: the tag contains it
+            cached = not compare.get("commits")
+            self._contains[(name, sha)] = cached
+        return cached
+
+    def containing(self, sha, linear=True, workers=8):
+        """Version tags whose history contains a commit
+
+        :param sha: commit sha
+        :param linear: versions are released from a single line of history, a version contains everything
+            older versions contain. The first containing version is then found by bisection
+        :param workers: number of comparisons made at the same time when not linear
+        :return: list of tag dicts, oldest first
+        :raise: HttpError if a tag could not be compared with the commit
+        """
+        self.refresh()
+        with self._lock:
+            names = [name for key, name in self._keys]
+        if linear:
+            low, high = 0, len(names)
+            while low < high:
+                middle = (low + high) // 2
+                if self._hascommit(names[middle], sha):
+                    high = middle
+                else:
+                    low = middle + 1
+            return [self.tags[name] for name in names[low:]]
+        found = set(name for name, contains in parallel(lambda name: self._hascommit(name, sha), names,
+                                                         workers=workers) if contains)
+        return [self.tags[name] for name in names if name in found]
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP transports used by the Gitlab class, including record/replay of sessions
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from . import exceptions
+
+
+class Transport(object):
+    """Sends the requests of a Gitlab instance with the requests library
+
+    Every endpoint method goes through the transport of its instance, so
+    replacing it changes how all of them reach the server. requests is only
+    imported by the first request, which keeps importing gitlab cheap.
+    """
+
+    def __init__(self, session=None):
+        """
+
+        :param session: optional requests.Session to reuse connections
+        """
+        self.session = session
+
+    def request(self, method, url, **kwargs):
+        """Send a request
+
+        :param method: http verb
+        :param url: full url
+        :param kwargs: any argument accepted by requests.request
+        :return: the response
+        """
+        if self.session is not None:
+            return self.session.request(method, url, **kwargs)
+        import requests
+        return requests.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("get", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("post", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("put", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("delete", url, **kwargs)
+
+
+class Base64JSONBody(object):
+    """JSON request body whose "content" field is a file, base64 encoded while it is sent
+
+    Only chunk_size bytes of the file are held in memory at a time. When the
+    remaining size of the file is known the body has a length, so it is sent
+    with a Content-Length instead of chunked.
+    """
+
+    def __init__(self, fields, fileobj, chunk_size=3 * 64 * 1024):
+        """
+
+        :param fields: dict with the other fields of the body
+        :param fileobj: file object opened in binary mode
+        :param chunk_size: bytes read at a time, rounded down to a multiple of 3
+        """
+        self.fileobj = fileobj
+        self.chunk_size = max(3, chunk_size - chunk_size % 3)
+        items = [json.dumps(key) + ": " + json.dumps(value) for key, value in sorted(fields.items())]
+        items.append('"content": "')
+        self.prefix = ("{" + ", ".join(items)).encode("utf-8")
+        self.suffix = b'"}'
+        self.length = None
+        try:
+            size = os.fstat(fileobj.fileno()).st_size - fileobj.tell()
+        except (AttributeError, OSError, IOError, ValueError):
+            try:
+                position = fileobj.tell()
+                size = fileobj.seek(0, os.SEEK_END) - position
+                fileobj.seek(position)
+            except (AttributeError, OSError, IOError, ValueError, TypeError):
+                size = None
+        if size is not None:
+            self.length = len(self.prefix) + 4 * ((size + 2) // 3) + len(self.suffix)
+
+    def __iter__(self):
+        yield self.prefix
+        while True:
+            chunk = self.fileobj.read(self.chunk_size)
+            if not chunk:
+                break
+            if not isinstance(chunk, bytes):
+                chunk = chunk.encode("utf-8")
+            # a short read in the middle would add padding, top it up to a multiple of 3
+            while len(chunk) % 3:
+                more = self.fileobj.read(3 - len(chunk) % 3)
+                if not more:
+                    break
+                chunk += more if isinstance(more, bytes) else more.encode("utf-8")
+            yield base64.b64encode(chunk)
+        yield self.suffix
+
+    def body(self):
+        """The object to pass as data to requests
+
+        :return: the body itself if its length is known, a generator (chunked upload) if not
+        """
+        if self.length is None:
+            return iter(self)
+        return self
+
+    def __len__(self):
+        return self.length
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        import gzip
+        return gzip.open(path, mode + "t")
+    return open(path, mode)
+
+
+def _normalize(value):
+    """Comparable form of a params/data/json argument"""
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return sorted([str(k), str(v)] for k, v in value.items() if v is not None)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    if isinstance(value, str):
+        return value
+    # streamed bodies can't be recorded without consuming them
+    return "<stream>"
+
+
+def _matchkey(method, url, kwargs):
+    body = kwargs.get("data")
+    if body is None and kwargs.get("json") is not None:
+        body = json.dumps(kwargs["json"], sort_keys=True)
+    return json.dumps([method.upper(), url, _normalize(kwargs.get("params")), _normalize(body)])
+
+
+class RecordingTransport(Transport):
+    """Transport that writes every exchange to a cassette file
+
+    The cassette holds one json document per line, gzip compressed when the
+    path ends with .gz. Request headers are not stored so tokens don't leak
+    into the file.
+    """
+
+    def __init__(self, path, transport=None):
+        """
+
+        :param path: cassette file to write
+        :param transport: transport doing the real requests, defaults to Transport()
+        """
+        super(RecordingTransport, self).__init__()
+        self.path = path
+        self.transport = transport or Transport()
+        self._file = _open(path, "w")
+        self._lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        start = time.time()
+        response = self.transport.request(method, url, **kwargs)
+        elapsed = time.time() - start
+        entry = {
+            "key": _matchkey(method, url, kwargs),
+            "status": response.status_code,
+            "headers": dict(response.headers),
+            "body": base64.b64encode(response.content).decode("ascii"),
+            "elapsed": round(elapsed, 6),
+        }
+        with self._lock:
+            self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        return response
+
+    def close(self):
+        """Flush and close the cassette
+
+        :return: Nothing
+        """
+        with self._lock:
+            self._file.close()
+
+
+class ReplayTransport(Transport):
+    """Transport answering from a cassette written by RecordingTransport
+
+    Requests are matched on verb, url, params and body. Repeated identical
+    requests get the recorded responses in order, the last one is repeated
+    once they are exhausted.
+    """
+
+    def __init__(self, path, realtime=False):
+        """
+
+        :param path: cassette file to read
+        :param realtime: sleep the recorded server time before answering
+        """
+        super(ReplayTransport, self).__init__()
+        self.realtime = realtime
+        self._interactions = {}
+        self._lock = threading.Lock()
+        with _open(path, "r") as cassette:
+            for line in cassette:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._interactions.setdefault(entry["key"], deque()).append(entry)
+
+    def request(self, method, url, **kwargs):
+        key = _matchkey(method, url, kwargs)
+        with self._lock:
+            recorded = self._interactions.get(key)
+            if not recorded:
+                raise exceptions.UnrecordedRequest("{0} {1}".format(method.upper(), url))
+            entry = recorded.popleft() if len(recorded) > 1 else recorded[0]
+        if self.realtime:
+            time.sleep(entry["elapsed"])
+        from datetime import timedelta
+        import requests
+        from requests.structures import CaseInsensitiveDict
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = base64.b64decode(entry["body"])
+        # lets iter_content work on replayed responses of streamed requests
+        response._content_consumed = True
+        response.encoding = "utf-8"
+        response.url = url
+        response.elapsed = timedelta(seconds=entry["elapsed"])
+        return response
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Lazy parser for the unified diffs returned by getrepositorycommitdiff,
+getmergerequestchanges and compare_branches_tags_commits
+"""
+
+import re
+from collections import namedtuple
+
+_HUNK = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@ ?(.*)$", re.MULTILINE)
+
+# kind is "+", "-", " " or "\\" (no newline at end of file), the line number missing on a side is None
+Line = namedtuple("Line", ["kind", "old_lineno", "new_lineno", "text"])
+
+
+class Hunk(object):
+    """One @@ block of a file diff, its lines are only split when first read"""
+
+    __slots__ = ("old_start", "old_count", "new_start", "new_count", "section", "_text", "_lines")
+
+    def __init__(self, old_start, old_count, new_start, new_count, section, text):
+        self.old_start = old_start
+        self.old_count = old_count
+        self.new_start = new_start
+        self.new_count = new_count
+        self.section = section
+        self._text = text
+        self._lines = None
+
+    @property
+    def lines(self):
+        """Tuple of Line"""
+        if self._lines is None:
+            lines = []
+            old, new = self.old_start, self.new_start
+            for text in self._text.split("\n"):
+                if not text:
+                    continue
+                kind = text[0]
+                if kind == "+":
+                    lines.append(Line(kind, None, new, text[1:]))
+                    new += 1
+                elif kind == "-":
+                    lines.append(Line(kind, old, None, text[1:]))
+                    old += 1
+                elif kind == "\\":
+                    lines.append(Line(kind, None, None, text[1:].lstrip()))
+                else:
+                    lines.append(Line(" ", old, new, text[1:]))
+                    old += 1
+                    new += 1
+            self._lines = tuple(lines)
+        return self._lines
+
+    def __repr__(self):
+        return "<Hunk -{0},{1} +{2},{3}>".format(self.old_start, self.old_count, self.new_start, self.new_count)
+
+
+class FileDiff(object):
+    """Diff of one file
+
+    added, removed and binary are computed with a couple of string scans
+    without splitting the diff in lines, hunks are parsed when iterated.
+    """
+
+    __slots__ = ("old_path", "new_path", "new_file", "deleted_file", "renamed_file", "a_mode", "b_mode",
+                 "diff", "_body", "_stats")
+
+    def __init__(self, diff, old_path=None, new_path=None, new_file=False, deleted_file=False,
+                 renamed_file=False, a_mode=None, b_mode=None):
+        self.diff = diff or ""
+        self.old_path = old_path
+        self.new_path = new_path
+        self.new_file = bool(new_file)
+        self.deleted_file = bool(deleted_file)
+        self.renamed_file = bool(renamed_file)
+        self.a_mode = a_mode
+        self.b_mode = b_mode
+        self._body = None
+        self._stats = None
+
+    @classmethod
+    def fromdict(cls, change):
+        """Build it from one entry of a diff list as returned by the API
+
+        :param change: dict with diff, old_path, new_path... keys
+        :return: FileDiff
+        """
+        return cls(change.get("diff"), change.get("old_path"), change.get("new_path"), change.get("new_file"),
+                   change.get("deleted_file"), change.get("renamed_file"), change.get("a_mode"),
+                   change.get("b_mode"))
+
+    @property
+    def body(self):
+        """The diff without the ---/+++ header, starting at the first hunk"""
+        if self._body is None:
+            text = self.diff
+            if text.startswith("@@"):
+                self._body = text
+            else:
+                start = text.find("\n@@")
+                self._body = text[start + 1:] if start >= 0 else ""
+        return self._body
+
+    def _stat(self):
+        if self._stats is None:
+            body = self.body
+            header = self.diff[:len(self.diff) - len(body)]
+            binary = not body and ("Binary files " in header or "GIT binary patch" in header)
+            self._stats = (body.count("\n+"), body.count("\n-"), binary)
+        return self._stats
+
+    @property
+    def added(self):
+        """Number of added lines"""
+        return self._stat()[0]
+
+    @property
+    def removed(self):
+        """Number of removed lines"""
+        return self._stat()[1]
+
+    @property
+    def binary(self):
+        """Whether git reported the file as binary"""
+        return self._stat()[2]
+
+    @property
+    def path(self):
+        """Path of the file after the change, before it for deleted files"""
+        return self.old_path if self.deleted_file else self.new_path
+
+    def hunks(self):
+        """Parse the hunks
+
+        :return: yields Hunk
+        """
+        body = self.body
+        matches = _HUNK.finditer(body)
+        match = next(matches, None)
+        while match is not None:
+            following = next(matches, None)
+            end = following.start() if following is not None else len(body)
+            old_start, old_count, new_start, new_count, section = match.groups()
+            yield Hunk(int(old_start), int(old_count) if old_count is not None else 1, int(new_start),
+                       int(new_count) if new_count is not None else 1, section, body[match.end() + 1:end])
+            match = following
+
+    def __iter__(self):
+        return self.hunks()
+
+    def __repr__(self):
+        return "<FileDiff {0} +{1} -{2}>".format(self.path, self.added, self.removed)
+
+
+def parsediffs(payload):
+    """Lazily turn a diff returning payload into FileDiff objects
+
+    :param payload: result of getrepositorycommitdiff (list), getmergerequestchanges (dict with changes)
+        or compare_branches_tags_commits (dict with diffs)
+    :return: yields FileDiff
+    """
+    if isinstance(payload, dict):
+        payload = payload.get("changes", payload.get("diffs")) or []
+    for change in payload or ():
+        yield FileDiff.fromdict(change)
+
+
+def diffstat(payload):
+    """Added and removed lines of every file without parsing the hunks
+
+    :param payload: same as parsediffs
+    :return: list of (path, added, removed, binary)
+    """
+    return [(diff.path, diff.added, diff.removed, diff.binary) for diff in parsediffs(payload)]
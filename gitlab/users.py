@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+In memory directory of the users of an instance
+"""
+
+import json
+import os
+import threading
+
+
+class UserDirectory(object):
+    """Every user of the instance indexed by id, username and email
+
+    The directory is loaded with one scan of getusers. Users are listed by id,
+    so a refresh only reads the pages after the last known user. Lookups never
+    call the server. Get a shared directory with Gitlab.getuserdirectory.
+    """
+
+    FIELDS = ("id", "username", "name", "email", "state", "is_admin", "web_url")
+
+    def __init__(self, git=None, path=None, per_page=100):
+        """
+
+        :param git: Gitlab instance, only needed to refresh
+        :param path: optional json snapshot to load, see save
+        :param per_page: users requested per page
+        """
+        self.git = git
+        self.per_page = per_page
+        self.users = {}
+        self._usernames = {}
+        self._emails = {}
+        self._lock = threading.RLock()
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def add(self, user):
+        """Add or replace a user without asking the server, ie: after createuser
+
+        :param user: user dict
+        :return: Nothing
+        """
+        user = dict((field, user.get(field)) for field in self.FIELDS)
+        with self._lock:
+            self.remove(user["id"])
+            self.users[user["id"]] = user
+            if user["username"]:
+                self._usernames[user["username"].lower()] = user["id"]
+            if user["email"]:
+                self._emails[user["email"].lower()] = user["id"]
+
+    def remove(self, user_id):
+        """Forget a user
+
+        :param user_id: id of the user
+        :return: Nothing
+        """
+        with self._lock:
+            user = self.users.pop(user_id, None)
+            if user is None:
+                return
+            if user["username"] and self._usernames.get(user["username"].lower()) == user_id:
+                del self._usernames[user["username"].lower()]
+            if user["email"] and self._emails.get(user["email"].lower()) == user_id:
+                del self._emails[user["email"].lower()]
+
+    def _scan(self, page):
+        """Users from a page on, None if a page can't be read"""
+        users = []
+        while True:
+            results = self.git.getusers(page=page, per_page=self.per_page)
+            if results is False:
+                return None
+            users.extend(results)
+            if len(results) < self.per_page:
+                return users
+            page += 1
+
+    def refresh(self, full=False):
+        """Bring the directory up to date
+
+        Without full only the users created since the last refresh are read. A
+        full refresh also picks up edited and deleted users.
+
+        :param full: scan every user again
+        :return: number of users read, None if the server could not be read
+        """
+        with self._lock:
+            if full or not self.users:
+                users = self._scan(1)
+                if users is None:
+                    return None
+                self.users = {}
+                self._usernames = {}
+                self._emails = {}
+            else:
+                # the page holding the newest known user, or an earlier one if users were deleted since
+                page = max(1, len(self.users) // self.per_page + 1)
+                newest = max(self.users)
+                while True:
+                    users = self._scan(page)
+                    if users is None:
+                        return None
+                    if page == 1 or (users and users[0]["id"] <= newest):
+                        break
+                    page -= 1
+            for user in users:
+                self.add(user)
+            return len(users)
+
+    def get(self, user_id):
+        """User by id
+
+        :param user_id: id of the user
+        :return: user dict, None if unknown
+        """
+        return self.users.get(user_id)
+
+    def byusername(self, username):
+        """User by username, case insensitive
+
+        :param username: username
+        :return: user dict, None if unknown
+        """
+        user_id = self._usernames.get(username.lower())
+        return self.users.get(user_id) if user_id is not None else None
+
+    def byemail(self, email):
+        """User by email, case insensitive. The email is only known to admins
+
+        :param email: email
+        :return: user dict, None if unknown
+        """
+        user_id = self._emails.get(email.strip().lower())
+        return self.users.get(user_id) if user_id is not None else None
+
+    def resolve(self, value):
+        """Id of a user given as id, username or email
+
+        :param value: id, username or email
+        :return: id of the user, None if unknown
+        """
+        if isinstance(value, int):
+            user = self.get(value)
+        elif "@" in value:
+            user = self.byemail(value)
+        else:
+            user = self.byusername(value)
+        return user["id"] if user is not None else None
+
+    def save(self, path):
+        """Write a snapshot to a json file atomically
+
+        :param path: file path
+        :return: Nothing
+        """
+        with self._lock:
+            users = list(self.users.values())
+        temp = path + ".tmp"
+        with open(temp, "w") as snapshot:
+            json.dump(users, snapshot)
+        os.rename(temp, path)
+
+    def load(self, path):
+        """Replace the directory with a snapshot
+
+        :param path: file written by save
+        :return: Nothing
+        """
+        with open(path) as snapshot:
+            users = json.load(snapshot)
+        with self._lock:
+            self.users = {}
+            self._usernames = {}
+            self._emails = {}
+            for user in users:
+                self.add(user)
+
+    def __contains__(self, user_id):
+        return user_id in self.users
+
+    def __len__(self):
+        return len(self.users)
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+Small helpers shared by the gitlab modules
+"""
+
+import calendar
+import re
+
+_ISO8601 = re.compile(r"(\d{4})-(\d\d)-(\d\d)(?:[T ](\d\d):(\d\d):(\d\d)(\.\d+)?)?\s*(Z|[+-]\d\d:?\d\d)?$")
+
+
+def timestamp(value):
+    """Convert a date as returned by the API (ie: 2015-03-25T12:00:00.000+01:00) to seconds since the epoch
+
+    :param value: ISO 8601 date string, None is returned as is
+    :return: UTC timestamp as a float
+    """
+    if value is None:
+        return None
+    match = _ISO8601.match(value.strip())
+    if match is None:
+        raise ValueError("Not an ISO 8601 date: {0}".format(value))
+    year, month, day, hour, minute, second, fraction, zone = match.groups()
+    seconds = calendar.timegm((int(year), int(month), int(day), int(hour or 0), int(minute or 0),
+                               int(second or 0), 0, 0, 0))
+    if fraction:
+        seconds += float(fraction)
+    if zone and zone != "Z":
+        offset = int(zone[1:3]) * 3600 + int(zone[-2:]) * 60
+        seconds += -offset if zone[0] == "+" else offset
+    return float(seconds)
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Receiver for the project and system hooks registered with addprojecthook/addsystemhook
+"""
+
+import hmac
+import json
+import logging
+import threading
+try:
+    from Queue import Queue, Full
+except ImportError:
+    from queue import Queue, Full
+
+logger = logging.getLogger(__name__)
+
+# X-Gitlab-Event header -> kind of event
+EVENT_HEADERS = {
+    "Push Hook": "push",
+    "Tag Push Hook": "tag_push",
+    "Issue Hook": "issue",
+    "Merge Request Hook": "merge_request",
+    "Note Hook": "note",
+    "System Hook": "system",
+}
+
+# system hook event_name -> cache groups made stale by it
+SYSTEM_INVALIDATIONS = {
+    "project_create": ("projects", "namespaces"),
+    "project_destroy": ("projects", "projecthooks", "deploykeys", "labels"),
+    "project_rename": ("projects",),
+    "project_transfer": ("projects", "groups"),
+    "user_create": ("users", "namespaces"),
+    "user_destroy": ("users", "namespaces"),
+    "group_create": ("groups", "namespaces"),
+    "group_destroy": ("groups", "namespaces"),
+}
+
+_STOP = object()
+
+
+def eventkind(payload, headers=None):
+    """Kind of a hook payload: push, tag_push, issue, merge_request, note, system...
+
+    :param payload: decoded hook body
+    :param headers: optional request headers
+    :return: the kind, None if it can't be told
+    """
+    header = (headers or {}).get("X-Gitlab-Event")
+    if header in EVENT_HEADERS:
+        return EVENT_HEADERS[header]
+    if payload.get("object_kind"):
+        return payload["object_kind"]
+    if payload.get("event_name"):
+        return "system"
+    if "commits" in payload and "ref" in payload:
+        # older servers don't send object_kind on pushes
+        return "tag_push" if payload["ref"].startswith("refs/tags/") else "push"
+    return None
+
+
+class WebhookReceiver(object):
+    """WSGI application that parses hook payloads and dispatches them to handlers
+
+    Payloads are queued to a pool of worker threads so the server answers GitLab
+    right away. When the queue is full new payloads are refused with a 503.
+    Given a Gitlab instance with a cache, the entries made stale by each event
+    are dropped before the handlers run.
+
+    It can be mounted in any WSGI server or framework, or run on its own with serve().
+    """
+
+    def __init__(self, token=None, git=None, workers=4, queue_size=1000, max_body=10 * 1024 * 1024):
+        """
+
+        :param token: secret token configured on the hooks, checked against X-Gitlab-Token when set
+        :param git: optional Gitlab instance whose cache is kept up to date
+        :param workers: number of threads running the handlers
+        :param queue_size: maximum number of payloads waiting for a worker
+        :param max_body: maximum size of a payload in bytes
+        """
+        self.token = token
+        self.git = git
+        self.workers = workers
+        self.max_body = max_body
+        self.handlers = {}
+        self.dropped = 0
+        self._queue = Queue(queue_size)
+        self._threads = []
+
+    def on(self, kind, handler=None):
+        """Register a handler for a kind of event, "*" for every event. Usable as a decorator
+
+        :param kind: push, tag_push, issue, merge_request, note, system or "*"
+        :param handler: function called with (kind, payload)
+        :return: the handler
+        """
+        if handler is None:
+            return lambda fn: self.on(kind, fn)
+        self.handlers.setdefault(kind, []).append(handler)
+        return handler
+
+    def start(self):
+        """Start the worker threads, done automatically on the first payload
+
+        :return: Nothing
+        """
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Wait for the queued payloads to be handled and stop the worker threads
+
+        :return: Nothing
+        """
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def handle(self, payload, headers=None):
+        """Queue a decoded payload
+
+        :param payload: decoded hook body
+        :param headers: optional request headers
+        :return: True if it was queued, False if the queue is full
+        """
+        if not self._threads:
+            self.start()
+        try:
+            self._queue.put_nowait((eventkind(payload, headers), payload))
+            return True
+        except Full:
+            self.dropped += 1
+            return False
+
+    def invalidate(self, kind, payload):
+        """Drop the cache entries of the Gitlab instance made stale by an event
+
+        :param kind: kind of the event
+        :param payload: decoded hook body
+        :return: Nothing
+        """
+        cache = getattr(self.git, "cache", None)
+        if cache is None:
+            return
+        path = payload.get("path_with_namespace") or (payload.get("project") or {}).get("path_with_namespace")
+        if path and payload.get("project_id") is not None:
+            # entries read with the path of the project are dropped with its id
+            cache.alias(path, payload["project_id"])
+        if kind == "system":
+            project_id = payload.get("project_id")
+            for group in SYSTEM_INVALIDATIONS.get(payload.get("event_name"), ()):
+                cache.invalidate(group, project_id if group != "namespaces" else None)
+        elif kind in ("push", "tag_push"):
+            cache.invalidate("projects", payload.get("project_id"))
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            kind, payload = item
+            try:
+                self.invalidate(kind, payload)
+            except Exception:
+                logger.exception("Could not invalidate the cache for a %s hook", kind)
+            for handler in self.handlers.get(kind, []) + self.handlers.get("*", []):
+                try:
+                    handler(kind, payload)
+                except Exception:
+                    logger.exception("Handler %r failed on a %s hook", handler, kind)
+
+    def __call__(self, environ, start_response):
+        def respond(status, message):
+            start_response(status, [("Content-Type", "text/plain")])
+            return [message.encode("utf-8")]
+
+        if environ.get("REQUEST_METHOD") != "POST":
+            return respond("405 Method Not Allowed", "POST only")
+        if self.token is not None and not hmac.compare_digest(
+                environ.get("HTTP_X_GITLAB_TOKEN", "").encode("utf-8"), self.token.encode("utf-8")):
+            return respond("403 Forbidden", "invalid token")
+        try:
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            length = 0
+        if length > self.max_body:
+            return respond("413 Request Entity Too Large", "payload too large")
+        try:
+            payload = json.loads(environ["wsgi.input"].read(length).decode("utf-8"))
+        except ValueError:
+            return respond("400 Bad Request", "invalid json")
+        if not isinstance(payload, dict):
+            return respond("400 Bad Request", "invalid payload")
+        if not self.handle(payload, {"X-Gitlab-Event": environ.get("HTTP_X_GITLAB_EVENT")}):
+            return respond("503 Service Unavailable", "queue full")
+        return respond("200 OK", "queued")
+
+    def serve(self, host="0.0.0.0", port=8000):
+        """Run a standalone http server until interrupted
+
+        :param host: address to listen on
+        :param port: port to listen on
+        :return: Nothing
+        """
+        from wsgiref.simple_server import make_server
+        server = make_server(host, port, self)
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            self.stop()
@@ -0,0 +1,151 @@
+"""
+pyapi-gitlab branch inventory tests
+"""
+
+import os
+import shutil
+import tempfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+from gitlab.branches import BranchCleaner, BranchInventory, CleanupJournal
+from gitlab.exceptions import HttpError
+
+
+def branch(name, date, protected=False):
+    return {"name": name, "protected": protected, "commit": {"id": name * 4, "committed_date": date}}
+
+
+class FakeBranches(object):
+    def __init__(self):
+        self.projects = [
+            {"id": 1, "path_with_namespace": "a/one", "default_branch": "master", "last_activity_at": "2016-01-01"},
+            {"id": 2, "path_with_namespace": "a/two", "default_branch": "master", "last_activity_at": "2016-01-01"},
+        ]
+        self.branches = {
+            1: [branch("master", "2015-01-01T00:00:00Z", True), branch("old", "2015-01-01T00:00:00Z"),
+                branch("release", "2015-01-01T00:00:00Z", True)],
+            2: [branch("master", "2016-01-01T00:00:00Z"), branch("release", "2016-01-01T00:00:00Z")],
+        }
+        self.calls = []
+        self.broken = False
+
+    def getprojectsall(self, page=1, per_page=20):
+        if self.broken:
+            return False
+        return self.projects[(page - 1) * per_page:page * per_page]
+
+    def getbranches(self, project_id):
+        self.calls.append(project_id)
+        return self.branches[project_id]
+
+
+class BranchInventoryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "branches.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_queries(self):
+        inventory = BranchInventory(FakeBranches(), self.path)
+        self.assertEqual(sorted(inventory.refresh()[0]), [1, 2])
+        self.assertEqual(len(inventory), 5)
+        now = 1451606400.0 + 86400
+        self.assertEqual([(b.project, b.name) for b in inventory.stale(days=90, now=now)], [("a/one", "old")])
+        self.assertEqual(len(inventory.stale(days=90, now=now, include_protected=True)), 2)
+        self.assertEqual([b.project_id for b in inventory.protected("release")], [1])
+        self.assertEqual([b.project_id for b in inventory.find("release")], [1, 2])
+
+    def test_only_changed_projects_are_refreshed(self):
+        git = FakeBranches()
+        BranchInventory(git, self.path).refresh()
+        git.calls = []
+        git.projects[1]["last_activity_at"] = "2016-02-01"
+        git.branches[2].append(branch("new", "2016-02-01T00:00:00Z"))
+        inventory = BranchInventory(git, self.path)
+        self.assertEqual(inventory.refresh(), ([2], []))
+        self.assertEqual(git.calls, [2])
+        self.assertEqual(len(inventory.branches(2)), 3)
+        # a subset only refreshes the projects it lists
+        self.assertEqual(inventory.refresh(projects=git.projects[1:], force=True), ([2], []))
+        self.assertEqual(len(inventory.branches(1)), 3)
+        del git.projects[0]
+        inventory.refresh()
+        self.assertEqual(inventory.branches(1), [])
+
+    def test_failed_listing_keeps_the_index(self):
+        git = FakeBranches()
+        inventory = BranchInventory(git, self.path, per_page=1)
+        inventory.refresh()
+        git.broken = True
+        self.assertRaises(HttpError, inventory.refresh)
+        self.assertEqual(len(inventory), 5)
+
+
+class FakeCleanup(object):
+    def __init__(self):
+        self.branches = {1: [branch("master", "2016-01-01T00:00:00Z"), branch("old", "2015-01-01T00:00:00Z"),
+                             branch("done", "2016-01-01T00:00:00Z"), branch("wip", "2016-01-01T00:00:00Z"),
+                             branch("release/1", "2015-01-01T00:00:00Z"),
+                             branch("locked", "2015-01-01T00:00:00Z", True)]}
+        self.deleted = []
+
+    def getproject(self, project_id):
+        return {"id": project_id, "default_branch": "master"} if project_id in self.branches else False
+
+    def getbranches(self, project_id):
+        return self.branches[project_id]
+
+    def getbranch(self, project_id, name):
+        return dict((b["name"], b) for b in self.branches[project_id]).get(name, False)
+
+    def compare_branches_tags_commits(self, project_id, from_id, to_id):
+        return {"commits": [] if to_id == "done" else [{"id": "x"}]}
+
+    def deletebranch(self, project_id, name):
+        self.deleted.append(name)
+        self.branches[project_id] = [b for b in self.branches[project_id] if b["name"] != name]
+        return True
+
+
+class BranchCleanerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.now = 1451606400.0 + 86400
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_dry_run_and_clean(self):
+        git = FakeCleanup()
+        cleaner = BranchCleaner(git, days=90, keep=["release/*"])
+        report = cleaner.clean([1, 2], dry_run=True, now=self.now)
+        self.assertEqual(git.deleted, [])
+        self.assertEqual(sorted((c.target, c.detail) for c in report if c.action == "delete"),
+                         [("done", "merged"), ("old", "stale")])
+        self.assertEqual(report.summary()[("fetch", "failed")], 1)
+        cleaner.clean([1], now=self.now)
+        self.assertEqual(sorted(git.deleted), ["done", "old"])
+
+    def test_moved_branch_is_skipped(self):
+        git = FakeCleanup()
+        cleaner = BranchCleaner(git, days=90, merged=False)
+        plan = cleaner.plan(1, "master", git.getbranches(1), now=self.now)
+        self.assertEqual(plan, [("old", "oldoldoldold", "stale"), ("release/1", "release/1" * 4, "stale")])
+        git.branches[1][1]["commit"]["id"] = "moved"
+        self.assertEqual(cleaner._delete(1, "old", "oldoldoldold"), "skipped")
+
+    def test_journal_resume(self):
+        path = os.path.join(self.tmpdir, "cleanup.jsonl")
+        git = FakeCleanup()
+        BranchCleaner(git, days=90, merged=False, journal=CleanupJournal(path)).clean([1], now=self.now)
+        self.assertEqual(sorted(git.deleted), ["old", "release/1"])
+        journal = CleanupJournal(path)
+        self.assertIn((1, "old", "oldoldoldold"), journal)
+        # a resumed run working from outdated branches does not delete them twice
+        git.branches[1].append(branch("old", "2015-01-01T00:00:00Z"))
+        report = BranchCleaner(git, days=90, merged=False, journal=journal).clean([1], dry_run=True, now=self.now)
+        self.assertEqual(len(report), 0)
@@ -0,0 +1,144 @@
+"""
+pyapi-gitlab response cache tests
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+from gitlab.cache import ResponseCache, SQLiteBackend, cached, invalidates
+
+
+class FakeClient(object):
+    host = "http://gitlab"
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.headers = {"PRIVATE-TOKEN": "token"}
+        self.calls = 0
+        self.labels = {}
+
+    @cached("labels")
+    def getlabels(self, project_id):
+        self.calls += 1
+        return list(self.labels.get(project_id, []))
+
+    @invalidates("labels")
+    def createlabel(self, project_id, name):
+        self.labels.setdefault(project_id, []).append({"name": name})
+        return {"name": name}
+
+    @cached("namespaces", scoped=False)
+    def getnamespaces(self, page=1):
+        self.calls += 1
+        return False
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def test_read_through_and_invalidation(self):
+        git = FakeClient(ResponseCache())
+        self.assertEqual(git.getlabels(1), [])
+        self.assertEqual(git.getlabels(1), [])
+        self.assertEqual(git.getlabels(project_id=2), [])
+        self.assertEqual(git.calls, 2)
+        git.createlabel(1, "bug")
+        self.assertEqual(git.getlabels(1), [{"name": "bug"}])
+        self.assertEqual(git.calls, 3)
+        # project 2 was not touched by the write
+        git.getlabels(project_id=2)
+        self.assertEqual(git.calls, 3)
+
+    def test_cached_values_are_copies(self):
+        git = FakeClient(ResponseCache())
+        git.getlabels(1).append("mutated")
+        self.assertEqual(git.getlabels(1), [])
+
+    def test_errors_and_disabled_endpoints_are_not_cached(self):
+        git = FakeClient(ResponseCache(ttl={"getlabels": 0}))
+        git.getnamespaces()
+        git.getnamespaces()
+        git.getlabels(1)
+        git.getlabels(1)
+        self.assertEqual(git.calls, 4)
+        git = FakeClient(None)
+        git.getlabels(1)
+        git.getlabels(1)
+        self.assertEqual(git.calls, 2)
+
+    def test_lru_and_byte_bounds(self):
+        cache = ResponseCache(max_entries=2)
+        cache.set("a", 1, 60, ("g", None))
+        cache.set("b", 2, 60, ("g", None))
+        cache.get("a")
+        cache.set("c", 3, 60, ("g", None))
+        self.assertEqual(cache.get("b"), None)
+        self.assertEqual(cache.get("a"), 1)
+        cache = ResponseCache(max_bytes=10)
+        cache.set("a", "12345", 60, ("g", None))
+        cache.set("b", "12345", 60, ("g", None))
+        self.assertEqual(len(cache), 1)
+        self.assertTrue(cache.size <= 10)
+
+    def test_expiry(self):
+        cache = ResponseCache()
+        cache.set("a", 1, -1, ("g", "1"))
+        self.assertEqual(cache.get("a"), None)
+        self.assertEqual(cache.size, 0)
+
+
+class SQLiteBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "cache.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_entries_are_shared_between_caches(self):
+        first = FakeClient(ResponseCache(backend=SQLiteBackend(self.path)))
+        second = FakeClient(ResponseCache(backend=SQLiteBackend(self.path)))
+        second.labels = first.labels
+        first.getlabels(1)
+        self.assertEqual(second.getlabels(1), [])
+        self.assertEqual(second.calls, 0)
+        second.createlabel(1, "bug")
+        self.assertEqual(first.getlabels(1), [{"name": "bug"}])
+
+    def test_eviction_and_expiry(self):
+        cache = ResponseCache(backend=SQLiteBackend(self.path, max_entries=2))
+        cache.set("a", 1, 60, ("g", None))
+        cache.set("b", 2, 60, ("g", None))
+        cache.set("c", 3, 60, ("g", "1"))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get("a"), None)
+        cache.set("d", 4, -1, ("g", "1"))
+        self.assertEqual(cache.get("d"), None)
+        self.assertEqual(cache.invalidate("g", 1), 2)
+
+    def test_counters(self):
+        db = sqlite3.connect(self.path)
+        with db:
+            db.execute("CREATE TABLE entries (key TEXT PRIMARY KEY, expires REAL, grp TEXT, "
+                       "scope TEXT, value TEXT, size INTEGER, written REAL)")
+            db.execute("INSERT INTO entries VALUES ('old', 0, 'g', NULL, '12', 2, 0)")
+        db.close()
+        # the counters of an existing database start from its entries
+        backend = SQLiteBackend(self.path, max_bytes=10)
+        self.assertEqual((len(backend), backend.size), (1, 2))
+        backend.set("a", "123", time.time() + 60, ("g", "1"))
+        backend.set("a", "1234", time.time() + 60, ("g", "1"))
+        self.assertEqual((len(backend), backend.size), (2, 6))
+        # over max_bytes: the expired entry goes first, then the oldest ones
+        backend.set("b", "1234567", time.time() + 60, ("g", "2"))
+        self.assertEqual((len(backend), backend.size), (1, 7))
+        self.assertEqual(backend.get("b"), "1234567")
+        backend.set("c", "1", time.time() + 60, ("h", None))
+        self.assertEqual(backend.invalidate("g"), 1)
+        self.assertEqual((len(backend), backend.size), (1, 1))
+        backend.clear()
+        self.assertEqual((len(backend), backend.size), (0, 0))
@@ -0,0 +1,134 @@
+"""
+pyapi-gitlab commit crawler tests
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+from gitlab.commits import CommitCrawler, CrawlCheckpoint, SeenSet, commitdiffs, toporder
+
+
+def sha(name):
+    return hashlib.sha1(name.encode("utf-8")).hexdigest()
+
+
+class FakeRepository(object):
+    def __init__(self):
+        self.history = {
+            "master": ["c5", "c4", "c3", "c2", "c1"],
+            "feature": ["f2", "f1", "c3", "c2", "c1"],
+        }
+        self.pages = []
+        self.latency = {}
+        self.broken = set()
+
+    def getbranches(self, project_id):
+        return [{"name": name, "commit": {"id": sha(commits[0])}} for name, commits in self.history.items()]
+
+    def getrepositorycommits(self, project_id, ref_name=None, page=1, per_page=20):
+        self.pages.append((ref_name, page))
+        time.sleep(self.latency.get((ref_name, page), 0))
+        if (ref_name, page) in self.broken:
+            return False
+        commits = self.history[ref_name][(page - 1) * per_page:page * per_page]
+        return [{"id": sha(name), "title": name} for name in commits]
+
+
+class CommitCrawlerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_each_commit_once(self):
+        git = FakeRepository()
+        titles = [commit["title"] for commit in CommitCrawler(git, 1, workers=1, per_page=2).crawl()]
+        self.assertEqual(sorted(titles), ["c1", "c2", "c3", "c4", "c5", "f1", "f2"])
+        # the second ref walked stops on the page where the shared history starts
+        self.assertTrue(len(git.pages) < 6)
+
+    def test_checkpoint(self):
+        path = os.path.join(self.tmpdir, "project-1.json")
+        git = FakeRepository()
+        self.assertEqual(len(list(CommitCrawler(git, 1, CrawlCheckpoint(path), per_page=2).crawl())), 7)
+        git.history["master"].insert(0, "c6")
+        git.pages = []
+        titles = [commit["title"] for commit in CommitCrawler(git, 1, CrawlCheckpoint(path), per_page=2).crawl()]
+        self.assertEqual(titles, ["c6"])
+        self.assertEqual(git.pages, [("master", 1)])
+
+    def test_offset_pages(self):
+        shared = ["s{0}".format(i) for i in range(30)]
+        # feature reads its first page between the first two pages of master, both reach the other one's commits
+        for refs in (["master", "feature"], ["feature", "master"]):
+            git = FakeRepository()
+            git.history = {"master": ["m1", "m2"] + shared, "feature": ["f1"] + shared}
+            git.latency = {("master", 2): 0.1, ("feature", 1): 0.05}
+            titles = [commit["title"] for commit in CommitCrawler(git, 1, workers=2, per_page=4).crawl(refs)]
+            self.assertEqual(sorted(titles), sorted(["m1", "m2", "f1"] + shared))
+
+    def test_failed_page(self):
+        path = os.path.join(self.tmpdir, "project-1.json")
+        git = FakeRepository()
+        git.broken.add(("feature", 2))
+        git.latency = {("master", 1): 0.05}
+        crawler = CommitCrawler(git, 1, CrawlCheckpoint(path), per_page=2)
+        titles = [commit["title"] for commit in crawler.crawl()]
+        self.assertEqual(crawler.failed, ["feature"])
+        self.assertNotIn("feature", CrawlCheckpoint(path).heads)
+        git.broken = set()
+        crawler = CommitCrawler(git, 1, CrawlCheckpoint(path), per_page=2)
+        titles += [commit["title"] for commit in crawler.crawl()]
+        self.assertEqual(crawler.failed, [])
+        self.assertEqual(sorted(set(titles)), ["c1", "c2", "c3", "c4", "c5", "f1", "f2"])
+
+    def test_seen_set(self):
+        seen = SeenSet()
+        self.assertTrue(seen.add(sha("a")))
+        self.assertFalse(seen.add(sha("a")))
+        loaded = SeenSet.loads(seen.dumps())
+        self.assertIn(sha("a"), loaded)
+        self.assertEqual(len(loaded), 1)
+
+
+class FakeCompare(object):
+    def __init__(self):
+        self.fetched = []
+
+    def compare_branches_tags_commits(self, project_id, from_id, to_id):
+        # a merge: m has parents b and c, both children of a
+        return {"commits": [
+            {"id": sha("m"), "parent_ids": [sha("b"), sha("c")]},
+            {"id": sha("c"), "parent_ids": [sha("a")]},
+            {"id": sha("b"), "parent_ids": [sha("a")]},
+            {"id": sha("a"), "parent_ids": [sha("root")]},
+        ]}
+
+    def getrepositorycommitdiff(self, project_id, sha1):
+        self.fetched.append(sha1)
+        return [{"diff": sha1}]
+
+
+class CommitDiffsTest(unittest.TestCase):
+    def test_topological_order_and_cache(self):
+        git = FakeCompare()
+        cache = {sha("b"): [{"diff": "cached"}]}
+        results = list(commitdiffs(git, 1, "v1", "v2", workers=3, cache=cache))
+        order = [commit["id"] for commit, _ in results]
+        self.assertEqual(order[0], sha("a"))
+        self.assertEqual(order[-1], sha("m"))
+        self.assertEqual(dict((commit["id"], diff) for commit, diff in results)[sha("b")], [{"diff": "cached"}])
+        self.assertNotIn(sha("b"), git.fetched)
+        self.assertEqual(len(git.fetched), 3)
+        self.assertEqual(len(cache), 4)
+
+    def test_order_by_date_without_parents(self):
+        commits = [{"id": "2", "created_at": "2015-01-02T00:00:00Z"}, {"id": "1", "created_at": "2015-01-01T00:00:00Z"}]
+        self.assertEqual([commit["id"] for commit in toporder(commits)], ["1", "2"])
@@ -0,0 +1,60 @@
+"""
+pyapi-gitlab contributor aggregation tests
+"""
+
+import io
+import json
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+from gitlab.contributors import ContributorStats
+
+
+class FakeContributors(object):
+    def __init__(self):
+        self.contributors = {
+            1: [{"name": "Ana", "email": "ana@example.com", "commits": 10, "additions": 100, "deletions": 5},
+                {"name": "Bo", "email": "bo@example.com", "commits": 1, "additions": 2, "deletions": 3}],
+            2: [{"name": "Ana L.", "email": "Ana@Example.com ", "commits": 5, "additions": 50, "deletions": 0}],
+            "grp/proj": [{"name": "Bo", "email": "bo@example.com", "commits": 2, "additions": 0, "deletions": 0}],
+        }
+        self.calls = []
+
+    def getcontributors(self, project_id, page=1, per_page=20):
+        self.calls.append(project_id)
+        if project_id not in self.contributors:
+            return False
+        return self.contributors[project_id][(page - 1) * per_page:page * per_page]
+
+
+class ContributorStatsTest(unittest.TestCase):
+    def test_merge_and_update(self):
+        git = FakeContributors()
+        stats = ContributorStats(git, per_page=1)
+        self.assertEqual(stats.update([1, 2, 3]), [3])
+        self.assertEqual(stats.rows()[0][:1] + stats.rows()[0][2:], ("ana@example.com", 15, 150, 5, 2))
+        git.contributors[2] = []
+        git.calls = []
+        stats.update([2])
+        self.assertEqual(set(git.calls), set([2]))
+        self.assertEqual(stats.rows()[0][2:], (10, 100, 5, 1))
+
+    def test_state_and_table(self):
+        stats = ContributorStats(FakeContributors())
+        stats.update([1, 2])
+        restored = ContributorStats(None, state=json.loads(json.dumps(stats.state())))
+        self.assertEqual(restored.rows(), stats.rows())
+        # path ids are restored as they were given
+        stats.update(["grp/proj"])
+        restored = ContributorStats(None, state=json.loads(json.dumps(stats.state())))
+        self.assertEqual(sorted(restored.projects, key=str), [1, 2, "grp/proj"])
+        restored.remove("grp/proj")
+        restored.remove(1)
+        self.assertEqual(list(restored.projects), [2])
+        restored = ContributorStats(None, state=json.loads(json.dumps(stats.state())))
+        output = io.StringIO() if str is not bytes else io.BytesIO()
+        self.assertEqual(restored.write(output, sort="email"), 2)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(lines[0], "email,name,commits,additions,deletions,projects")
+        self.assertTrue(lines[1].startswith("ana@example.com,Ana"))
@@ -0,0 +1,188 @@
+"""
+pyapi-gitlab endpoint registry tests
+"""
+
+import io
+import json
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import requests
+import gitlab
+from gitlab.cache import DEFAULT_TTL, ResponseCache
+from gitlab.endpoints import ENDPOINTS, Endpoint
+from gitlab.transport import Transport
+from gitlab.users import UserDirectory
+
+
+class CapturingTransport(Transport):
+    """Keeps the requests and answers them with a canned status code and body"""
+
+    def __init__(self, status=200, body=None):
+        super(CapturingTransport, self).__init__()
+        self.status = status
+        self.body = body if body is not None else {"id": 1}
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs))
+        response = requests.Response()
+        response.status_code = self.status
+        response._content = json.dumps(self.body).encode("utf-8")
+        return response
+
+
+class EndpointTest(unittest.TestCase):
+    def setUp(self):
+        self.transport = CapturingTransport()
+        self.git = gitlab.Gitlab("http://gitlab", token="token", timeout=5, transport=self.transport)
+
+    def last(self):
+        return self.transport.requests[-1]
+
+    def test_paginated_get(self):
+        self.assertEqual(self.git.getprojecthooks(1, per_page=50), {"id": 1})
+        method, url, kwargs = self.last()
+        self.assertEqual((method, url), ("get", "http://gitlab/api/v3/projects/1/hooks"))
+        self.assertEqual(kwargs["params"], {"page": 1, "per_page": 50})
+        self.assertEqual(kwargs["headers"], {"PRIVATE-TOKEN": "token"})
+        self.assertEqual(kwargs["timeout"], 5)
+        self.assertNotIn("data", kwargs)
+
+    def test_path_segments(self):
+        self.git.getproject("group/name")
+        self.assertEqual(self.last()[1], "http://gitlab/api/v3/projects/group%2Fname")
+        self.git.getbranch(1, "feature/x")
+        self.assertEqual(self.last()[1], "http://gitlab/api/v3/projects/1/repository/branches/feature%2Fx")
+        self.git.getgroups()
+        self.assertEqual(self.last()[1], "http://gitlab/api/v3/groups/")
+        # the hand written methods quote the ids the same way
+        self.transport.status = 201
+        self.git.createcommit("group/name", "master", "message", [], fallback=False)
+        self.assertEqual(self.last()[1], "http://gitlab/api/v3/projects/group%2Fname/repository/commits")
+        self.git.createfile("group/name", "a.txt", "master", "text", "content", "message")
+        self.assertEqual(self.last()[1], "http://gitlab/api/v3/projects/group%2Fname/repository/files")
+        self.transport.status = 200
+        self.git.getsnippetcontent("group/name", 3)
+        self.assertEqual(self.last()[1], "http://gitlab/api/v3/projects/group%2Fname/snippets/3/raw")
+
+    def test_fields(self):
+        self.transport.status = 201
+        self.git.addprojecthook(1, "http://hook", push=True)
+        self.assertEqual(self.last()[2]["data"], {"url": "http://hook", "push_events": 1, "issues_events": 0,
+                                                  "merge_requests_events": 0, "tag_push_events": 0})
+        self.git.createsnippet(1, "title", "a.py", "code", visibility_level=5)
+        self.assertEqual(self.last()[2]["data"], {"title": "title", "file_name": "a.py", "code": "code"})
+        self.assertTrue(self.git.addprojectmember(1, 2, "developer"))
+        self.assertEqual(self.last()[2]["data"], {"user_id": 2, "access_level": 30})
+        # extra keyword arguments go to the body of writes and to the query of reads
+        self.git.createissue(1, "bug", labels="a,b")
+        self.assertEqual(self.last()[2]["data"], {"title": "bug", "labels": "a,b"})
+        self.transport.status = 200
+        self.git.getprojectissues(1, state="opened")
+        self.assertEqual(self.last()[2]["params"], {"page": 1, "per_page": 20, "state": "opened"})
+        self.git.compare_branches_tags_commits(1, "v1", "v2")
+        self.assertEqual(self.last()[2]["params"], {"from": "v1", "to": "v2"})
+
+    def test_results(self):
+        self.assertIs(self.git.deletebranch(1, "old"), True)
+        self.assertEqual(self.git.getrawblob(1, "abc"), b'{"id": 1}')
+        self.transport.status = 404
+        self.assertIs(self.git.getproject(1), False)
+        self.assertIs(self.git.deletebranch(1, "old"), False)
+
+    def test_deletesshkey(self):
+        self.assertIs(self.git.deletesshkey(1), True)
+        self.assertEqual(self.last()[:2], ("delete", "http://gitlab/api/v3/user/keys/1"))
+        self.transport.body = None
+        self.assertIs(self.git.deletesshkey(2), False)
+
+    def test_edituser(self):
+        self.git.userdirectory = UserDirectory()
+        self.git.userdirectory.add({"id": 2, "username": "ana", "email": "ana@example.com"})
+        self.transport.body = {"id": 2, "username": "ana", "email": "ana@example.org"}
+        self.assertEqual(self.git.edituser(2, email="ana@example.org"), self.transport.body)
+        method, url, kwargs = self.last()
+        self.assertEqual((method, url, kwargs["data"]), ("put", "http://gitlab/api/v3/users/2",
+                                                         {"email": "ana@example.org"}))
+        # the shared directory follows the change
+        self.assertIsNone(self.git.userdirectory.byemail("ana@example.com"))
+        self.assertEqual(self.git.userdirectory.byemail("ana@example.org")["id"], 2)
+        self.transport.status = 404
+        self.assertFalse(self.git.edituser(2, email="ana@example.net"))
+        self.assertIsNone(self.git.userdirectory.byemail("ana@example.net"))
+
+    def test_streamed_snippet_is_closed(self):
+        closed = []
+        request = self.transport.request
+
+        def tracked(method, url, **kwargs):
+            response = request(method, url, **kwargs)
+            response._content_consumed = True
+            response.close = lambda: closed.append(response.status_code)
+            return response
+        self.transport.request = tracked
+        self.transport.status = 404
+        self.assertFalse(self.git.getsnippetcontent(1, 3, fileobj=io.BytesIO()))
+        self.transport.status = 200
+        self.assertTrue(self.git.getsnippetcontent(1, 3, fileobj=io.BytesIO()))
+        self.assertEqual(closed, [404, 200])
+
+    def test_arguments(self):
+        self.assertRaises(TypeError, self.git.getproject)
+        self.assertRaises(TypeError, self.git.getproject, 1, 2)
+        self.assertRaises(TypeError, self.git.getproject, 1, project_id=1)
+        self.assertRaises(TypeError, self.git.getproject, 1, per_page=1)
+        self.assertEqual(len(self.transport.requests), 0)
+
+    def test_cache(self):
+        self.git.cache = ResponseCache()
+        self.git.getlabels(1)
+        self.git.getlabels(1)
+        self.assertEqual(len(self.transport.requests), 1)
+        # default_ttl covers the endpoints declared with a cache group, and only them
+        self.git.cache = ResponseCache(default_ttl=60)
+        self.git.getproject(1)
+        self.git.getproject(1)
+        self.git.getprojectissue(1, 2)
+        self.git.getprojectissue(1, 2)
+        self.assertEqual(len(self.transport.requests), 4)
+
+    def test_write_invalidation(self):
+        self.git.cache = ResponseCache(default_ttl=60)
+        self.git.getproject(5)
+        self.transport.status = 201
+        # the moved project is the second argument of moveproject
+        self.assertTrue(self.git.moveproject(3, 5))
+        self.transport.status = 200
+        self.git.getproject(5)
+        self.git.getuser(7)
+        self.git.blockuser(7)
+        self.git.getuser(7)
+        self.assertEqual(len(self.transport.requests), 6)
+
+    def test_mixed_project_ids(self):
+        self.git.cache = ResponseCache(default_ttl=60)
+        self.transport.body = {"id": 5, "path_with_namespace": "grp/proj"}
+        self.git.getproject("grp/proj")
+        self.assertTrue(self.git.editproject(5, description="moved"))
+        self.git.getproject("grp/proj")
+        self.assertEqual(len(self.transport.requests), 3)
+        self.git.getproject(5)
+        self.assertTrue(self.git.editproject("grp/proj", description="back"))
+        self.git.getproject(5)
+        self.assertEqual(len(self.transport.requests), 6)
+        # an index asked for by path is the one of the project id
+        self.assertIs(self.git.gettagindex("grp/proj"), self.git.gettagindex(5))
+
+    def test_registry(self):
+        for name, spec in ENDPOINTS.items():
+            self.assertIs(getattr(gitlab.Gitlab, name).endpoint, spec)
+        self.assertTrue(ENDPOINTS["getproject"].cacheable)
+        self.assertFalse(ENDPOINTS["createproject"].cacheable)
+        # every endpoint with a default ttl is declared cacheable
+        for name in DEFAULT_TTL:
+            self.assertTrue(ENDPOINTS[name].cacheable, name)
+        self.assertTrue(ENDPOINTS["getissues"].paginated)
+        self.assertRaises(ValueError, Endpoint, "x", "patch", "/x")
@@ -0,0 +1,109 @@
+"""
+pyapi-gitlab event tailer tests
+"""
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+from gitlab.events import EventTailer
+from gitlab.fleet import parallel
+from gitlab.utils import timestamp
+
+
+class FakeEvents(object):
+    def __init__(self):
+        self.events = {1: [], 2: []}
+        self.pages = []
+        self.broken = set()
+
+    def add(self, project_id, day, title):
+        event = {"project_id": project_id, "title": title,
+                 "created_at": "2015-03-{0:02d}T12:00:00.000Z".format(day)}
+        self.events[project_id].insert(0, event)
+
+    def getprojectevents(self, project_id, page=1, per_page=20):
+        self.pages.append((project_id, page))
+        if project_id in self.broken:
+            return False
+        return self.events[project_id][(page - 1) * per_page:page * per_page]
+
+
+class EventTailerTest(unittest.TestCase):
+    def test_only_new_events_are_returned_in_order(self):
+        git = FakeEvents()
+        for day in range(1, 8):
+            git.add(1, day, "old")
+        tailer = EventTailer(git, [1, 2], per_page=2, min_interval=0)
+        self.assertEqual(tailer.poll(), [])
+        self.assertEqual(sorted(git.pages), [(1, 1), (2, 1)])
+
+        git.add(2, 10, "b1")
+        git.add(1, 11, "a1")
+        git.add(1, 11, "a2")
+        git.add(2, 12, "b2")
+        git.add(1, 13, "a3")
+        git.pages = []
+        self.assertEqual([e["title"] for e in tailer.poll(force=True)], ["b1", "a1", "a2", "b2", "a3"])
+        # project 1 stops on the second page, where the known events start
+        self.assertEqual(sorted(git.pages), [(1, 1), (1, 2), (2, 1), (2, 2)])
+        self.assertEqual(tailer.poll(force=True), [])
+
+        git.add(1, 13, "a4")
+        resumed = EventTailer(git, [1, 2], state=tailer.state(), min_interval=0)
+        self.assertEqual([e["title"] for e in resumed.poll()], ["a4"])
+
+    def test_failed_poll_keeps_the_mark(self):
+        git = FakeEvents()
+        for day in range(1, 16):
+            git.add(1, day, "old")
+        git.broken.add(1)
+        tailer = EventTailer(git, [1], per_page=5, min_interval=0)
+        self.assertEqual(tailer.poll(), [])
+        self.assertEqual(tailer.failed, [1])
+        self.assertIsNone(tailer.projects[1].hwm)
+        git.broken = set()
+        # the first successful poll is still the baseline
+        self.assertEqual(tailer.poll(force=True), [])
+        self.assertEqual(tailer.failed, [])
+        git.add(1, 20, "new")
+        self.assertEqual([e["title"] for e in tailer.poll(force=True)], ["new"])
+
+    def test_truncated_poll_keeps_the_mark(self):
+        git = FakeEvents()
+        git.add(1, 1, "old")
+        tailer = EventTailer(git, [1], per_page=2, max_pages=2, min_interval=0)
+        tailer.poll()
+        hwm = tailer.projects[1].hwm
+        for day in range(2, 8):
+            git.add(1, day, "new")
+        self.assertEqual(tailer.poll(force=True), [])
+        self.assertEqual(tailer.truncated, [1])
+        self.assertEqual(tailer.projects[1].hwm, hwm)
+        # nothing is lost once the pages cover the backlog
+        tailer.max_pages = None
+        self.assertEqual(len(tailer.poll(force=True)), 6)
+        self.assertEqual(tailer.truncated, [])
+
+    def test_interval_adapts_to_activity(self):
+        git = FakeEvents()
+        tailer = EventTailer(git, [1], min_interval=10, max_interval=40)
+        tailer.poll()
+        for _ in range(5):
+            tailer.poll(force=True)
+        self.assertEqual(tailer.projects[1].interval, 40)
+        git.add(1, 1, "new")
+        tailer.poll(force=True)
+        self.assertEqual(tailer.projects[1].interval, 20)
+
+
+class HelpersTest(unittest.TestCase):
+    def test_parallel(self):
+        self.assertEqual(sorted(parallel(lambda x: x * 2, range(50), workers=4)),
+                         [(x, x * 2) for x in range(50)])
+        self.assertRaises(ZeroDivisionError, list, parallel(lambda x: 1 / x, range(5)))
+
+    def test_timestamp(self):
+        self.assertEqual(timestamp("1970-01-01T00:00:01.500Z"), 1.5)
+        self.assertEqual(timestamp("1970-01-01T01:00:00+01:00"), 0.0)
+        self.assertEqual(timestamp("1970-01-02"), 86400.0)
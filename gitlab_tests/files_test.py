@@ -0,0 +1,121 @@
+"""
+pyapi-gitlab repository file tests
+"""
+
+import base64
+import io
+import json
+import os
+import tempfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import requests
+import gitlab
+from gitlab.transport import Base64JSONBody, Transport
+
+
+class CapturingTransport(Transport):
+    """Keeps the requests and answers them with canned status codes"""
+
+    def __init__(self, *statuses):
+        super(CapturingTransport, self).__init__()
+        self.statuses = list(statuses)
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        if hasattr(kwargs.get("data"), "__iter__") and not isinstance(kwargs["data"], dict):
+            # like requests, send streamed bodies while the call is running
+            kwargs["data"] = [b"".join(kwargs["data"])]
+        self.requests.append((method, url, kwargs))
+        response = requests.Response()
+        response.status_code = self.statuses.pop(0)
+        response._content = json.dumps({"id": "abc"}).encode("utf-8")
+        return response
+
+
+class CreateCommitTest(unittest.TestCase):
+    actions = [
+        {"action": "create", "file_path": "a.txt", "content": "a"},
+        {"action": "update", "file_path": "b.txt", "content": "b"},
+        {"action": "delete", "file_path": "c.txt"},
+        {"action": "move", "file_path": "e.txt", "previous_path": "d.txt", "content": "d"},
+    ]
+
+    def test_single_commit(self):
+        transport = CapturingTransport(201)
+        git = gitlab.Gitlab("http://gitlab", token="token", transport=transport)
+        self.assertEqual(git.createcommit(1, "master", "rollout", self.actions), {"id": "abc"})
+        method, url, kwargs = transport.requests[0]
+        self.assertEqual((method, url), ("post", "http://gitlab/api/v3/projects/1/repository/commits"))
+        self.assertEqual(kwargs["json"]["actions"], self.actions)
+
+    def test_fallback(self):
+        transport = CapturingTransport(404, 201, 200, 200, 201, 200)
+        git = gitlab.Gitlab("http://gitlab", token="token", transport=transport)
+        self.assertTrue(git.createcommit(1, "master", "rollout", self.actions))
+        self.assertEqual([r[0] for r in transport.requests], ["post", "post", "put", "delete", "post", "delete"])
+        self.assertEqual(transport.requests[-1][2]["data"]["file_path"], "d.txt")
+
+        transport = CapturingTransport(404, 200)
+        git = gitlab.Gitlab("http://gitlab", token="token", transport=transport)
+        update = {"action": "update", "file_path": "b.bin", "content": "aGVsbG8=", "encoding": "base64"}
+        self.assertTrue(git.createcommit(1, "master", "rollout", [update]))
+        self.assertEqual(transport.requests[-1][0], "put")
+        self.assertEqual(transport.requests[-1][2]["data"]["encoding"], "base64")
+        self.assertEqual(transport.requests[-1][2]["data"]["content"], "aGVsbG8=")
+
+        transport = CapturingTransport(404, 400)
+        git = gitlab.Gitlab("http://gitlab", token="token", transport=transport)
+        self.assertFalse(git.createcommit(1, "master", "rollout", self.actions))
+        self.assertEqual(len(transport.requests), 2)
+        transport = CapturingTransport(404)
+        git = gitlab.Gitlab("http://gitlab", token="token", transport=transport)
+        self.assertFalse(git.createcommit(1, "master", "rollout", self.actions, fallback=False))
+
+
+class Unseekable(object):
+    def __init__(self, data):
+        self.stream = io.BytesIO(data)
+
+    def read(self, size=-1):
+        return self.stream.read(min(size, 5))
+
+
+class StreamingUploadTest(unittest.TestCase):
+    payload = os.urandom(1000)
+
+    def decode(self, body):
+        return json.loads(b"".join(body).decode("utf-8"))
+
+    def test_body(self):
+        body = Base64JSONBody({"file_path": "a.bin"}, io.BytesIO(self.payload), chunk_size=10)
+        encoded = b"".join(body.body())
+        self.assertEqual(len(encoded), len(body))
+        decoded = json.loads(encoded.decode("utf-8"))
+        self.assertEqual(decoded["file_path"], "a.bin")
+        self.assertEqual(base64.b64decode(decoded["content"]), self.payload)
+
+        body = Base64JSONBody({}, Unseekable(self.payload), chunk_size=10).body()
+        self.assertFalse(hasattr(body, "__len__"))
+        self.assertEqual(base64.b64decode(self.decode(body)["content"]), self.payload)
+
+    def test_createfile_from_path(self):
+        handle, path = tempfile.mkstemp()
+        os.write(handle, self.payload)
+        os.close(handle)
+        try:
+            transport = CapturingTransport(201, 200)
+            git = gitlab.Gitlab("http://gitlab", token="token", transport=transport)
+            self.assertTrue(git.createfile(1, "a.bin", "master", "text", None, "add", content_path=path))
+            with open(path, "rb") as fileobj:
+                self.assertTrue(git.updatefile(1, "a.bin", "master", fileobj, "update"))
+        finally:
+            os.remove(path)
+        for method, url, kwargs in transport.requests:
+            self.assertEqual(kwargs["headers"]["Content-Type"], "application/json")
+            self.assertNotIn("Content-Type", git.headers)
+            decoded = self.decode(kwargs["data"])
+            self.assertEqual(decoded["encoding"], "base64")
+            self.assertEqual(base64.b64decode(decoded["content"]), self.payload)
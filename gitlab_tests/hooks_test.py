@@ -0,0 +1,73 @@
+"""
+pyapi-gitlab hook reconciler tests
+"""
+
+import time
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+from gitlab.fleet import RateLimiter
+from gitlab.hooks import HookReconciler, HookSpec
+
+
+class FakeHooks(object):
+    def __init__(self, hooks):
+        self.hooks = hooks
+        self.writes = []
+
+    def getprojecthooks(self, project_id, page=1, per_page=20):
+        if project_id not in self.hooks:
+            return False
+        return self.hooks[project_id][(page - 1) * per_page:page * per_page]
+
+    def addprojecthook(self, project_id, url, **flags):
+        self.writes.append(("create", project_id, url, flags))
+        return {"id": 99}
+
+    def editprojecthook(self, project_id, hook_id, url, **flags):
+        self.writes.append(("update", project_id, hook_id, flags))
+        return True
+
+    def deleteprojecthook(self, project_id, hook_id):
+        self.writes.append(("delete", project_id, hook_id))
+        return True
+
+
+def hook(hook_id, url, push=False):
+    return {"id": hook_id, "url": url, "push_events": push, "issues_events": False,
+            "merge_requests_events": False, "tag_push_events": False}
+
+
+class HookReconcilerTest(unittest.TestCase):
+    def setUp(self):
+        self.git = FakeHooks({
+            1: [hook(1, "http://ci", push=True)],
+            2: [hook(2, "http://ci"), hook(3, "http://ci", push=True), hook(4, "http://old")],
+            3: [],
+        })
+        self.spec = HookSpec("http://ci", push=True)
+
+    def test_only_needed_changes_are_made(self):
+        report = HookReconciler(self.git, self.spec, prune=True).reconcile([1, 2, 3, 4])
+        self.assertEqual(sorted(self.git.writes, key=str), sorted([
+            ("update", 2, 2, self.spec.flags()),
+            ("delete", 2, 3),
+            ("delete", 2, 4),
+            ("create", 3, "http://ci", self.spec.flags()),
+        ], key=str))
+        self.assertEqual(report.summary(), {("update", "done"): 1, ("delete", "done"): 2, ("create", "done"): 1,
+                                            ("fetch", "failed"): 1})
+
+    def test_dry_run(self):
+        report = HookReconciler(self.git, [self.spec]).reconcile([1, 2, 3], dry_run=True)
+        self.assertEqual(self.git.writes, [])
+        self.assertEqual(sorted((c.project_id, c.action) for c in report),
+                         [(2, "delete"), (2, "update"), (3, "create")])
+
+    def test_rate_limiter(self):
+        limiter = RateLimiter(50, burst=1)
+        start = time.time()
+        for _ in range(6):
+            limiter.wait()
+        self.assertTrue(time.time() - start >= 0.09)
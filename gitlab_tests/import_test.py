@@ -0,0 +1,20 @@
+"""
+pyapi-gitlab import time tests
+"""
+
+import subprocess
+import sys
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+
+class ImportTest(unittest.TestCase):
+    def test_heavy_dependencies_deferred(self):
+        # run in a fresh interpreter, this one already imported everything
+        code = ("import sys, gitlab\n"
+                "gitlab.Gitlab('http://localhost', token='t')\n"
+                "print(','.join(m for m in ('requests', 'urllib3', 'sqlite3') if m in sys.modules))\n")
+        output = subprocess.check_output([sys.executable, "-c", code]).decode("utf-8").strip()
+        self.assertEqual(output, "")
@@ -0,0 +1,79 @@
+"""
+pyapi-gitlab key audit tests
+"""
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+from gitlab.exceptions import HttpError
+from gitlab.keys import KeyAudit, fingerprint
+
+ED25519 = "ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIJntIyxrTJd7N1tOIdCnTVw7MkpjxXlCZngqR/qUxwTs"
+RSA1024 = ("ssh-rsa "
+           "AAAAB3NzaC1yc2EAAAADAQABAAAAgQDP3FtJHBZ/epIGpGEWQdn+kOwICUMguonCpAhb4b2XM2djFWiXqDZXnOVqSEJIIA3OEtYA"
+           "GeeFtFuLJStvonXMXqr88DORu/ayM7lyAWVguyWeIE1fiw/rZ6DS3BLbIg6UApczpsM5ZE10pEwC6Pu9af350G8ZsobT4fo6xmniMQ==")
+
+
+class FakeKeys(object):
+    def __init__(self):
+        self.userkeys = {1: [{"title": "laptop", "key": ED25519 + " ana@laptop"}],
+                         2: [{"title": "old", "key": RSA1024}, {"title": "copy", "key": ED25519 + " other comment"}],
+                         3: []}
+        self.deploykeys = {10: [{"title": "ci", "key": RSA1024}], 11: [{"title": "bad", "key": "ssh-rsa !!"}]}
+        self.broken = set()
+
+    def _page(self, ids, listing, page, per_page):
+        if (listing, page) in self.broken:
+            return False
+        return [{"id": item_id} for item_id in sorted(ids)[(page - 1) * per_page:page * per_page]]
+
+    def getusers(self, page=1, per_page=20):
+        return self._page(self.userkeys, "users", page, per_page)
+
+    def getprojectsall(self, page=1, per_page=20):
+        return self._page(self.deploykeys, "projects", page, per_page)
+
+    def getsshkeysuser(self, user_id):
+        return self.userkeys.get(user_id, False)
+
+    def getdeploykeys(self, project_id):
+        return self.deploykeys.get(project_id, False)
+
+
+class KeyAuditTest(unittest.TestCase):
+    def test_fingerprint(self):
+        info = fingerprint(ED25519 + " ana@laptop")
+        self.assertEqual(info.fingerprint, "SHA256:hsBRdhSHI+cNp23n4sSmylhhMZtMhViABtaGnqS8ymE")
+        self.assertEqual(info.md5, "0e:e4:9d:68:ea:8c:ff:cd:e1:11:09:2e:cd:62:62:56")
+        self.assertEqual((info.type, info.bits), ("ssh-ed25519", 256))
+        self.assertEqual(fingerprint(RSA1024)[2:], ("ssh-rsa", 1024))
+        self.assertIsNone(fingerprint("not a key"))
+
+    def test_index_and_report(self):
+        git = FakeKeys()
+        audit = KeyAudit(git, workers=3)
+        self.assertEqual(audit.refresh(user_ids=[1, 2, 3, 4], project_ids=[10, 11]), ([4], []))
+        self.assertEqual(audit.where(ED25519), ([1, 2], []))
+        self.assertEqual(audit.where(fingerprint(RSA1024).md5), ([2], [10]))
+        duplicates, weak = audit.report()
+        self.assertEqual(sorted((users, projects) for _, users, projects in duplicates), [([1, 2], []), ([2], [10])])
+        self.assertEqual(sorted((projects, info.type) for info, _, projects in weak),
+                         [([10], "ssh-rsa"), ([11], None)])
+
+        git.userkeys[2] = []
+        audit.refresh(user_ids=[2])
+        self.assertEqual(audit.where(ED25519), ([1], []))
+        self.assertEqual(len(audit.report()[0]), 0)
+
+    def test_failed_listing(self):
+        git = FakeKeys()
+        audit = KeyAudit(git, per_page=2)
+        self.assertEqual(audit.refresh(), ([], []))
+        self.assertEqual(sorted(audit.users), [1, 2, 3])
+        # a partial inventory is not reported as a complete one
+        for listing in ("users", "projects"):
+            git.broken = set([(listing, 2)])
+            audit = KeyAudit(git, per_page=2)
+            self.assertRaises(HttpError, audit.refresh)
+            self.assertEqual(audit.usage(), {})
@@ -0,0 +1,58 @@
+"""
+pyapi-gitlab label sync tests
+"""
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+from gitlab.labels import LabelSpec, LabelSync
+
+
+class FakeLabels(object):
+    def __init__(self, labels):
+        self.labels = labels
+        self.writes = []
+
+    def getlabels(self, project_id):
+        return self.labels.get(project_id, False)
+
+    def createlabel(self, project_id, name, color):
+        self.writes.append(("create", project_id, name, color))
+        return {"name": name, "color": color}
+
+    def editlabel(self, project_id, name, new_name=None, color=None):
+        self.writes.append(("edit", project_id, name, new_name, color))
+        return {"name": new_name or name, "color": color}
+
+    def deletelabel(self, project_id, name):
+        self.writes.append(("delete", project_id, name))
+        return True
+
+
+class LabelSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.git = FakeLabels({
+            1: [{"name": "bug", "color": "#FF0000"}, {"name": "feature", "color": "#00ff00"}],
+            2: [{"name": "defect", "color": "#FF0000"}, {"name": "feature", "color": "#0000FF"},
+                {"name": "misc", "color": "#000000"}],
+        })
+        self.specs = [LabelSpec("bug", "#ff0000", renames=["defect"]), LabelSpec("feature", "#00FF00")]
+
+    def test_minimal_changes(self):
+        report = LabelSync(self.git, self.specs, prune=True).sync([1, 2, 3])
+        self.assertEqual(sorted(self.git.writes, key=str), sorted([
+            ("edit", 2, "defect", "bug", None),
+            ("edit", 2, "feature", None, "#00FF00"),
+            ("delete", 2, "misc"),
+        ], key=str))
+        self.assertEqual(report.summary(), {("rename", "done"): 1, ("update", "done"): 1, ("delete", "done"): 1,
+                                            ("fetch", "failed"): 1})
+
+    def test_dry_run(self):
+        self.git.labels[3] = []
+        report = LabelSync(self.git, self.specs).sync([1, 2, 3], dry_run=True)
+        self.assertEqual(self.git.writes, [])
+        self.assertEqual(sorted((c.project_id, c.action, c.target) for c in report),
+                         [(2, "rename", "bug"), (2, "update", "feature"), (3, "create", "bug"),
+                          (3, "create", "feature")])
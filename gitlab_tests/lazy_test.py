@@ -0,0 +1,51 @@
+"""
+pyapi-gitlab lazy resource tests
+"""
+
+import gc
+import threading
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+from gitlab.exceptions import HttpError
+from gitlab.lazy import Loader
+
+
+class FakeFetch(object):
+    def __init__(self):
+        self.fetched = []
+        self.lock = threading.Lock()
+
+    def __call__(self, project_id):
+        with self.lock:
+            self.fetched.append(project_id)
+        if project_id < 0:
+            return False
+        return {"id": project_id, "name": "project-{0}".format(project_id)}
+
+
+class LazyResourceTest(unittest.TestCase):
+    def test_batched_loading(self):
+        fetch = FakeFetch()
+        loader = Loader(fetch, "project", workers=4, batch_size=3)
+        projects = [loader.resource(project_id) for project_id in range(1, 6)]
+        self.assertIs(loader.resource(1), projects[0])
+        self.assertEqual(projects[0].id, 1)
+        self.assertEqual(fetch.fetched, [])
+        self.assertEqual(projects[1]["name"], "project-2")
+        self.assertEqual(sorted(fetch.fetched), [1, 2, 3])
+        self.assertEqual([project.name for project in projects], ["project-{0}".format(i) for i in range(1, 6)])
+        self.assertEqual(sorted(fetch.fetched), [1, 2, 3, 4, 5])
+        self.assertRaises(AttributeError, getattr, projects[0], "missing")
+        self.assertEqual(projects[0].get("missing", 0), 0)
+
+    def test_unreferenced_and_failed(self):
+        fetch = FakeFetch()
+        loader = Loader(fetch, "project")
+        loader.resource(7)
+        gc.collect()
+        broken = loader.resource(-1)
+        self.assertRaises(HttpError, broken.todict)
+        self.assertEqual(fetch.fetched, [-1])
+        self.assertIn("pending", repr(loader.resource(8)))
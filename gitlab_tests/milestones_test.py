@@ -0,0 +1,62 @@
+"""
+pyapi-gitlab milestone rollup tests
+"""
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+from gitlab.milestones import rollup
+
+
+def issue(issue_id, state="opened", labels=(), assignee=None):
+    return {"id": issue_id, "state": state, "labels": list(labels),
+            "assignee": {"username": assignee} if assignee else None}
+
+
+class FakeMilestones(object):
+    def __init__(self):
+        self.milestones = [{"id": 1, "title": "1.0", "state": "closed"}, {"id": 2, "title": "1.1", "state": "active"},
+                           {"id": 3, "title": "1.2", "state": "active"}]
+        self.issues = {
+            1: [issue(10, "closed", ["bug"], "ana"), issue(11, "closed", ["bug", "ui"])],
+            # 20 shows up twice, as when an issue moves between pages while listing
+            2: [issue(20, labels=["bug"], assignee="bo"), issue(20, labels=["bug"], assignee="bo"),
+                issue(21, "closed", assignee="bo"), {"id": 22, "state": "opened"}],
+        }
+        self.fetched = []
+
+    def getmilestones(self, project_id, page=1, per_page=20):
+        return self.milestones[(page - 1) * per_page:page * per_page]
+
+    def getmilestoneissues(self, project_id, milestone_id, page=1, per_page=20):
+        if milestone_id not in self.issues:
+            return False
+        return self.issues[milestone_id][(page - 1) * per_page:page * per_page]
+
+    def getprojectissue(self, project_id, issue_id):
+        self.fetched.append(issue_id)
+        return issue(issue_id, labels=["ui"], assignee="ana")
+
+
+class RollupTest(unittest.TestCase):
+    def test_counts(self):
+        git = FakeMilestones()
+        stats = rollup(git, 1, per_page=2, workers=3)
+        self.assertEqual([s.milestone["title"] for s in stats], ["1.0", "1.1", "1.2"])
+        first, second, third = stats
+        self.assertEqual(first.states, {"closed": 2})
+        self.assertEqual(first.labels, {"bug": 2, "ui": 1})
+        self.assertEqual(second.total, 3)
+        self.assertEqual(second.states, {"opened": 2, "closed": 1})
+        self.assertEqual(second.assignees, {"bo": 2, None: 1})
+        self.assertFalse(third.complete)
+        self.assertEqual(git.fetched, [])
+        self.assertEqual(second.todict()["assignees"], {"bo": 2, "": 1})
+
+    def test_filters_and_hydrate(self):
+        git = FakeMilestones()
+        stats = rollup(git, 1, state="active", milestone_ids=[2], hydrate=True)
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(git.fetched, [22])
+        self.assertEqual(stats[0].labels, {"bug": 1, "ui": 1})
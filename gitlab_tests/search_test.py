@@ -0,0 +1,170 @@
+"""
+pyapi-gitlab local search index tests
+"""
+
+import os
+import shutil
+import tempfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+from gitlab.exceptions import HttpError
+from gitlab.search import ProjectIndex, TextIndex
+
+
+def project(project_id, path, activity=None):
+    activity = activity or "2016-01-0{0}T00:00:00Z".format(project_id)
+    namespace, name = path.rsplit("/", 1)
+    return {"id": project_id, "name": name, "path": name, "path_with_namespace": path,
+            "last_activity_at": activity, "owner": {"id": 1}}
+
+
+class FakeProjects(object):
+    def __init__(self):
+        self.projects = [project(1, "infra/deploy-tools"), project(2, "infra/terraform"),
+                         project(3, "web/frontend"), project(4, "web/deploy"), project(5, "infra/ci/runner")]
+        self.calls = []
+        self.broken = set()
+
+    def getprojectsall(self, page=1, per_page=20, **kwargs):
+        self.calls.append(kwargs)
+        if page in self.broken:
+            return False
+        projects = self.projects
+        if kwargs.get("order_by") == "last_activity_at":
+            projects = sorted(projects, key=lambda p: p["last_activity_at"], reverse=True)
+        return projects[(page - 1) * per_page:page * per_page]
+
+
+class ProjectIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.git = FakeProjects()
+        self.index = ProjectIndex(self.git, per_page=2)
+        self.index.refresh()
+
+    def ids(self, projects):
+        return [p["id"] for p in projects]
+
+    def test_queries(self):
+        self.assertEqual(len(self.index), 5)
+        self.assertEqual(self.ids(self.index.prefix("deploy")), [1, 4])
+        self.assertEqual(self.ids(self.index.prefix("Deploy", namespace="infra")), [1])
+        self.assertEqual(self.ids(self.index.substring("form")), [2])
+        self.assertEqual(self.ids(self.index.substring("ploy")), [4, 1])
+        self.assertEqual(self.ids(self.index.substring("ci/")), [5])
+        self.assertEqual(self.ids(self.index.prefix("run", namespace="infra/ci")), [5])
+        self.assertEqual(self.ids(self.index.search("ter")), [2])
+        self.assertEqual(self.ids(self.index.search("end")), [3])
+        self.assertEqual(self.index.search("nothing"), [])
+        self.assertNotIn("owner", self.index.search("runner")[0])
+
+    def test_incremental_refresh_and_persistence(self):
+        self.git.projects[2] = project(3, "web/frontend-legacy", "2016-02-01T00:00:00Z")
+        self.git.projects.append(project(6, "web/new", "2016-02-02T00:00:00Z"))
+        self.git.calls = []
+        # the two changed projects and the one active at the previous mark
+        self.assertEqual(self.index.refresh(), 3)
+        self.assertEqual(len(self.git.calls), 2)
+        self.assertEqual(self.ids(self.index.prefix("frontend")), [3])
+        self.assertEqual(self.index.substring("frontend")[0]["name"], "frontend-legacy")
+        self.assertEqual(self.ids(self.index.prefix("legacy")), [3])
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "projects.json")
+            self.index.save(path)
+            loaded = ProjectIndex(path=path)
+            self.assertEqual(len(loaded), 6)
+            self.assertEqual(loaded.hwm, self.index.hwm)
+            self.assertEqual(self.ids(loaded.search("new")), [6])
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_failed_page_keeps_the_index(self):
+        self.git.projects.append(project(6, "web/new", "2016-02-02T00:00:00Z"))
+        self.git.broken.add(2)
+        self.assertRaises(HttpError, self.index.refresh, full=True)
+        self.assertEqual(len(self.index), 5)
+        hwm = self.index.hwm
+        # the incremental refresh does not move the mark past the pages it could not read
+        self.git.projects[3] = project(4, "web/deploy", "2016-02-01T00:00:00Z")
+        self.git.projects[4] = project(5, "infra/ci/runner", "2016-02-01T00:00:00Z")
+        self.assertRaises(HttpError, self.index.refresh)
+        self.assertEqual(self.index.hwm, hwm)
+        self.assertEqual(self.ids(self.index.search("new")), [])
+        self.git.broken = set()
+        self.assertEqual(self.index.refresh(), 3)
+        self.assertEqual(self.ids(self.index.search("new")), [6])
+
+
+class FakeTracker(object):
+    def __init__(self):
+        self.issues = {1: [
+            {"id": 11, "iid": 1, "project_id": 1, "title": "Crash on login", "description": "segfault in the login form",
+             "state": "opened", "updated_at": "2016-01-03T00:00:00Z"},
+            {"id": 12, "iid": 2, "project_id": 1, "title": "Dark theme", "description": "add a dark theme",
+             "state": "closed", "updated_at": "2016-01-02T00:00:00Z"},
+        ], 2: [
+            {"id": 21, "iid": 1, "project_id": 2, "title": "Login is slow", "description": "",
+             "state": "opened", "updated_at": "2016-01-01T00:00:00Z"},
+        ]}
+        self.mergerequests = {1: [{"id": 31, "iid": 1, "project_id": 1, "title": "Fix crash",
+                                   "description": "closes #1", "state": "merged",
+                                   "updated_at": "2016-01-04T00:00:00Z"}], 2: []}
+        self.notes = {12: [{"body": "the login page should be dark too"}]}
+        self.listed = []
+
+    def getprojectissues(self, project_id, page=1, per_page=20, **kwargs):
+        self.listed.append(("issue", project_id, page))
+        if project_id not in self.issues:
+            return False
+        return sorted(self.issues[project_id], key=lambda i: i["updated_at"], reverse=True)[
+            (page - 1) * per_page:page * per_page]
+
+    def getmergerequests(self, project_id, page=1, per_page=20, state=None, **kwargs):
+        if project_id not in self.mergerequests:
+            return False
+        return self.mergerequests[project_id][(page - 1) * per_page:page * per_page]
+
+    def getissuewallnotes(self, project_id, issue_id, page=1, per_page=20):
+        return self.notes.get(issue_id, [])[(page - 1) * per_page:page * per_page]
+
+    def getmergerequestwallnotes(self, project_id, merge_request_id, page=1, per_page=20):
+        return []
+
+
+class TextIndexTest(unittest.TestCase):
+    def test_ranked_queries(self):
+        index = TextIndex(FakeTracker(), per_page=1)
+        self.assertEqual(index.update([1, 2, 3]), (4, [3]))
+        results = index.search("login crash")
+        self.assertEqual([doc["id"] for _, doc in results][:2], [11, 31])
+        self.assertEqual(set(doc["id"] for _, doc in results), set([11, 12, 21, 31]))
+        self.assertEqual([doc["id"] for _, doc in index.search("login", kind="issue", state="opened",
+                                                                 project_ids=[2])], [21])
+        # notes are indexed with their issue
+        self.assertEqual([doc["id"] for _, doc in index.search("page")], [12])
+        self.assertEqual(index.search("nothing"), [])
+
+    def test_incremental_update_and_persistence(self):
+        git = FakeTracker()
+        index = TextIndex(git, per_page=1)
+        index.update([1])
+        git.issues[1][1] = dict(git.issues[1][1], title="Light theme", updated_at="2016-01-05T00:00:00Z")
+        git.listed = []
+        self.assertEqual(index.update([1]), (3, []))
+        # stops on the first page older than the previous update
+        self.assertEqual(len(git.listed), 3)
+        self.assertEqual([doc["id"] for _, doc in index.search("light")], [12])
+        self.assertEqual(index.search("dark theme")[0][1]["id"], 12)
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "text.json")
+            index.save(path)
+            loaded = TextIndex(path=path)
+            self.assertEqual(len(loaded), 3)
+            self.assertEqual(loaded.search("crash"), index.search("crash"))
+        finally:
+            shutil.rmtree(tmpdir)
@@ -0,0 +1,95 @@
+"""
+pyapi-gitlab snippet export tests
+"""
+
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+from gitlab.snippets import SnippetExporter
+
+
+class FakeSnippets(object):
+    def __init__(self):
+        self.snippets = {
+            1: [{"id": 10, "title": "hello", "file_name": "hello.py"}, {"id": 11, "title": "big", "file_name": "big.txt"}],
+            2: [{"id": 20, "title": "quote", "file_name": "quote.md"}],
+        }
+        self.contents = {10: b"print('hello')\n", 11: b"x" * 200000, 20: u'"caf\u00e9"\n'.encode("utf-8")}
+        self.downloaded = []
+        self.broken = set()
+        self.raising = set()
+
+    def getsnippets(self, project_id, page=1, per_page=20):
+        if project_id in self.raising:
+            raise IOError("connection reset")
+        if project_id not in self.snippets:
+            return False
+        return self.snippets[project_id][(page - 1) * per_page:page * per_page]
+
+    def getsnippetcontent(self, project_id, snippet_id, fileobj=None, chunk_size=64 * 1024):
+        if snippet_id in self.broken:
+            return False
+        self.downloaded.append(snippet_id)
+        content = self.contents[snippet_id]
+        for start in range(0, len(content), 7):
+            fileobj.write(content[start:start + 7])
+        return True
+
+
+class SnippetExporterTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_tar_and_resume(self):
+        git = FakeSnippets()
+        git.snippets[2].append({"id": 21, "title": "meta", "file_name": "meta.json"})
+        git.contents[21] = b"{}\n"
+        git.broken.add(11)
+        path = os.path.join(self.tmpdir, "snippets.tar")
+        exporter = SnippetExporter(git, workers=3, per_page=1, spool_size=1024)
+        report = exporter.export([1, 2, 3], path)
+        self.assertEqual(report.summary(), {("export", "done"): 3, ("export", "failed"): 1, ("list", "failed"): 1})
+
+        git.broken = set()
+        git.downloaded = []
+        self.assertEqual(exporter.export([1, 2], path).summary(), {("export", "done"): 1})
+        self.assertEqual(git.downloaded, [11])
+        with tarfile.open(path) as archive:
+            self.assertEqual(sorted(archive.getnames()), ["1/10/content/hello.py", "1/10/meta.json",
+                                                          "1/11/content/big.txt", "1/11/meta.json",
+                                                          "2/20/content/quote.md", "2/20/meta.json",
+                                                          "2/21/content/meta.json", "2/21/meta.json"])
+            self.assertEqual(archive.extractfile("1/11/content/big.txt").read(), git.contents[11])
+            self.assertEqual(json.loads(archive.extractfile("2/20/meta.json").read().decode("utf-8"))["project_id"], 2)
+            # a snippet named meta.json does not replace the metadata
+            self.assertEqual(archive.extractfile("2/21/content/meta.json").read(), git.contents[21])
+            self.assertEqual(json.loads(archive.extractfile("2/21/meta.json").read().decode("utf-8"))["id"], 21)
+
+    def test_listing_error(self):
+        git = FakeSnippets()
+        git.raising.add(1)
+        path = os.path.join(self.tmpdir, "snippets.tar")
+        # the error of the listing reaches the caller instead of ending the export early
+        self.assertRaises(IOError, SnippetExporter(git, workers=2).export, [1, 2, 3], path)
+
+    def test_jsonl(self):
+        git = FakeSnippets()
+        path = os.path.join(self.tmpdir, "snippets.jsonl")
+        SnippetExporter(git, workers=2, spool_size=1024).export([1, 2], path, fmt="jsonl")
+        # an interrupted write is cut on resume
+        with open(path, "ab") as archive:
+            archive.write(b'{"key": "1/1')
+        SnippetExporter(git).export([1, 2], path, fmt="jsonl")
+        with open(path, "rb") as archive:
+            lines = [json.loads(line.decode("utf-8")) for line in archive]
+        self.assertEqual(sorted(line["key"] for line in lines), ["1/10", "1/11", "2/20"])
+        self.assertEqual(dict((line["id"], line["content"]) for line in lines)[20], u'"caf\u00e9"\n')
@@ -0,0 +1,90 @@
+"""
+pyapi-gitlab tag index tests
+"""
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+from gitlab import Gitlab
+from gitlab.exceptions import HttpError
+from gitlab.tags import TagIndex, versionkey
+
+
+class FakeTags(object):
+    def __init__(self, names):
+        # tags are made in version order, tag n contains commits c0..cn
+        self.tags = [{"name": name, "commit": {"id": "c{0}".format(i)}} for i, name in enumerate(names)]
+        self.activity = "2016-01-01"
+        self.listed = 0
+        self.compared = []
+        self.broken = set()
+
+    def getproject(self, project_id):
+        return {"id": project_id, "last_activity_at": self.activity}
+
+    def getrepositorytags(self, project_id, page=1, per_page=20):
+        if page == 1:
+            self.listed += 1
+        tags = sorted(self.tags, key=lambda tag: tag["name"], reverse=True)
+        return tags[(page - 1) * per_page:page * per_page]
+
+    def compare_branches_tags_commits(self, project_id, from_id, to_id):
+        self.compared.append(from_id)
+        if from_id in self.broken:
+            return False
+        position = dict((tag["name"], i) for i, tag in enumerate(self.tags))[from_id]
+        return {"commits": [] if int(to_id[1:]) <= position else [{"id": to_id}]}
+
+
+class TagIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.git = FakeTags(["v0.9.0", "v1.0.0-rc.1", "v1.0.0-rc.2", "v1.0.0", "v1.2.0", "v1.10.0",
+                             "v2.0.0-beta"])
+        self.git.tags.append({"name": "nightly", "commit": {"id": "c9"}})
+        self.index = TagIndex(self.git, 1, per_page=3)
+
+    def test_versions(self):
+        self.assertTrue(versionkey("1.0.0-rc.2") < versionkey("1.0.0-rc.10") < versionkey("1.0.0"))
+        self.assertTrue(versionkey("1.0.0-alpha") > versionkey("1.0.0-9"))
+        self.assertEqual(versionkey("v1.2"), versionkey("1.2.0"))
+        self.assertEqual(self.index.latest()["name"], "v1.10.0")
+        self.assertEqual(self.index.latest(prerelease=True)["name"], "v2.0.0-beta")
+        self.assertEqual([tag["name"] for tag in self.index.range("1.0", "2")], ["v1.0.0", "v1.2.0", "v1.10.0"])
+        self.assertEqual([tag["name"] for tag in self.index.range(high="1.0.0", prerelease=True)], ["v0.9.0"])
+        self.assertEqual([tag["name"] for tag in self.index.range(high="1.0.0-rc.2", prerelease=True)],
+                         ["v0.9.0", "v1.0.0-rc.1"])
+        self.assertEqual([tag["name"] for tag in self.index.range("1.0", "2", prerelease=True)],
+                         ["v1.0.0", "v1.2.0", "v1.10.0"])
+        self.assertRaises(ValueError, self.index.range, "latest")
+
+    def test_incremental_refresh(self):
+        self.index.latest()
+        self.index.ttl = 0
+        self.index.latest()
+        self.assertEqual(self.git.listed, 1)
+        self.git.tags.append({"name": "v1.11.0", "commit": {"id": "c10"}})
+        self.git.activity = "2016-01-02"
+        self.assertEqual(self.index.latest()["name"], "v1.11.0")
+        self.assertEqual(self.git.listed, 2)
+        self.index.add({"name": "v3.0.0", "commit": {"id": "c11"}})
+        self.assertEqual(self.index.latest()["name"], "v3.0.0")
+
+    def test_containing(self):
+        names = [tag["name"] for tag in self.index.containing("c3")]
+        self.assertEqual(names, ["v1.0.0", "v1.2.0", "v1.10.0", "v2.0.0-beta"])
+        self.assertTrue(len(self.git.compared) <= 3)
+        self.assertEqual([tag["name"] for tag in self.index.containing("c3", linear=False, workers=2)], names)
+
+    def test_failed_compare_is_not_cached(self):
+        self.git.broken.add("v1.0.0")
+        self.assertRaises(HttpError, self.index.containing, "c3")
+        self.assertRaises(HttpError, self.index.containing, "c3", linear=False, workers=2)
+        self.git.broken = set()
+        self.assertEqual([tag["name"] for tag in self.index.containing("c3")],
+                         ["v1.0.0", "v1.2.0", "v1.10.0", "v2.0.0-beta"])
+
+    def test_shared_by_client(self):
+        git = Gitlab("http://gitlab.example.com", token="token")
+        self.assertIs(git.gettagindex(1), git.gettagindex(1))
+        self.assertIsNot(git.gettagindex(1), git.gettagindex(2))
@@ -0,0 +1,76 @@
+"""
+pyapi-gitlab record/replay transport tests
+"""
+
+import io
+import json
+import os
+import shutil
+import tempfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+import requests
+import gitlab
+from gitlab.exceptions import UnrecordedRequest
+from gitlab.transport import RecordingTransport, ReplayTransport, Transport
+
+
+class StaticTransport(Transport):
+    """Answers every request with the next canned (status, body)"""
+
+    def __init__(self, *answers):
+        super(StaticTransport, self).__init__()
+        self.answers = list(answers)
+
+    def request(self, method, url, **kwargs):
+        status, body = self.answers.pop(0)
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(body).encode("utf-8")
+        response.headers["Content-Type"] = "application/json"
+        return response
+
+
+class RecordReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def record(self, path):
+        recorder = RecordingTransport(path, StaticTransport((200, [{"name": "bug"}]), (200, []), (404, {})))
+        git = gitlab.Gitlab("http://gitlab", token="secret", transport=recorder)
+        git.getlabels(1)
+        git.getlabels(1)
+        self.assertFalse(git.getlabels(2))
+        recorder.close()
+
+    def test_replay(self):
+        for name in ("session.jsonl", "session.jsonl.gz"):
+            path = os.path.join(self.tmpdir, name)
+            self.record(path)
+            git = gitlab.Gitlab("http://gitlab", token="other", transport=ReplayTransport(path))
+            self.assertEqual(git.getlabels(1), [{"name": "bug"}])
+            self.assertEqual(git.getlabels(1), [])
+            self.assertEqual(git.getlabels(1), [])
+            self.assertFalse(git.getlabels(2))
+            self.assertRaises(UnrecordedRequest, git.getlabels, 3)
+
+    def test_tokens_are_not_recorded(self):
+        path = os.path.join(self.tmpdir, "session.jsonl")
+        self.record(path)
+        with open(path) as cassette:
+            self.assertNotIn("secret", cassette.read())
+
+    def test_replay_streamed_content(self):
+        path = os.path.join(self.tmpdir, "session.jsonl")
+        recorder = RecordingTransport(path, StaticTransport((200, "raw snippet")))
+        gitlab.Gitlab("http://gitlab", token="secret", transport=recorder).getsnippetcontent(1, 2)
+        recorder.close()
+        git = gitlab.Gitlab("http://gitlab", token="secret", transport=ReplayTransport(path))
+        output = io.BytesIO()
+        self.assertTrue(git.getsnippetcontent(1, 2, fileobj=output))
+        self.assertEqual(output.getvalue(), b'"raw snippet"')
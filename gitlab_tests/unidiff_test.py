@@ -0,0 +1,45 @@
+"""
+pyapi-gitlab unified diff parser tests
+"""
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+from gitlab.unidiff import FileDiff, diffstat, parsediffs
+
+DIFF = """--- a/setup.py
++++ b/setup.py
+@@ -1,4 +1,4 @@ import os
+ from setuptools import setup
+-version = "7.5"
++version = "7.6"
+ 
+@@ -10,2 +10,3 @@ setup(
+     name="pyapi-gitlab",
++    license="GPL3",
+ )
+\\ No newline at end of file
+"""
+
+
+class UnidiffTest(unittest.TestCase):
+    def test_stats_and_hunks(self):
+        diff = FileDiff(DIFF, "setup.py", "setup.py")
+        self.assertEqual((diff.added, diff.removed, diff.binary), (2, 1, False))
+        hunks = list(diff)
+        self.assertEqual(len(hunks), 2)
+        self.assertEqual((hunks[0].old_start, hunks[0].new_count, hunks[0].section), (1, 4, "import os"))
+        self.assertEqual([(line.kind, line.old_lineno, line.new_lineno) for line in hunks[0].lines],
+                         [(" ", 1, 1), ("-", 2, None), ("+", None, 2), (" ", 3, 3)])
+        self.assertEqual(hunks[1].lines[1].text, '    license="GPL3",')
+        self.assertEqual(hunks[1].lines[-1].kind, "\\")
+
+    def test_payloads(self):
+        change = {"diff": DIFF, "old_path": "setup.py", "new_path": "setup.py"}
+        binary = {"diff": "Binary files a/logo.png and b/logo.png differ\n", "old_path": "logo.png",
+                  "new_path": "logo.png", "deleted_file": True}
+        self.assertEqual(diffstat([change, binary]), [("setup.py", 2, 1, False), ("logo.png", 0, 0, True)])
+        self.assertEqual(len(list(parsediffs({"changes": [change]}))), 1)
+        self.assertEqual(len(list(parsediffs({"commits": [], "diffs": [change, binary]}))), 2)
+        self.assertEqual(list(parsediffs(False)), [])
@@ -0,0 +1,63 @@
+"""
+pyapi-gitlab user directory tests
+"""
+
+import os
+import shutil
+import tempfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+from gitlab.users import UserDirectory
+
+
+def user(user_id, username):
+    return {"id": user_id, "username": username, "name": username.title(),
+            "email": "{0}@Example.com".format(username), "avatar_url": "http://avatar"}
+
+
+class FakeUsers(object):
+    def __init__(self):
+        self.users = [user(1, "root"), user(2, "ana"), user(3, "bo"), user(5, "cy"), user(6, "di")]
+        self.pages = []
+
+    def getusers(self, search=None, page=1, per_page=20):
+        self.pages.append(page)
+        return self.users[(page - 1) * per_page:page * per_page]
+
+
+class UserDirectoryTest(unittest.TestCase):
+    def test_lookups(self):
+        directory = UserDirectory(FakeUsers(), per_page=2)
+        self.assertEqual(directory.refresh(), 5)
+        self.assertEqual(directory.byusername("Ana")["id"], 2)
+        self.assertEqual(directory.byemail("bo@example.com")["id"], 3)
+        self.assertEqual(directory.get(5)["username"], "cy")
+        self.assertEqual([directory.resolve(v) for v in (6, "root", "CY@example.com", "nobody")], [6, 1, 5, None])
+        self.assertNotIn("avatar_url", directory.get(1))
+
+    def test_incremental_refresh_and_snapshot(self):
+        git = FakeUsers()
+        directory = UserDirectory(git, per_page=2)
+        directory.refresh()
+        git.users.append(user(7, "ed"))
+        # deleted users shift the newest ones to earlier pages
+        del git.users[1]
+        del git.users[1]
+        git.pages = []
+        self.assertEqual(directory.refresh(), 2)
+        self.assertEqual(git.pages, [3, 2, 3])
+        self.assertEqual(directory.byusername("ed")["id"], 7)
+        directory.remove(2)
+        self.assertIsNone(directory.byusername("ana"))
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "users.json")
+            directory.save(path)
+            loaded = UserDirectory(path=path)
+            self.assertEqual(len(loaded), 5)
+            self.assertEqual(loaded.byemail("ed@example.com")["id"], 7)
+        finally:
+            shutil.rmtree(tmpdir)
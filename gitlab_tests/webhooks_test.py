@@ -0,0 +1,61 @@
+"""
+pyapi-gitlab webhook receiver tests
+"""
+
+import io
+import json
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+from gitlab.cache import ResponseCache
+from gitlab.webhooks import WebhookReceiver, eventkind
+
+
+class FakeClient(object):
+    def __init__(self):
+        self.cache = ResponseCache()
+
+
+class WebhookReceiverTest(unittest.TestCase):
+    def post(self, receiver, payload, **headers):
+        body = json.dumps(payload).encode("utf-8")
+        environ = {"REQUEST_METHOD": "POST", "CONTENT_LENGTH": str(len(body)), "wsgi.input": io.BytesIO(body)}
+        for name, value in headers.items():
+            environ["HTTP_" + name.upper()] = value
+        statuses = []
+        receiver(environ, lambda status, headers: statuses.append(status))
+        return statuses[0]
+
+    def test_dispatch_and_invalidation(self):
+        git = FakeClient()
+        git.cache.set("project", {"id": 3}, 60, ("projects", "3"))
+        git.cache.set("other", {"id": 4}, 60, ("projects", "4"))
+        git.cache.set("bypath", [], 60, ("projects", "grp/three"))
+        receiver = WebhookReceiver(token="secret", git=git)
+        received = []
+        receiver.on("push", lambda kind, payload: received.append((kind, payload["project_id"])))
+        receiver.on("*")(lambda kind, payload: received.append(("*", kind)))
+
+        push = {"ref": "refs/heads/master", "commits": [], "project_id": 3,
+                "project": {"path_with_namespace": "grp/three"}}
+        self.assertEqual(self.post(receiver, push, x_gitlab_token="wrong"), "403 Forbidden")
+        self.assertEqual(self.post(receiver, push, x_gitlab_token="secret"), "200 OK")
+        self.assertEqual(self.post(receiver, {"object_kind": "issue"}, x_gitlab_token="secret"), "200 OK")
+        receiver.stop()
+        self.assertEqual(sorted(received, key=str), sorted([("push", 3), ("*", "push"), ("*", "issue")], key=str))
+        self.assertEqual(git.cache.get("project"), None)
+        # read with the path of the pushed project
+        self.assertEqual(git.cache.get("bypath"), None)
+        self.assertEqual(git.cache.get("other"), {"id": 4})
+
+    def test_full_queue_is_refused(self):
+        receiver = WebhookReceiver(workers=0, queue_size=1)
+        self.assertEqual(self.post(receiver, {"object_kind": "note"}), "200 OK")
+        self.assertEqual(self.post(receiver, {"object_kind": "note"}), "503 Service Unavailable")
+        self.assertEqual(receiver.dropped, 1)
+
+    def test_eventkind(self):
+        self.assertEqual(eventkind({"ref": "refs/tags/v1", "commits": []}), "tag_push")
+        self.assertEqual(eventkind({"event_name": "user_create"}), "system")
+        self.assertEqual(eventkind({}, {"X-Gitlab-Event": "Merge Request Hook"}), "merge_request")